@@ -0,0 +1,5 @@
+"""
+Calculator Benchmarks
+Headless performance scripts; run from the repository root, e.g.
+    python -m benchmarks.bench_decimal_mode
+"""
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Controller Replay Benchmark
+Replays recorded keystroke sessions through the Tk-free CalculatorController
+and reports keys and sessions per second, or checks the final displays
+against a saved recording for regression testing.
+
+Usage:
+    python -m benchmarks.bench_controller [--sessions 20000] [--mode float]
+    python -m benchmarks.bench_controller --save displays.json
+    python -m benchmarks.bench_controller --check displays.json
+
+Sessions are generated from a fixed seed, so a recording made before a
+change can be checked after it. Exit status is 1 when any display differs.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from calculator_controller import KEYS, CalculatorController
+from calculator_engine import NUMBER_MODES, CalculatorEngine
+
+# Relative weights of recorded key presses (keysyms and characters as Tk reports them)
+KEY_WEIGHTS = {
+    **{str(digit): 6 for digit in range(10)},
+    "+": 3, "-": 3, "*": 3, "/": 3, "Return": 2, "=": 1,
+    ".": 2, ",": 1, "BackSpace": 2, "Escape": 1, "Delete": 1,
+}
+
+
+def recorded_sessions(count, seed=0, min_keys=5, max_keys=40):
+    """Deterministic stand-ins for recorded sessions (lists of keys)"""
+    rng = random.Random(seed)
+    keys = [key for key in KEY_WEIGHTS if key in KEYS]
+    weights = [KEY_WEIGHTS[key] for key in keys]
+    return [rng.choices(keys, weights, k=rng.randint(min_keys, max_keys))
+            for _ in range(count)]
+
+
+def replay_all(sessions, number_mode):
+    """
+    Replay every session on a fresh display
+    Returns:
+        (elapsed seconds, final display text per session)
+    """
+    controller = CalculatorController(CalculatorEngine(number_mode=number_mode))
+    displays = []
+    start = time.perf_counter()
+    for keys in sessions:
+        controller.press("clear")
+        displays.append(controller.replay(keys))
+    return time.perf_counter() - start, displays
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", choices=NUMBER_MODES, default="float")
+    parser.add_argument("--save", help="write the final displays to this JSON file")
+    parser.add_argument("--check", help="compare the final displays with this JSON file")
+    args = parser.parse_args(argv)
+
+    sessions = recorded_sessions(args.sessions, args.seed)
+    total_keys = sum(len(keys) for keys in sessions)
+    elapsed, displays = replay_all(sessions, args.mode)
+
+    print(f"{args.sessions:,} sessions, {total_keys:,} keys in {elapsed:.2f}s: "
+          f"{total_keys / elapsed:,.0f} keys/s, {args.sessions / elapsed:,.0f} sessions/s")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"seed": args.seed, "mode": args.mode, "displays": displays}, f)
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            recording = json.load(f)
+        expected = recording["displays"]
+        if recording["seed"] != args.seed or recording["mode"] != args.mode or \
+                len(expected) != len(displays):
+            print("Recording was made with different --seed, --mode or --sessions", file=sys.stderr)
+            return 1
+        mismatches = [i for i, (a, b) in enumerate(zip(expected, displays)) if a != b]
+        for i in mismatches[:10]:
+            print(f"MISMATCH session {i}: {' '.join(sessions[i])}: "
+                  f"{expected[i]!r} -> {displays[i]!r}", file=sys.stderr)
+        print(f"{len(mismatches)} of {len(displays)} sessions differ")
+        return 1 if mismatches else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+CSV Streaming Benchmark
+Generates CSV files of growing size, streams each through calculator_csv
+and reports throughput and the process's peak resident memory, which
+should stay flat as the file grows (Unix only; "-" elsewhere).
+
+Usage:
+    python -m benchmarks.bench_csv [--rows 100000 1000000] [--chunk-bytes 1048576]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from calculator_batch import has_numpy
+from calculator_csv import DEFAULT_CHUNK_BYTES, process_csv
+
+EXPRESSIONS = ["total = price * 1.17", "root = sqrt(qty)", "share = percentage(price, pct)"]
+
+# Every 1000th row has a bad cell, to include the per-row error path
+BAD_ROW_INTERVAL = 1000
+
+
+def write_sample(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id,price,qty,pct\n")
+        for i in range(rows):
+            qty = "n/a" if i % BAD_ROW_INTERVAL == 7 else str(i % 500 - 3)
+            f.write(f"{i},{(i * 37) % 10000 / 100:.2f},{qty},{i % 30}\n")
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1e6 if sys.platform == "darwin" else 1e3)
+
+
+class _NullWriter:
+    """Discards output, so only reading and evaluation are measured"""
+
+    def write(self, text):
+        return len(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES)
+    args = parser.parse_args(argv)
+
+    print(f"vectorized path: {'NumPy' if has_numpy() else 'plain Python'}")
+    print(f"{'rows':>10}{'file MB':>10}{'seconds':>10}{'rows/s':>12}{'MB/s':>8}"
+          f"{'errors':>9}{'peak RSS MB':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            path = os.path.join(directory, f"sample-{rows}.csv")
+            write_sample(path, rows)
+            size = os.path.getsize(path) / 1e6
+
+            start = time.perf_counter()
+            processed, errors = process_csv(path, _NullWriter(), EXPRESSIONS,
+                                            chunk_bytes=args.chunk_bytes)
+            elapsed = time.perf_counter() - start
+            peak = _peak_rss_mb()
+
+            print(f"{processed:>10}{size:>10.1f}{elapsed:>10.2f}{processed / elapsed:>12,.0f}"
+                  f"{size / elapsed:>8.1f}{errors:>9}"
+                  f"{'-' if peak is None else f'{peak:.1f}':>13}")
+            os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Decimal Mode Benchmark
+Compares the float round-trip path with the Decimal-native number mode,
+from display text through the engine and back to display text.
+
+Usage:
+    python -m benchmarks.bench_decimal_mode [--iterations N]
+"""
+
+import argparse
+import time
+from decimal import Decimal
+
+from calculator_engine import CalculatorEngine
+
+# Display strings as a user would type them, and the operator applied to each
+OPERANDS = ["1234.5678", "3", "0.1", "0.2", "98765.4321", "7", "42", "2.5"]
+OPERATIONS = ["+", "-", "*", "/"]
+
+
+def run_chain(number_mode, iterations):
+    """Push display text through operator()/calculate() like the GUI does"""
+    engine = CalculatorEngine(number_mode=number_mode)
+    parse = Decimal if number_mode == "decimal" else float
+    render = engine.format_number if number_mode == "decimal" else str
+    operands = OPERANDS
+    operations = OPERATIONS
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        text = operands[i % 8]
+        engine.operator(operations[i % 4], parse(text))
+        render(engine.stored_value)
+    result = engine.calculate(parse("1"))
+    elapsed = time.perf_counter() - start
+    return elapsed, render(result)
+
+
+def run_raw(number_mode, iterations):
+    """Call _perform_calculation directly with pre-parsed operands"""
+    engine = CalculatorEngine(number_mode=number_mode)
+    parse = Decimal if number_mode == "decimal" else float
+    pairs = [(parse(OPERANDS[i]), parse(OPERANDS[i + 1])) for i in range(0, 8, 2)]
+    calculation = engine._perform_calculation
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        a, b = pairs[i % 4]
+        calculation(a, b, OPERATIONS[i % 4])
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args(argv)
+    n = args.iterations
+
+    print(f"{'benchmark':<28}{'float ns/op':>14}{'decimal ns/op':>16}{'speedup':>10}")
+    for name, runner in (("_perform_calculation", run_raw), ("display chain", run_chain)):
+        float_time = runner("float", n)
+        decimal_time = runner("decimal", n)
+        if isinstance(float_time, tuple):
+            float_time, decimal_time = float_time[0], decimal_time[0]
+        print(
+            f"{name:<28}{float_time / n * 1e9:>14.0f}{decimal_time / n * 1e9:>16.0f}"
+            f"{float_time / decimal_time:>9.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
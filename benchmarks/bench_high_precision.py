@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+High-Precision Benchmark
+Times calculator_precision's factorial, power, exp, ln and sqrt against naive
+Decimal loops (term-by-term series, repeated multiplication, plain Newton)
+and checks that both agree.
+
+Usage:
+    python -m benchmarks.bench_high_precision [--digits 100 500 2000]
+"""
+
+import argparse
+import math
+import time
+from decimal import MAX_EMAX, MIN_EMIN, Context, Decimal
+
+import calculator_precision
+
+EXP_ARGUMENT = Decimal("123.456")
+LN_ARGUMENT = Decimal("98765.4321")
+SQRT_ARGUMENT = Decimal("2")
+POWER_BASE = Decimal("1.0001")
+POWER_EXPONENT = 100000
+FACTORIAL_ARGUMENTS = (1000, 10000, 50000)
+
+
+def _context(digits):
+    return Context(prec=digits, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+
+def naive_exp(x, digits):
+    """Taylor series summed term by term"""
+    context = _context(digits + 10)
+    total = term = Decimal(1)
+    k = 0
+    while True:
+        k += 1
+        term = context.divide(context.multiply(term, x), k)
+        if not term or abs(term) < total.scaleb(-digits - 10):
+            break
+        total = context.add(total, term)
+    return _context(digits).plus(total)
+
+
+def naive_ln(x, digits):
+    """Newton's iteration on the naive exp at full precision throughout"""
+    context = _context(digits + 10)
+    y = Decimal(repr(math.log(float(x))))
+    while True:
+        power = naive_exp(y, digits + 10)
+        step = context.divide(context.subtract(x, power), power)
+        y = context.add(y, step)
+        if abs(step) < y.scaleb(-digits - 5):
+            return _context(digits).plus(y)
+
+
+def naive_sqrt(x, digits):
+    """Newton's iteration for x**0.5 at full precision throughout"""
+    context = _context(digits + 10)
+    y = Decimal(repr(math.sqrt(float(x))))
+    while True:
+        previous = y
+        y = context.divide(context.add(y, context.divide(x, y)), 2)
+        if y == previous:
+            return _context(digits).plus(y)
+
+
+def naive_power(base, n, digits):
+    """Repeated multiplication"""
+    context = _context(digits + 10)
+    result = Decimal(1)
+    for _ in range(n):
+        result = context.multiply(result, base)
+    return _context(digits).plus(result)
+
+
+def naive_factorial(n):
+    """Decimal product of 1..n in an exact context"""
+    context = _context(int(n * math.log10(max(n, 2))) + 10)
+    result = Decimal(1)
+    for k in range(2, n + 1):
+        result = context.multiply(result, k)
+    return int(result)
+
+
+def _time(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def cases(digits):
+    """(name, fast callable, naive callable) for one precision"""
+    precision = calculator_precision
+    return [
+        (f"exp[{digits}]",
+         lambda: precision.exp(EXP_ARGUMENT, digits),
+         lambda: naive_exp(EXP_ARGUMENT, digits)),
+        (f"ln[{digits}]",
+         lambda: precision.ln(LN_ARGUMENT, digits),
+         lambda: naive_ln(LN_ARGUMENT, digits)),
+        (f"sqrt[{digits}]",
+         lambda: precision.sqrt(SQRT_ARGUMENT, digits),
+         lambda: naive_sqrt(SQRT_ARGUMENT, digits)),
+        (f"power[{digits}]",
+         lambda: precision.power(POWER_BASE, POWER_EXPONENT, digits),
+         lambda: naive_power(POWER_BASE, POWER_EXPONENT, digits)),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--digits", type=int, nargs="+", default=[100, 500, 2000])
+    args = parser.parse_args(argv)
+
+    all_cases = []
+    for digits in args.digits:
+        all_cases.extend(cases(digits))
+    for n in FACTORIAL_ARGUMENTS:
+        all_cases.append((
+            f"factorial[{n}]",
+            lambda n=n: calculator_precision.factorial(n),
+            lambda n=n: naive_factorial(n)
+        ))
+
+    print(f"{'benchmark':<20}{'fast ms':>12}{'naive ms':>12}{'speedup':>10}  agree")
+    for name, fast, naive in all_cases:
+        fast_time, fast_result = _time(fast)
+        naive_time, naive_result = _time(naive)
+        # The naive loops round differently; compare all but the last digit
+        if isinstance(fast_result, int):
+            agree = fast_result == naive_result
+        else:
+            agree = abs(fast_result - naive_result) <= abs(fast_result).scaleb(-len(
+                fast_result.as_tuple().digits) + 2)
+        print(
+            f"{name:<20}{fast_time * 1e3:>12.2f}{naive_time * 1e3:>12.2f}"
+            f"{naive_time / fast_time:>9.1f}x  {'yes' if agree else 'NO'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Function Cache Benchmark
+Times scientific_function and power over inputs with repeated values - the
+pattern of repeated function presses and of batch columns with few distinct
+values - with the in-memory function cache and without it, and checks that
+both give the same results.
+
+Usage:
+    python -m benchmarks.bench_memo [--calls 20000] [--distinct 50]
+"""
+
+import argparse
+import random
+import sys
+import time
+from decimal import Decimal
+
+from calculator_engine import CalculatorEngine
+from calculator_memo import FunctionCache
+
+# (label, number mode, precision, call kind, function, value range)
+SCENARIOS = [
+    ("float sqrt", "float", 10, "function", "sqrt", (1, 10000)),
+    ("float factorial", "float", 10, "function", "factorial", (500, 1500)),
+    ("float power 3^n", "float", 10, "power", 3, (5000, 20000)),
+    ("decimal ln", "decimal", 10, "function", "ln", (1, 10000)),
+    ("decimal exp", "decimal", 10, "function", "exp", (1, 200)),
+    ("precision 50 exp", "float", 50, "function", "exp", (1, 200)),
+    ("decimal sin", "decimal", 10, "function", "sin", (0, 360)),
+]
+
+
+def _inputs(mode, value_range, calls, distinct, seed=0):
+    rng = random.Random(seed)
+    low, high = value_range
+    pool = rng.sample(range(low, high), distinct)
+    if mode == "decimal":
+        pool = [Decimal(value) for value in pool]
+    return [rng.choice(pool) for _ in range(calls)]
+
+
+def _run(engine, kind, function, values):
+    start = time.perf_counter()
+    if kind == "power":
+        results = [engine.power(function, value) for value in values]
+    else:
+        results = [engine.scientific_function(function, value) for value in values]
+    return time.perf_counter() - start, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--distinct", type=int, default=50, help="distinct input values")
+    args = parser.parse_args(argv)
+
+    print(f"{args.calls:,} calls over {args.distinct} distinct values")
+    print(f"{'scenario':<18}{'cached':>12}{'uncached':>12}{'speedup':>9}{'hit rate':>10}")
+    failed = False
+    for label, mode, precision, kind, function, value_range in SCENARIOS:
+        values = _inputs(mode, value_range, args.calls, args.distinct)
+        cache = FunctionCache()
+        cached = CalculatorEngine(number_mode=mode, precision=precision)
+        cached.set_function_cache(cache)
+        plain = CalculatorEngine(number_mode=mode, precision=precision)
+        plain.set_function_cache(None)
+        cached_time, cached_results = _run(cached, kind, function, values)
+        plain_time, plain_results = _run(plain, kind, function, values)
+        if cached_results != plain_results:
+            print(f"MISMATCH {label}", file=sys.stderr)
+            failed = True
+        info = cache.info()
+        lookups = info["hits"] + info["misses"]
+        hit_rate = f"{info['hits'] / lookups:.0%}" if lookups else "off"
+        print(f"{label:<18}{cached_time / args.calls * 1e6:>10.2f}us"
+              f"{plain_time / args.calls * 1e6:>10.2f}us{plain_time / cached_time:>8.1f}x"
+              f"{hit_rate:>10}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
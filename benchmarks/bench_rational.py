@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Rational Mode Benchmark
+Times calculation chains of increasing length: lazily reduced Rational
+arithmetic against eagerly reduced fractions.Fraction, then the same chains
+typed through the engine in rational, decimal and float modes.
+
+Usage:
+    python -m benchmarks.bench_rational [--lengths 10 100 1000 5000]
+
+Two chains are run: "cents" adds and subtracts prices in hundredths (shared
+denominators, the common case), "mixed" divides and multiplies by small
+integers so denominators really grow.
+"""
+
+import argparse
+import sys
+import time
+from decimal import Decimal
+from fractions import Fraction
+
+from calculator_engine import CalculatorEngine
+from calculator_rational import Rational
+
+
+def _chain(kind, length):
+    """(operation, operand text) pairs for a chain"""
+    steps = []
+    for i in range(length):
+        if kind == "cents":
+            steps.append(("+-"[i % 3 == 2], f"{(i * 37) % 10000 / 100:.2f}"))
+        else:
+            steps.append(("*/+-"[i % 4], str(i % 9 + 2)))
+    return steps
+
+
+def _apply(value, operation, operand):
+    if operation == "+":
+        return value + operand
+    if operation == "-":
+        return value - operand
+    if operation == "*":
+        return value * operand
+    return value / operand
+
+
+def _run_numbers(number_type, steps):
+    """The chain on bare numbers, starting from 1"""
+    operands = [(operation, number_type.from_value(Decimal(text)) if number_type is Rational
+                 else number_type(text)) for operation, text in steps]
+    start = time.perf_counter()
+    value = number_type(1)
+    for operation, operand in operands:
+        value = _apply(value, operation, operand)
+    return time.perf_counter() - start, value
+
+
+def _run_engine(mode, steps):
+    """The chain as keystrokes: 1 op0 x0 op1 x1 ... ="""
+    engine = CalculatorEngine(number_mode=mode)
+    convert = float if mode == "float" else Decimal
+    operations = [operation for operation, _ in steps]
+    operands = [convert(text) for _, text in steps]
+    start = time.perf_counter()
+    engine.operator(operations[0], convert("1"))
+    for operation, operand in zip(operations[1:], operands):
+        engine.operator(operation, operand)
+    result = engine.calculate(operands[-1])
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    args = parser.parse_args(argv)
+
+    print(f"{'chain':<8}{'length':>8}{'Rational':>12}{'Fraction':>12}"
+          f"{'| engine:':>10}{'rational':>11}{'decimal':>12}{'float':>12}   exact")
+    for kind in ("cents", "mixed"):
+        for length in args.lengths:
+            steps = _chain(kind, length)
+            rational_time, rational = _run_numbers(Rational, steps)
+            fraction_time, fraction = _run_numbers(Fraction, steps)
+            engine_time, engine_result = _run_engine("rational", steps)
+            decimal_time, _ = _run_engine("decimal", steps)
+            float_time, _ = _run_engine("float", steps)
+            exact = rational == fraction and Rational.from_value(engine_result) == fraction
+            print(f"{kind:<8}{length:>8}{rational_time * 1e3:>10.2f}ms{fraction_time * 1e3:>10.2f}ms"
+                  f"{'':>10}{engine_time * 1e3:>9.2f}ms{decimal_time * 1e3:>10.2f}ms"
+                  f"{float_time * 1e3:>10.2f}ms   {'yes' if exact else 'NO'}")
+            if not exact:
+                print(f"MISMATCH {kind} {length}: {engine_result!r} != {fraction}", file=sys.stderr)
+                return 1
+
+    # Display is the only rounding step
+    engine = CalculatorEngine(number_mode="rational")
+    engine.operator("/", 1)
+    engine.operator("*", 3)
+    print(f"1 / 3 * 3 = {engine.format_number(engine.calculate(3))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Session Benchmark
+Measures memory per live and per evicted session, snapshot size, and the
+latency of snapshot(), restore() and a SessionPool fault-in from disk, and
+checks that an engine restored from another number mode's snapshot
+evaluates expressions like a fresh engine in that mode.
+
+Usage:
+    python -m benchmarks.bench_sessions [--sessions 100000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from calculator_engine import NUMBER_MODES, CalculatorEngine
+from calculator_sessions import SessionPool
+
+
+def _busy_engine(i):
+    """An engine mid-calculation, like an idle user between keystrokes"""
+    engine = CalculatorEngine()
+    engine.operator("+", i * 1.25)
+    engine.operator("*", 3)
+    return engine
+
+
+def memory_per_live_session(count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    engines = [_busy_engine(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del engines
+    return (after - before) / count
+
+
+def pool_measurements(count, path):
+    """Evict every session to disk, then fault a sample back in"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    pool = SessionPool(path, max_live=count)
+    for i in range(count):
+        session = pool.get(f"user-{i}")
+        session.operator("+", i * 1.25)
+        session.operator("*", 3)
+    live = tracemalloc.get_traced_memory()[0]
+
+    pool.evict_idle(now=pool.clock() + pool.idle_seconds + 1)
+    evicted = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    disk = os.path.getsize(path) / count
+
+    # Latencies are timed without tracemalloc's overhead
+    sample = [f"user-{i}" for i in range(0, count, max(1, count // 1000))]
+    start = time.perf_counter()
+    for session_id in sample:
+        pool.get(session_id)
+    fault_time = (time.perf_counter() - start) / len(sample)
+    start = time.perf_counter()
+    pool.evict_idle(now=pool.clock() + pool.idle_seconds + 1)
+    evict_time = (time.perf_counter() - start) / len(sample)
+    pool.close()
+    return ((live - before) / count, (evicted - before) / count, disk,
+            evict_time, fault_time)
+
+
+# Expressions whose value depends on the number mode
+ROUND_TRIP_EXPRESSIONS = ["1/3*3", "0.1+0.2", "2^0.5", "1e-20+1"]
+
+
+def check_round_trips():
+    """
+    Restore every mode's snapshot into an engine that has compiled the
+    expressions in every other mode
+    Returns:
+        Number of results that differ from a fresh engine in the snapshot's mode
+    """
+    mismatches = 0
+    for source_mode in NUMBER_MODES:
+        for target_mode in NUMBER_MODES:
+            expected = CalculatorEngine(number_mode=target_mode)
+            engine = CalculatorEngine(number_mode=source_mode)
+            for expression in ROUND_TRIP_EXPRESSIONS:
+                engine.evaluate(expression)
+            engine.restore(expected.snapshot())
+            for expression in ROUND_TRIP_EXPRESSIONS:
+                result = engine.evaluate(expression)
+                if result != expected.evaluate(expression):
+                    print(f"MISMATCH {source_mode} -> {target_mode} {expression}: {result!r}",
+                          file=sys.stderr)
+                    mismatches += 1
+    return mismatches
+
+
+def _per_call(func, loops=20000):
+    start = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return (time.perf_counter() - start) / loops
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    engine = _busy_engine(7)
+    data = engine.snapshot()
+    target = CalculatorEngine()
+
+    engine_only = memory_per_live_session(args.sessions)
+    with tempfile.TemporaryDirectory() as directory:
+        live, evicted, disk, evict, fault = pool_measurements(
+            args.sessions, os.path.join(directory, "sessions.db")
+        )
+
+    print(f"{'snapshot size':<32}{len(data):>10} B")
+    print(f"{'engine memory':<32}{engine_only:>10.0f} B")
+    print(f"{'live pooled session memory':<32}{live:>10.0f} B")
+    print(f"{'evicted session memory':<32}{evicted:>10.0f} B  (store index entry)")
+    print(f"{'evicted session on disk':<32}{disk:>10.0f} B")
+    print(f"{'snapshot()':<32}{_per_call(engine.snapshot) * 1e6:>10.2f} µs")
+    print(f"{'restore()':<32}{_per_call(lambda: target.restore(data)) * 1e6:>10.2f} µs")
+    print(f"{'from_snapshot()':<32}"
+          f"{_per_call(lambda: CalculatorEngine.from_snapshot(data)) * 1e6:>10.2f} µs")
+    print(f"{'evict to disk (per session)':<32}{evict * 1e6:>10.2f} µs")
+    print(f"{'fault in from disk':<32}{fault * 1e6:>10.2f} µs")
+    return 1 if check_round_trips() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Shared Memory Scaling Benchmark
+Times calculator_shared over 1..N worker processes for sqrt, ln, exp, power
+and the four binary operators, and reports speedup and parallel efficiency
+against one worker. Every worker count must give results identical to the
+single-worker run.
+
+Usage:
+    python -m benchmarks.bench_shared [--size 2000000] [--workers 8] [--repeat 3]
+
+Operands are placed in shared memory once; pools are started before timing,
+so the figures are evaluation time only. Results are only meaningful on a
+machine with that many free cores.
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+
+from calculator_batch import has_numpy
+from calculator_shared import SharedArray, default_workers, shared_binary, shared_function, shutdown
+
+FUNCTIONS = ("sqrt", "ln", "exp")
+OPERATIONS = ("power", "+", "-", "*", "/")
+
+
+def _operands(size, seed=0):
+    """Positive first operands (in every function's domain) and small exponents"""
+    rng = random.Random(seed)
+    first = [rng.uniform(0.001, 100.0) for _ in range(size)]
+    second = [rng.uniform(-4.0, 4.0) for _ in range(size)]
+    return SharedArray.from_values(first), SharedArray.from_values(second)
+
+
+def _evaluate(name, first, second, workers):
+    if name in FUNCTIONS:
+        return shared_function(name, first, workers)
+    return shared_binary(name, first, second, workers)
+
+
+def _time(name, first, second, workers, repeat):
+    """Best time of repeat runs and the (results, mask) of the last one"""
+    best = math.inf
+    outputs = None
+    for _ in range(repeat):
+        if outputs is not None:
+            for output in outputs:
+                output.close()
+        start = time.perf_counter()
+        outputs = _evaluate(name, first, second, workers)
+        best = min(best, time.perf_counter() - start)
+    return best, outputs
+
+
+def _same(outputs, reference):
+    """Equal results (NaN where either mask is set) and equal masks"""
+    results, mask = outputs
+    expected, expected_mask = reference
+    if mask.tolist() != expected_mask.tolist():
+        return False
+    return all(a == b or flag for a, b, flag in zip(results, expected, mask))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=2_000_000 if has_numpy() else 500_000)
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="largest worker count (default: CPU count)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--operations", nargs="+", default=list(FUNCTIONS + OPERATIONS),
+                        choices=FUNCTIONS + OPERATIONS)
+    args = parser.parse_args(argv)
+
+    first, second = _operands(args.size)
+    counts = range(1, args.workers + 1)
+    print(f"{args.size:,} elements, {'NumPy' if has_numpy() else 'plain Python'} batch path, "
+          f"{default_workers()} CPUs")
+    # Start every pool up front so process start-up is not timed
+    for workers in counts[1:]:
+        for output in _evaluate("+", first, second, workers):
+            output.close()
+
+    header = "".join(f"{workers:>10}w" for workers in counts)
+    print(f"{'operation':<10}{header}   speedup  efficiency")
+    failed = False
+    try:
+        for name in args.operations:
+            times = []
+            reference = None
+            for workers in counts:
+                elapsed, outputs = _time(name, first, second, workers, args.repeat)
+                times.append(elapsed)
+                if reference is None:
+                    reference = outputs
+                    continue
+                if not _same(outputs, reference):
+                    print(f"MISMATCH {name} with {workers} workers", file=sys.stderr)
+                    failed = True
+                for output in outputs:
+                    output.close()
+            for output in reference:
+                output.close()
+            speedup = times[0] / times[-1]
+            cells = "".join(f"{elapsed * 1e3:>9.1f}ms" for elapsed in times)
+            print(f"{name:<10}{cells}   {speedup:>6.2f}x  {speedup / len(times):>9.0%}")
+    finally:
+        first.close()
+        second.close()
+        shutdown()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
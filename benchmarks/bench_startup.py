@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Measures cold-start time of the calculator entry points in fresh interpreters
+and prints a `python -X importtime` breakdown of the heaviest imports.
+
+Scenarios:
+    engine     import calculator_engine
+    headless   evaluate one expression through calculator_cli
+    gui        construct AdvancedCalculator and draw the first frame
+               (skipped when no display is available)
+
+Besides timing, the run fails (exit status 1) when a startup guard is broken:
+the engine and headless paths must not import tkinter, and importing config
+must not read the configuration file. --budget-ms additionally fails any
+scenario whose median exceeds the budget.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs N] [--top N] [--budget-ms MS]
+"""
+
+import argparse
+import compileall
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Exit status a scenario uses to report that it cannot run here
+SKIP_STATUS = 3
+
+SCENARIOS = {
+    "engine": "import calculator_engine",
+    "headless": (
+        "import io, sys\n"
+        "sys.stdin = io.StringIO('2 * sqrt(16) + 1\\n')\n"
+        "import calculator_cli\n"
+        "calculator_cli.main([])\n"
+    ),
+    "gui": (
+        "import sys, tkinter\n"
+        "try:\n"
+        "    from calculator import AdvancedCalculator\n"
+        "    calculator = AdvancedCalculator()\n"
+        "except tkinter.TclError:\n"
+        f"    sys.exit({SKIP_STATUS})\n"
+        "calculator.root.update()\n"
+        "calculator.root.destroy()\n"
+    ),
+}
+
+# Modules that must not be imported by a scenario
+FORBIDDEN_IMPORTS = {
+    "engine": ("tkinter",),
+    "headless": ("tkinter",),
+}
+
+CONFIG_GUARD = (
+    "import config\n"
+    "assert not config.config.loaded, 'config was read at import time'\n"
+)
+
+
+def _run(code, extra_args=()):
+    command = [sys.executable, *extra_args, "-c", code]
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    return time.perf_counter() - start, completed
+
+
+def time_scenario(code, runs):
+    """
+    Time a scenario in fresh interpreters
+    Returns:
+        Sorted list of wall-clock seconds, or None if the scenario skipped itself
+    Raises:
+        RuntimeError: If the scenario fails
+    """
+    timings = []
+    for _ in range(runs):
+        elapsed, completed = _run(code)
+        if completed.returncode == SKIP_STATUS:
+            return None
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+        timings.append(elapsed)
+    return sorted(timings)
+
+
+def import_breakdown(code):
+    """
+    Collect `-X importtime` data for a scenario
+    Returns:
+        List of (module, self_us, cumulative_us) in import order
+    """
+    _, completed = _run(code, ("-X", "importtime"))
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure calculator cold-start time.")
+    parser.add_argument("--runs", type=int, default=5, help="interpreter launches per scenario")
+    parser.add_argument("--top", type=int, default=12, help="heaviest imports to list")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="fail when a scenario's median exceeds this")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="run only this scenario (repeatable)")
+    args = parser.parse_args(argv)
+
+    # Measure with bytecode in place, as an installed copy would start
+    compileall.compile_dir(ROOT, maxlevels=0, quiet=1)
+    baseline, _ = _run("pass")
+    print(f"Interpreter baseline: {baseline * 1000:.1f} ms")
+
+    failures = []
+    _, completed = _run(CONFIG_GUARD)
+    if completed.returncode != 0:
+        failures.append("config: configuration file read at import time")
+
+    for name in args.scenario or SCENARIOS:
+        code = SCENARIOS[name]
+        timings = time_scenario(code, max(1, args.runs))
+        if timings is None:
+            print(f"\n{name}: skipped (no display)")
+            continue
+        median = timings[len(timings) // 2]
+        print(f"\n{name}: median {median * 1000:.1f} ms, best {timings[0] * 1000:.1f} ms")
+        if args.budget_ms is not None and median * 1000 > args.budget_ms:
+            failures.append(f"{name}: {median * 1000:.1f} ms exceeds {args.budget_ms:g} ms budget")
+
+        modules = import_breakdown(code)
+        imported = {module for module, _, _ in modules}
+        for forbidden in FORBIDDEN_IMPORTS.get(name, ()):
+            if forbidden in imported:
+                failures.append(f"{name}: imports {forbidden}")
+
+        heaviest = sorted(modules, key=lambda m: m[2], reverse=True)[:args.top]
+        print(f"  {'module':<32}{'self ms':>10}{'cumul. ms':>12}")
+        for module, self_us, cumulative_us in heaviest:
+            print(f"  {module:<32}{self_us / 1000:>10.2f}{cumulative_us / 1000:>12.2f}")
+
+    for failure in failures:
+        print(f"FAILED {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
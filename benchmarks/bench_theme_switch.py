@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Theme Switch Benchmark
+Reports how many style options each theme switch sends to Tk and, when a
+display is available, times switches on a real window with the calculator's
+widgets.
+
+Usage:
+    python -m benchmarks.bench_theme_switch [--switches N]
+"""
+
+import argparse
+import time
+import tkinter as tk
+from itertools import permutations
+
+from calculator_theme import CalculatorTheme, style_changes
+
+
+def option_counts(theme):
+    """Options sent by a full apply and by each switch between built-in themes"""
+    names = theme.get_available_themes()
+    full = len(theme.compiled_theme(names[0]))
+    switches = {}
+    for old, new in permutations(names, 2):
+        changes = style_changes(theme.compiled_theme(old), theme.compiled_theme(new))
+        switches[(old, new)] = sum(len(options) for options in changes.values())
+    return full, switches
+
+
+def time_switches(switches):
+    """
+    Time theme switches on a real calculator window
+    Returns:
+        Mean milliseconds per switch (including the redraw), or None without a display
+    """
+    try:
+        from calculator import AdvancedCalculator
+        calculator = AdvancedCalculator()
+    except tk.TclError:
+        return None
+    root = calculator.root
+    names = calculator.theme.get_available_themes()
+    root.update()
+    start = time.perf_counter()
+    for i in range(switches):
+        calculator.theme.apply_theme(root, names[i % len(names)])
+        root.update()
+    elapsed = time.perf_counter() - start
+    root.destroy()
+    return elapsed / switches * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure theme switching cost.")
+    parser.add_argument("--switches", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    full, switches = option_counts(CalculatorTheme())
+    print(f"Full apply: {full} options")
+    for (old, new), count in switches.items():
+        print(f"  {old:>6} -> {new:<6} {count:>3} options")
+
+    mean_ms = time_switches(max(1, args.switches))
+    if mean_ms is None:
+        print("Timing skipped (no display)")
+    else:
+        print(f"Mean switch with redraw: {mean_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
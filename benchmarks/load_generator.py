@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Calculator Server Load Generator
+Opens concurrent connections to calculator_server and reports latency
+percentiles and throughput.
+
+Usage:
+    python -m benchmarks.load_generator --spawn --connections 64 --requests 2000
+    python -m benchmarks.load_generator --host 127.0.0.1 --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+from calculator_server import DEFAULT_HOST, DEFAULT_PORT
+
+# Request mix: mostly batched stateless calls plus some session traffic
+REQUEST_MIX = (
+    ("compute", lambda: {"operation": random.choice("+-*/"),
+                         "a": random.uniform(-1000, 1000), "b": random.uniform(1, 1000)}),
+    ("scientific_function", lambda: {"function": random.choice(("sqrt", "ln", "exp", "sin")),
+                                     "value": random.uniform(0.1, 50)}),
+    ("evaluate", lambda: {"expression": "x * 1.17 + sqrt(y)",
+                          "variables": {"x": random.uniform(0, 100), "y": random.uniform(0, 100)}}),
+)
+MIX_WEIGHTS = (6, 3, 1)
+
+
+async def _client(host, port, unix_path, requests, pipeline, latencies, errors):
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    sent = {}
+    next_id = 0
+    done = 0
+    while done < requests:
+        # Keep up to `pipeline` requests outstanding on this connection
+        while len(sent) < pipeline and next_id < requests:
+            method, make_params = random.choices(REQUEST_MIX, MIX_WEIGHTS)[0]
+            request = {"id": next_id, "method": method, "params": make_params()}
+            sent[next_id] = time.perf_counter()
+            writer.write(json.dumps(request).encode() + b"\n")
+            next_id += 1
+        await writer.drain()
+
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - sent.pop(response["id"]))
+        if "error" in response:
+            errors.append(response["error"])
+        done += 1
+
+    writer.close()
+    await writer.wait_closed()
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run_load(host, port, unix_path, connections, requests, pipeline):
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, unix_path, requests, pipeline, latencies, errors)
+        for _ in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+async def _wait_for_server(host, port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for calculator_server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", dest="unix_path")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per connection")
+    parser.add_argument("--pipeline", type=int, default=1,
+                        help="outstanding requests per connection")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start a local server subprocess for the run")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn:
+        command = [sys.executable, "calculator_server.py", "--port", str(args.port)]
+        if args.unix_path:
+            command += ["--unix", args.unix_path]
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    try:
+        if server is not None and not args.unix_path:
+            asyncio.run(_wait_for_server(args.host, args.port))
+        elif server is not None:
+            time.sleep(0.5)
+        latencies, errors, elapsed = asyncio.run(run_load(
+            args.host, args.port, args.unix_path,
+            args.connections, args.requests, args.pipeline
+        ))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"requests:     {total}")
+    print(f"errors:       {len(errors)}")
+    print(f"elapsed:      {elapsed:.2f} s")
+    print(f"throughput:   {total / elapsed:,.0f} req/s")
+    print(f"latency p50:  {_percentile(latencies, 0.50) * 1000:.3f} ms")
+    print(f"latency p99:  {_percentile(latencies, 0.99) * 1000:.3f} ms")
+    print(f"latency max:  {latencies[-1] * 1000:.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Engine Thread Stress Test
+Hammers many engines - some shared between threads, some per thread - from
+a thread pool whose threads use deliberately wrong default decimal contexts,
+and checks every result against a single-threaded reference run.
+
+Usage:
+    python -m benchmarks.stress_threads [--threads 16] [--rounds 200] [--function-cache]
+
+Engines compute every call unless --function-cache is given; then the
+threads share one calculator_memo.FunctionCache while the reference run
+still computes everything.
+
+Exit status is 1 when any result, counter or cache differs from the reference.
+"""
+
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, getcontext
+
+from calculator_engine import CalculatorEngine
+from calculator_memo import FunctionCache
+
+# (number mode, precision) of the engines under test
+ENGINE_SETTINGS = [
+    ("float", 10), ("decimal", 10), ("decimal", 28), ("decimal", 60), ("float", 40),
+    ("rational", 10),
+]
+
+OPERANDS = ["1234.5678", "3", "0.1", "0.2", "98765.4321", "7", "1e-9", "2.5"]
+FUNCTIONS = ["sqrt", "ln", "exp", "reciprocal", "percent", "abs", "factorial"]
+EXPRESSIONS = ["x * (1 + r / 100) ^ 12", "sqrt(x) - -x / 3", "ln(x + 1) * exp(r / 50)"]
+
+
+def _value(engine, text):
+    return float(text) if engine.number_mode == "float" else Decimal(text)
+
+
+def run_engine(engine, seed):
+    """
+    Drive one engine through keystroke-like chains, functions and expressions
+    Returns:
+        List of results (exceptions recorded by type name)
+    """
+    rng = random.Random(seed)
+    results = []
+
+    def record(func, *args):
+        try:
+            results.append(func(*args))
+        except (ValueError, ZeroDivisionError) as e:
+            results.append(type(e).__name__)
+
+    engine.clear()
+    for _ in range(12):
+        record(engine.operator, rng.choice("+-*/"), _value(engine, rng.choice(OPERANDS)))
+    record(engine.calculate, _value(engine, rng.choice(OPERANDS)))
+    for function in FUNCTIONS:
+        value = 20 if function == "factorial" else _value(engine, rng.choice(OPERANDS))
+        record(engine.scientific_function, function, value)
+    record(engine.power, _value(engine, "1.0001"), 5000)
+    for expression in EXPRESSIONS:
+        record(engine.evaluate, expression,
+               {"x": _value(engine, rng.choice(OPERANDS)), "r": _value(engine, "7.25")})
+    return results
+
+
+def _scramble_context(seed):
+    """Give the calling thread a default context unlike the main thread's"""
+    context = getcontext()
+    context.prec = 3 + seed % 7
+    context.Emax = 999
+
+
+def _engine(mode, precision, function_cache=None):
+    engine = CalculatorEngine(number_mode=mode, precision=precision)
+    engine.set_function_cache(function_cache)
+    return engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--function-cache", action="store_true",
+                        help="threads share one in-memory function cache")
+    args = parser.parse_args(argv)
+    cache = FunctionCache() if args.function_cache else None
+
+    engines = [_engine(mode, precision, cache) for mode, precision in ENGINE_SETTINGS]
+    for engine in engines:
+        engine.enable_instrumentation()
+    seeds = range(args.rounds)
+    reference = {(i, seed): run_engine(_engine(mode, precision), seed)
+                 for i, (mode, precision) in enumerate(ENGINE_SETTINGS) for seed in seeds}
+
+    def private_task(seed):
+        # Each task owns its engines, so stateful chains are deterministic
+        _scramble_context(seed)
+        return [(i, seed, run_engine(_engine(mode, precision, cache), seed))
+                for i, (mode, precision) in enumerate(ENGINE_SETTINGS)]
+
+    def shared_calls(engine, seed):
+        x = _value(engine, random.Random(seed).choice(OPERANDS))
+        return (engine.evaluate(EXPRESSIONS[seed % 3], {"x": x, "r": 7}),
+                engine.scientific_function("sqrt", x), x)
+
+    shared_reference = {
+        (i, seed): shared_calls(_engine(mode, precision), seed)[:2]
+        for i, (mode, precision) in enumerate(ENGINE_SETTINGS) for seed in seeds
+    }
+
+    def shared_task(seed):
+        # Stateless calls on engines every thread uses at once
+        _scramble_context(seed)
+        outcomes = []
+        for i, engine in enumerate(engines):
+            evaluated, root, x = shared_calls(engine, seed)
+            outcomes.append((evaluated, root) == shared_reference[(i, seed)])
+            engine.operator("+", x)  # shared state: must not corrupt, result unchecked
+        return outcomes
+
+    failures = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        private = executor.map(private_task, seeds)
+        shared = executor.map(shared_task, seeds)
+        for batch in private:
+            for i, seed, results in batch:
+                if results != reference[(i, seed)]:
+                    failures += 1
+                    print(f"MISMATCH engine {ENGINE_SETTINGS[i]} seed {seed}", file=sys.stderr)
+        failures += sum(not ok for outcomes in shared for ok in outcomes)
+
+        # The parallel batch API must match the sequential scalar path
+        for mode, precision in ENGINE_SETTINGS:
+            engine = _engine(mode, precision, cache)
+            values = [_value(engine, OPERANDS[i % 8]) for i in range(5000)]
+            parallel, errors = engine.parallel_scientific_function("ln", values, workers=args.threads)
+            if parallel != [engine.scientific_function("ln", v) for v in values] or any(errors):
+                failures += 1
+                print(f"MISMATCH parallel ln {mode} {precision}", file=sys.stderr)
+            parallel, _ = engine.parallel_calculation("/", values, 7, workers=args.threads)
+            if parallel != [engine._perform_calculation(v, 7, "/") for v in values]:
+                failures += 1
+                print(f"MISMATCH parallel / {mode} {precision}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    # Every instrumented call must have been counted exactly once
+    for engine in engines:
+        counted = engine.metrics_snapshot()["operator[+]"]["count"]
+        if counted != args.rounds:
+            failures += 1
+            print(f"LOST METRICS {engine.number_mode} {engine.precision}: {counted}", file=sys.stderr)
+
+    checks = args.rounds * len(ENGINE_SETTINGS) * 3
+    print(f"{checks} checks on {args.threads} threads in {elapsed:.2f}s: "
+          f"{'OK' if not failures else f'{failures} FAILED'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Engine Micro-Benchmark Suite
+Times every engine entry point plus full keystroke sequences through the
+calculator's controller logic, writes machine-readable results and compares
+them with a stored baseline.
+
+Usage:
+    python -m benchmarks                       # run, compare with baseline
+    python -m benchmarks --update-baseline     # record a new baseline
+    python -m benchmarks --threshold 15 --output results.json --filter sci
+
+Exit status is 1 when any benchmark is slower than the baseline by more than
+the threshold percentage. Baselines are machine specific - record one on the
+box that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+from calculator_engine import CalculatorEngine
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 25.0  # percent
+DEFAULT_MIN_TIME = 0.1    # seconds per timing run
+REPEATS = 5
+
+
+class Benchmark:
+    """A named callable timed in a tight loop"""
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+
+
+def _engine_benchmarks():
+    engine = CalculatorEngine()
+    benchmarks = []
+
+    for operation in ("+", "-", "*", "/"):
+        benchmarks.append(Benchmark(
+            f"perform_calculation[{operation}]",
+            lambda op=operation: engine._perform_calculation(1234.5678, 3.21, op)
+        ))
+
+    # One representative in-domain input per scientific_function branch
+    inputs = {
+        "sqrt": 2.0, "square": 12.5, "reciprocal": 7.0, "sin": 30.0,
+        "cos": 60.0, "tan": 45.0, "log": 1234.5, "ln": 1234.5,
+        "exp": 3.5, "factorial": 20, "abs": -42.5, "percent": 17.5,
+    }
+    for function, value in inputs.items():
+        benchmarks.append(Benchmark(
+            f"scientific_function[{function}]",
+            lambda f=function, v=value: engine.scientific_function(f, v)
+        ))
+
+    benchmarks.append(Benchmark("power[int]", lambda: engine.power(2, 10)))
+    benchmarks.append(Benchmark("power[float]", lambda: engine.power(1.5, 2.5)))
+    benchmarks.append(Benchmark(
+        "percentage_calculation", lambda: engine.percentage_calculation(250.0, 17.5)
+    ))
+    benchmarks.append(Benchmark("format_number[int]", lambda: engine.format_number(42)))
+    benchmarks.append(Benchmark("format_number[float]", lambda: engine.format_number(3.14159)))
+    benchmarks.append(Benchmark(
+        "format_number[decimal]", lambda: engine.format_number(Decimal("3.14159"))
+    ))
+    return benchmarks
+
+
+class _IdleRoot:
+    """Stand-in for the Tk root: after_idle callbacks run when idle() is called"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after_idle(self, func):
+        self.pending.append(func)
+
+    def idle(self):
+        pending, self.pending = self.pending, []
+        for func in pending:
+            func()
+
+
+class _TextVar:
+    """Stand-in for tk.StringVar so the controller logic runs without a display"""
+
+    def __init__(self, value=""):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+
+
+def _headless_calculator():
+    """AdvancedCalculator with its Tk pieces replaced by plain Python state"""
+    from calculator import AdvancedCalculator
+    from calculator_controller import CalculatorController
+    from calculator_history import HistoryBuffer
+
+    calculator = AdvancedCalculator.__new__(AdvancedCalculator)
+    calculator.root = _IdleRoot()
+    calculator.engine = CalculatorEngine()
+    calculator.display_var = _TextVar("0")
+    calculator.history_var = _TextVar("")
+    calculator.memory_value = 0
+    calculator.history = HistoryBuffer()
+    calculator.controller = CalculatorController(calculator.engine, calculator.history)
+    calculator._display_flush_pending = False
+    calculator._history_text = ""
+    return calculator
+
+
+# Keystroke sequences replayed through the controller methods
+KEYSTROKE_SEQUENCES = {
+    "chain": "12+34*5-6/7=",
+    "decimals": "3.14159*2.71828=",
+    "backspace": "123456\b\b\b789=",
+    "scientific": "144Sr",  # S = sqrt, r = reciprocal
+}
+
+
+# Clipboard text entered in one go (Ctrl+V or a barcode scanner)
+PASTE_INPUTS = {
+    "number": "31415926535.8979323846",
+    "expression": "(1234.5 + 678.9) * 3 / sqrt(16)",
+}
+
+
+def _keystroke_benchmarks():
+    try:
+        calculator = _headless_calculator()
+    except ImportError as e:
+        # calculator.py needs tkinter importable even though no window is created
+        print(f"Skipping keystroke benchmarks: {e}", file=sys.stderr)
+        return []
+
+    handlers = {
+        "+": lambda: calculator.operator("+"),
+        "-": lambda: calculator.operator("-"),
+        "*": lambda: calculator.operator("*"),
+        "/": lambda: calculator.operator("/"),
+        "=": calculator.calculate,
+        ".": calculator.decimal_point,
+        "\b": calculator.backspace,
+        "S": lambda: calculator.scientific_function("sqrt"),
+        "r": lambda: calculator.scientific_function("reciprocal"),
+    }
+    for digit in "0123456789":
+        handlers[digit] = lambda d=digit: calculator.number_input(d)
+
+    benchmarks = []
+    for name, keys in KEYSTROKE_SEQUENCES.items():
+        actions = [handlers[key] for key in keys]
+
+        def replay(actions=actions):
+            calculator.clear()
+            for action in actions:
+                action()
+            # One idle tick, as Tk would run after a burst of key events
+            calculator.root.idle()
+        benchmarks.append(Benchmark(f"keystrokes[{name}]", replay))
+
+    for name, text in PASTE_INPUTS.items():
+        def paste(text=text):
+            calculator.clear()
+            calculator.input_text(text)
+            calculator.root.idle()
+        benchmarks.append(Benchmark(f"paste[{name}]", paste))
+    return benchmarks
+
+
+def all_benchmarks():
+    return _engine_benchmarks() + _keystroke_benchmarks()
+
+
+def _time_loop(func, loops):
+    start = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return time.perf_counter() - start
+
+
+def measure(benchmark, min_time=DEFAULT_MIN_TIME):
+    """
+    Time one benchmark
+    Returns:
+        Dictionary with ns_per_op, ops_per_sec, loops and alloc_peak_bytes
+    """
+    func = benchmark.func
+    func()  # warm up (and fail fast)
+
+    # Calibrate the loop count so one timing run takes at least min_time
+    loops = 1
+    while True:
+        elapsed = _time_loop(func, loops)
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    best = min(_time_loop(func, loops) for _ in range(REPEATS)) / loops
+
+    # Peak transient memory of a single call
+    peaks = []
+    for _ in range(5):
+        tracemalloc.start()
+        try:
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "ns_per_op": round(best * 1e9, 1),
+        "ops_per_sec": round(1 / best) if best else None,
+        "loops": loops,
+        "alloc_peak_bytes": sorted(peaks)[len(peaks) // 2],
+    }
+
+
+def run(benchmarks, min_time=DEFAULT_MIN_TIME, log=None):
+    results = {}
+    for benchmark in benchmarks:
+        results[benchmark.name] = measure(benchmark, min_time)
+        if log is not None:
+            result = results[benchmark.name]
+            log(f"{benchmark.name:<34}{result['ns_per_op']:>12,.0f} ns/op"
+                f"{result['ops_per_sec']:>14,} ops/s{result['alloc_peak_bytes']:>10} B")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline
+    Returns:
+        List of (name, baseline_ns, current_ns, change_percent) regressions
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        change = (result["ns_per_op"] / previous["ns_per_op"] - 1) * 100
+        if change > threshold:
+            regressions.append((name, previous["ns_per_op"], result["ns_per_op"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Run the calculator micro-benchmark suite."
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown in percent before failing")
+    parser.add_argument("--output", help="write results JSON to this file")
+    parser.add_argument("--filter", default="", help="only run benchmarks containing this text")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME,
+                        help="minimum seconds per timing run")
+    args = parser.parse_args(argv)
+
+    benchmarks = [b for b in all_benchmarks() if args.filter in b.name]
+    results = run(benchmarks, args.min_time, log=print)
+    document = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    except (IOError, ValueError, KeyError):
+        print(f"No usable baseline at {args.baseline}; run with --update-baseline")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, before, after, change in regressions:
+        print(f"REGRESSION {name}: {before:,.0f} -> {after:,.0f} ns/op (+{change:.1f}%)")
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.threshold:g}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
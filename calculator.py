@@ -4,42 +4,99 @@ Advanced Calculator Application
 Main application file with rich UI and comprehensive functionality
 """
 
+import sys
+
+if __name__ == "__main__" and sys.argv[1:2] == ["--batch"]:
+    # Headless batch mode: python calculator.py --batch [options] [input]
+    # Dispatched before tkinter is imported, so it starts fast and works
+    # on machines without Tk or a display
+    from calculator_cli import main
+    sys.exit(main(sys.argv[2:]))
+
 import tkinter as tk
-from tkinter import ttk, messagebox
-import math
-from decimal import Decimal, InvalidOperation
+from tkinter import ttk
+from calculator_controller import CalculatorController
 from calculator_engine import CalculatorEngine
+from calculator_history import HistoryBuffer, HistoryJournal
+from calculator_search import HistoryIndex
 from calculator_theme import CalculatorTheme
+from calculator_worker import (
+    check_expression_size, check_result_size, expression_is_long_running, is_long_running
+)
+from config import Constants, config
+
+
+def _messagebox():
+    """tkinter.messagebox, imported on first use rather than at startup"""
+    from tkinter import messagebox
+    return messagebox
+
 
 class AdvancedCalculator:
     def __init__(self):
         self.root = tk.Tk()
-        self.engine = CalculatorEngine()
+        self.engine = CalculatorEngine(
+            number_mode=config.get("number_mode", "float"),
+            precision=config.get("precision", 10),
+            angle_mode=config.get("angle_mode", "degrees")
+        )
+        if config.get("instrumentation", False):
+            self.engine.enable_instrumentation()
         self.theme = CalculatorTheme()
         
         # Initialize variables
         self.display_var = tk.StringVar(value="0")
         self.history_var = tk.StringVar(value="")
         self.memory_value = 0
-        self.history = []
+        self.history = self._create_history()
+        # Keystroke logic and display text live in the controller; the Tk
+        # variables are synced from it (the display once per idle tick)
+        self.controller = CalculatorController(self.engine, self.history, self._show_error)
+        self._display_flush_pending = False
+        self._history_text = ""
+        
+        # Background computation: worker process (started on first use) and
+        # the (job id, result callback) of the call in flight
+        self._worker = None
+        self._job = None
+        self._busy_history_text = ""
         
         self.setup_window()
         self.create_widgets()
         self.apply_theme()
         self.bind_keyboard()
+        self.watch_config()
+        
+    def _create_history(self):
+        """Create the history ring buffer, journaled to disk if enabled"""
+        journal = None
+        if config.get("history_journal", False):
+            try:
+                config.config_dir.mkdir(exist_ok=True)
+                journal = HistoryJournal(str(config.config_dir / "history.journal"))
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not open history journal: {e}")
+        return HistoryBuffer(Constants.MAX_HISTORY_ENTRIES, journal, index=HistoryIndex())
         
     def setup_window(self):
         """Configure the main window"""
         self.root.title("Advanced Calculator Pro")
-        self.root.geometry("400x600")
         self.root.resizable(True, True)
         self.root.minsize(350, 500)
         
-        # Center window on screen
-        self.root.update_idletasks()
-        x = (self.root.winfo_screenwidth() // 2) - (400 // 2)
-        y = (self.root.winfo_screenheight() // 2) - (600 // 2)
-        self.root.geometry(f"400x600+{x}+{y}")
+        # Restore the saved geometry, centering it when no position was saved
+        geometry = config.get("window_geometry", "400x600")
+        if "+" not in geometry and "-" not in geometry:
+            try:
+                width, height = (int(part) for part in geometry.split("x"))
+            except ValueError:
+                width, height = 400, 600
+            # Screen size needs no pending layout, so no update_idletasks here
+            x = (self.root.winfo_screenwidth() // 2) - (width // 2)
+            y = (self.root.winfo_screenheight() // 2) - (height // 2)
+            geometry = f"{width}x{height}+{x}+{y}"
+        self.root.geometry(geometry)
+        self.root.bind("<Configure>", self._on_configure)
         
         # Configure grid weights for responsiveness
         self.root.grid_rowconfigure(0, weight=0)  # Menu
@@ -47,6 +104,21 @@ class AdvancedCalculator:
         self.root.grid_rowconfigure(2, weight=4)  # Button area
         self.root.grid_columnconfigure(0, weight=1)
         
+    def watch_config(self):
+        """Apply settings changed on disk (e.g. pushed to kiosks) without a restart"""
+        config.subscribe("theme", lambda key, value: self.theme.apply_theme(self.root, value))
+        config.subscribe("window_geometry", lambda key, value: self.root.geometry(value))
+        config.subscribe("precision", lambda key, value: self.engine.set_precision(value))
+        config.subscribe("angle_mode", lambda key, value: self.engine.set_angle_mode(value))
+        config.watch(self.root, Constants.CONFIG_POLL_INTERVAL)
+        
+    def _on_configure(self, event):
+        """Remember the window geometry (written in the background, debounced)"""
+        if event.widget is self.root:
+            geometry = self.root.geometry()
+            if geometry != config.get("window_geometry"):
+                config.set("window_geometry", geometry)
+        
     def create_widgets(self):
         """Create and layout all widgets"""
         self.create_menu()
@@ -61,18 +133,35 @@ class AdvancedCalculator:
         # View menu
         view_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="View", menu=view_menu)
+        view_menu.add_command(label="Search History...", command=self.show_history_search)
         view_menu.add_command(label="Clear History", command=self.clear_history)
+        view_menu.add_command(label="Export Full Result...", command=self.export_result)
         view_menu.add_separator()
         view_menu.add_command(label="Dark Theme", command=lambda: self.switch_theme("dark"))
         view_menu.add_command(label="Light Theme", command=lambda: self.switch_theme("light"))
         view_menu.add_command(label="Blue Theme", command=lambda: self.switch_theme("blue"))
         
+        # Functions menu (all scientific functions, including those without a button)
+        functions_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Functions", menu=functions_menu)
+        for name, symbol in Constants.SCIENTIFIC_FUNCTIONS.items():
+            functions_menu.add_command(
+                label=f"{symbol}  ({name})",
+                command=lambda func=name: self._menu_function(func)
+            )
+            
         # Help menu
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Help", menu=help_menu)
         help_menu.add_command(label="About", command=self.show_about)
         help_menu.add_command(label="Keyboard Shortcuts", command=self.show_shortcuts)
+        help_menu.add_command(label="Performance...", command=self.show_performance)
         
+    def _menu_function(self, func):
+        """Run a scientific function chosen from the menu (ignored while busy)"""
+        if self._job is None:
+            self.scientific_function(func)
+            
     def create_display_area(self):
         """Create the display area with history and main display"""
         display_frame = ttk.Frame(self.root, padding="10")
@@ -172,154 +261,207 @@ class AdvancedCalculator:
             
     def apply_theme(self):
         """Apply the current theme"""
-        self.theme.apply_theme(self.root, "dark")  # Default to dark theme
+        self.theme.apply_theme(self.root, config.get("theme", "dark"))
         
     def bind_keyboard(self):
         """Bind keyboard shortcuts"""
         self.root.bind("<Key>", self.key_press)
+        self.root.bind("<Control-v>", self.paste_input)
+        self.root.bind("<Control-V>", self.paste_input)
         self.root.focus_set()
         
+    @property
+    def display_text(self):
+        """Text on the display (the Tk variable may lag until the next idle tick)"""
+        return self.controller.display_text
+        
+    def _render(self):
+        """Sync the widgets with the controller, the display at most once per idle tick"""
+        if not self._display_flush_pending:
+            self._display_flush_pending = True
+            self.root.after_idle(self._flush_display)
+        history_text = self.controller.history_text
+        if history_text != self._history_text:
+            self._history_text = history_text
+            self.history_var.set(history_text)
+            
+    def _flush_display(self):
+        """Push the buffered display text to the entry widget"""
+        self._display_flush_pending = False
+        self.display_var.set(self.controller.display_text)
+        
+    def _show_error(self, message):
+        """Controller error callback: render "Error" before the modal dialog"""
+        self._render()
+        _messagebox().showerror("Error", message)
+        
+    def _press(self, key):
+        """Send one key to the controller and render the outcome"""
+        handled = self.controller.press(key)
+        if handled:
+            self._render()
+        return handled
+        
     def key_press(self, event):
         """Handle keyboard input"""
-        key = event.char.lower()
-        
-        # Numbers
-        if key in "0123456789":
-            self.number_input(key)
-        # Operators
-        elif key == "+":
-            self.operator("+")
-        elif key == "-":
-            self.operator("-")
-        elif key == "*":
-            self.operator("*")
-        elif key == "/":
-            self.operator("/")
-        elif key == ".":
-            self.decimal_point()
-        elif key in ["=", "\r"]:  # Enter key
-            self.calculate()
-        elif event.keysym == "BackSpace":
-            self.backspace()
-        elif event.keysym == "Delete":
-            self.clear()
-        elif event.keysym == "Escape":
-            self.clear_entry()
+        if self._job is not None:
+            # Only Escape (cancel) is accepted while a calculation runs
+            if event.keysym == "Escape":
+                self.cancel_computation()
+            return
+        self._press(event.char) or self._press(event.keysym)
+            
+    def paste_input(self, event=None):
+        """
+        Handle Ctrl+V: a pasted number replaces the current entry, anything
+        else is evaluated as an expression (e.g. "2 * (3 + 4)")
+        """
+        if self._job is not None:
+            return "break"
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            return "break"
+        self.input_text(text)
+        return "break"
+        
+    def input_text(self, text):
+        """Enter a block of text (pasted or scanned) in one display update"""
+        stripped = text.strip().replace(" ", "").replace("_", "")
+        if expression_is_long_running(stripped, self.engine):
+            # Compiling folds constants, so the whole evaluation moves to the worker
+            try:
+                check_expression_size(stripped, self.engine, config.get("max_result_digits", 1000000))
+            except ValueError as e:
+                self.controller.show_error(str(e))
+                return
+                
+            def show(result, display_text):
+                self.controller.show_result(result, display_text, reset_display=True)
+                self._render()
+            self._run_in_background(show, "evaluate", stripped)
+            return
+        self.controller.enter_text(text)
+        self._render()
             
     def number_input(self, num):
         """Handle number button press"""
-        current = self.display_var.get()
-        
-        # If an operator was just pressed, start fresh with new number
-        if hasattr(self.engine, 'should_reset_display') and self.engine.should_reset_display:
-            self.display_var.set(num)
-            self.engine.should_reset_display = False
-        # If display shows 0 or Error, replace it
-        elif current == "0" or current == "Error":
-            self.display_var.set(num)
-        # Otherwise append to current number
-        else:
-            self.display_var.set(current + num)
+        self._press(num)
             
     def decimal_point(self):
         """Handle decimal point input"""
-        current = self.display_var.get()
-        
-        # Check if we need to reset display after an operation
-        if hasattr(self.engine, 'should_reset_display') and self.engine.should_reset_display:
-            self.display_var.set("0.")
-            self.engine.should_reset_display = False
-        elif current == "Error":
-            self.display_var.set("0.")
-        elif "." not in current:
-            if current == "0":
-                self.display_var.set("0.")
-            else:
-                self.display_var.set(current + ".")
+        self._press(".")
                 
     def operator(self, op):
         """Handle operator button press"""
-        try:
-            current_value = float(self.display_var.get())
-            result = self.engine.operator(op, current_value)
-            
-            # Update history display
-            if self.engine.pending_operation:
-                op_symbol = {"*": "×", "/": "÷"}.get(op, op)
-                self.history_var.set(f"{self.engine.stored_value} {op_symbol}")
-            
-            # Keep the current display unchanged - it will reset on next number input
-            
-        except (ValueError, ZeroDivisionError) as e:
-            self.display_var.set("Error")
-            messagebox.showerror("Error", str(e))
+        self._press(op)
             
     def calculate(self):
         """Handle equals button press"""
-        try:
-            current_value = float(self.display_var.get())
-            result = self.engine.calculate(current_value)
-            
-            # Add to history
-            if self.engine.last_operation:
-                op_symbol = {"*": "×", "/": "÷"}.get(self.engine.last_operation, self.engine.last_operation)
-                history_entry = f"{self.engine.last_operand} {op_symbol} {current_value} = {result}"
-                self.history.append(history_entry)
-                
-            self.display_var.set(str(result))
-            self.history_var.set("")
-            
-        except (ValueError, ZeroDivisionError) as e:
-            self.display_var.set("Error")
-            self.history_var.set("")
-            messagebox.showerror("Error", str(e))
+        self._press("=")
             
     def scientific_function(self, func):
         """Handle scientific function buttons"""
         try:
-            current_value = float(self.display_var.get())
+            current_value = self.controller.value()
+            if is_long_running(func, current_value, self.engine):
+                check_result_size(func, current_value, self.engine,
+                                  config.get("max_result_digits", 1000000))
+                
+                def show(result, display_text):
+                    self.controller.show_result(result, display_text)
+                    self._render()
+                    self.history.append_function(func, current_value, result)
+                self._run_in_background(show, "scientific_function", func, current_value)
+                return
+                
             result = self.engine.scientific_function(func, current_value)
-            self.display_var.set(str(result))
+            self.controller.show_result(result)
+            self._render()
             
             # Add to history
-            func_names = {
-                "sqrt": "√",
-                "square": "²",
-                "reciprocal": "1/x"
-            }
-            history_entry = f"{func_names.get(func, func)}({current_value}) = {result}"
-            self.history.append(history_entry)
+            self.history.append_function(func, current_value, result)
             
         except (ValueError, ZeroDivisionError) as e:
-            self.display_var.set("Error")
-            messagebox.showerror("Error", str(e))
+            self.controller.show_error(str(e))
+            
+    def _run_in_background(self, on_result, method, *args):
+        """
+        Run engine.method(*args) in the worker process
+        Args:
+            on_result: Called as on_result(value, display_text) on the Tk thread
+            method: Engine method name
+        """
+        if self._worker is None:
+            from calculator_worker import ComputeWorker
+            self._worker = ComputeWorker()
+        self._job = (self._worker.submit(self.engine, method, *args), on_result)
+        self._set_busy(True)
+        self.root.after(Constants.WORKER_POLL_MS, self._poll_worker)
+        
+    def _poll_worker(self):
+        """Deliver a finished background result, or enforce the time budget"""
+        if self._job is None:
+            return
+        outcome = self._worker.poll()
+        if outcome is None:
+            timeout = config.get("compute_timeout", 30)
+            if self._worker.elapsed > timeout:
+                self.cancel_computation(f"Calculation took longer than {timeout:g} seconds")
+            else:
+                self.root.after(Constants.WORKER_POLL_MS, self._poll_worker)
+            return
+            
+        _, ok, value, text = outcome
+        on_result = self._job[1]
+        self._job = None
+        self._set_busy(False)
+        if ok:
+            on_result(value, text)
+        else:
+            self.controller.show_error(text)
+            
+    def cancel_computation(self, message=None):
+        """Abandon the background calculation (Escape), optionally explaining why"""
+        if self._job is None:
+            return
+        self._worker.cancel()
+        self._job = None
+        self._set_busy(False)
+        if message:
+            self.controller.show_error(message)
+            
+    def _set_busy(self, busy):
+        """Show or hide the busy indicator and lock input while a calculation runs"""
+        if busy:
+            self._busy_history_text = self.history_var.get()
+            self.history_var.set("Calculating... (Esc to cancel)")
+        else:
+            self.history_var.set(self._busy_history_text)
+        self.root.configure(cursor="watch" if busy else "")
+        for button in self.buttons.values():
+            button.state(["disabled"] if busy else ["!disabled"])
             
     def toggle_sign(self):
         """Toggle the sign of the current number"""
         try:
-            current = float(self.display_var.get())
-            self.display_var.set(str(-current))
+            current = self.controller.value()
+            self.controller.show_result(-current)
+            self._render()
         except ValueError:
             pass
             
     def clear(self):
         """Clear everything"""
-        self.display_var.set("0")
-        self.history_var.set("")
-        self.engine.clear()
+        self._press("clear")
         
     def clear_entry(self):
         """Clear current entry"""
-        self.display_var.set("0")
-        self.engine.should_reset_display = False
+        self._press("clear_entry")
         
     def backspace(self):
         """Remove last character"""
-        current = self.display_var.get()
-        if len(current) > 1 and current != "Error":
-            self.display_var.set(current[:-1])
-        else:
-            self.display_var.set("0")
+        self._press("backspace")
             
     def memory_clear(self):
         """Clear memory"""
@@ -328,12 +470,13 @@ class AdvancedCalculator:
         
     def memory_recall(self):
         """Recall memory value"""
-        self.display_var.set(str(self.memory_value))
+        self.controller.show_result(self.memory_value)
+        self._render()
         
     def memory_add(self):
         """Add current value to memory"""
         try:
-            current = float(self.display_var.get())
+            current = self.controller.value()
             self.memory_value += current
             self.memory_label.config(text="M" if self.memory_value != 0 else "")
         except ValueError:
@@ -342,7 +485,7 @@ class AdvancedCalculator:
     def memory_subtract(self):
         """Subtract current value from memory"""
         try:
-            current = float(self.display_var.get())
+            current = self.controller.value()
             self.memory_value -= current
             self.memory_label.config(text="M" if self.memory_value != 0 else "")
         except ValueError:
@@ -351,15 +494,142 @@ class AdvancedCalculator:
     def switch_theme(self, theme_name):
         """Switch application theme"""
         self.theme.apply_theme(self.root, theme_name)
+        config.set("theme", theme_name)
         
     def clear_history(self):
         """Clear calculation history"""
         self.history.clear()
-        messagebox.showinfo("History", "Calculation history cleared.")
+        _messagebox().showinfo("History", "Calculation history cleared.")
+        
+    def export_result(self):
+        """Save every digit of a result shown in scientific notation to a text file"""
+        exact = self.controller.exact_result
+        if exact is None or exact[0] != self.display_text or not isinstance(exact[1], int):
+            _messagebox().showinfo("Export Full Result", "The displayed number is already shown in full.")
+            return
+        from tkinter import filedialog
+        from calculator_bignum import write_digits
+        
+        path = filedialog.asksaveasfilename(
+            parent=self.root,
+            title="Export Full Result",
+            defaultextension=".txt",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                digits = write_digits(exact[1], f)
+                f.write("\n")
+        except OSError as e:
+            _messagebox().showerror("Export Full Result", f"Could not save the result: {e}")
+        else:
+            _messagebox().showinfo("Export Full Result", f"Saved {digits:,} characters to {path}")
+            
+    def show_history_search(self):
+        """Open the history search window"""
+        from calculator_search import HistorySearch, parse_query
+        
+        page_size = 50
+        search = HistorySearch(self.history)
+        state = {"query": {}, "offset": 0}
+        
+        window = tk.Toplevel(self.root)
+        window.title("Search History")
+        window.geometry("420x400")
+        window.grid_columnconfigure(0, weight=1)
+        window.grid_rowconfigure(1, weight=1)
+        
+        query_var = tk.StringVar()
+        status_var = tk.StringVar(value="e.g. >10000   sqrt x:2..3   √(2.")
+        entry = ttk.Entry(window, textvariable=query_var)
+        entry.grid(row=0, column=0, columnspan=3, sticky="ew", padx=10, pady=10)
+        results = tk.Listbox(window, activestyle="none")
+        results.grid(row=1, column=0, columnspan=3, sticky="nsew", padx=10)
+        ttk.Label(window, textvariable=status_var).grid(row=2, column=0, sticky="w", padx=10, pady=10)
+        
+        def show_page():
+            found = search.search(offset=state["offset"], limit=page_size, **state["query"])
+            results.delete(0, tk.END)
+            for _, _, text in found.matches:
+                results.insert(tk.END, text)
+            if found.total:
+                first = state["offset"] + 1
+                status_var.set(f"{first}-{first + len(found.matches) - 1} of {found.total}")
+            else:
+                status_var.set("No matches")
+            previous_button.state(["!disabled"] if state["offset"] else ["disabled"])
+            more = state["offset"] + page_size < found.total
+            next_button.state(["!disabled"] if more else ["disabled"])
+            
+        def run_query(event=None):
+            state["query"] = parse_query(query_var.get())
+            state["offset"] = 0
+            show_page()
+            
+        def turn_page(step):
+            state["offset"] = max(0, state["offset"] + step * page_size)
+            show_page()
+            
+        previous_button = ttk.Button(window, text="◀", width=3, command=lambda: turn_page(-1))
+        previous_button.grid(row=2, column=1, pady=10)
+        next_button = ttk.Button(window, text="▶", width=3, command=lambda: turn_page(1))
+        next_button.grid(row=2, column=2, padx=(0, 10), pady=10)
+        previous_button.state(["disabled"])
+        next_button.state(["disabled"])
+        
+        entry.bind("<Return>", run_query)
+        entry.focus_set()
+        
+    def show_performance(self):
+        """Open the engine performance metrics window"""
+        from calculator_metrics import format_table
+        
+        window = tk.Toplevel(self.root)
+        window.title("Performance")
+        window.geometry("560x360")
+        window.grid_columnconfigure(0, weight=1)
+        window.grid_rowconfigure(0, weight=1)
+        
+        table = tk.Text(window, font=("Courier", 10), wrap="none")
+        table.grid(row=0, column=0, columnspan=4, sticky="nsew", padx=10, pady=10)
+        toggle_var = tk.StringVar()
+        
+        def refresh():
+            enabled = self.engine.instrumentation_enabled
+            toggle_var.set("Disable" if enabled else "Enable")
+            snapshot = self.engine.metrics_snapshot()
+            table.configure(state="normal")
+            table.delete("1.0", tk.END)
+            if snapshot:
+                table.insert(tk.END, format_table(snapshot))
+            elif enabled:
+                table.insert(tk.END, "No calculations recorded yet.")
+            else:
+                table.insert(tk.END, "Instrumentation is off. Enable it to record\n"
+                                     "per-operation call counts and latencies.")
+            table.configure(state="disabled")
+            
+        def toggle():
+            if self.engine.instrumentation_enabled:
+                self.engine.disable_instrumentation()
+            else:
+                self.engine.enable_instrumentation()
+            refresh()
+            
+        def reset():
+            self.engine.reset_metrics()
+            refresh()
+            
+        ttk.Button(window, textvariable=toggle_var, command=toggle).grid(row=1, column=0, sticky="w", padx=10, pady=(0, 10))
+        ttk.Button(window, text="Reset", command=reset).grid(row=1, column=1, pady=(0, 10))
+        ttk.Button(window, text="Refresh", command=refresh).grid(row=1, column=2, padx=(10, 10), pady=(0, 10))
+        refresh()
         
     def show_about(self):
         """Show about dialog"""
-        messagebox.showinfo(
+        _messagebox().showinfo(
             "About Advanced Calculator",
             "Advanced Calculator Pro v1.0\n\n"
             "A feature-rich calculator with:\n"
@@ -378,20 +648,27 @@ Keyboard Shortcuts:
 
 Numbers: 0-9
 Operations: +, -, *, /
-Decimal: .
+Decimal: . or ,
 Calculate: Enter or =
 Backspace: Backspace
 Clear Entry: Escape
-Clear All: Delete
+Clear All: Delete or C
+Paste number or expression: Ctrl+V
 
 Memory Operations:
 Use mouse clicks on memory buttons
         """
-        messagebox.showinfo("Keyboard Shortcuts", shortcuts)
+        _messagebox().showinfo("Keyboard Shortcuts", shortcuts)
         
     def run(self):
         """Start the calculator application"""
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            if self._worker is not None:
+                self._worker.close()
+            self.history.close()
+            config.flush()
 
 if __name__ == "__main__":
     calculator = AdvancedCalculator()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Calculator Batch Module
+Vectorized evaluation of engine operations over whole arrays of operands
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional - the plain Python fallback below is used instead
+    np = None
+
+# Binary operation codes understood by batch_binary
+BINARY_OPERATIONS = ("+", "-", "*", "/", "power", "percentage")
+
+# Floats at or above this magnitude have no fractional part left to round
+_ROUND_LIMIT = 2.0 ** 52
+
+# Largest factorial that still fits in a float
+_MAX_FLOAT_FACTORIAL = 170
+
+
+def has_numpy():
+    """Return True when the NumPy fast path is available"""
+    return np is not None
+
+
+def batch_binary(operation, operands1, operands2):
+    """
+    Apply a binary operation element-wise
+    Args:
+        operation: Operation code (+, -, *, /, power, percentage)
+        operands1: Sequence or array of first operands (or a scalar)
+        operands2: Sequence or array of second operands (or a scalar)
+    Returns:
+        Tuple of (results, error_mask). Failed elements are NaN in results.
+    Raises:
+        ValueError: For unknown operations or mismatched lengths
+    """
+    if operation not in BINARY_OPERATIONS:
+        raise ValueError(f"Unknown operation: {operation}")
+    if np is not None:
+        return _numpy_binary(operation, operands1, operands2)
+    return _python_binary(operation, operands1, operands2)
+
+
+def batch_function(function, values, angle_mode="degrees"):
+    """
+    Apply a scientific function element-wise
+    Args:
+        function: Function name (sqrt, square, reciprocal, etc.)
+        values: Sequence or array of input values
+        angle_mode: Unit of sin/cos/tan arguments ("degrees" or "radians")
+    Returns:
+        Tuple of (results, error_mask). Failed elements are NaN in results.
+    Raises:
+        ValueError: For unknown functions
+    """
+    if function not in _PYTHON_FUNCTIONS:
+        raise ValueError(f"Unknown function: {function}")
+    degrees = angle_mode == "degrees"
+    if np is not None:
+        return _numpy_function(function, values, degrees)
+    return _python_function(function, values, degrees)
+
+
+# ---------------------------------------------------------------------------
+# NumPy implementation
+# ---------------------------------------------------------------------------
+
+if np is not None:
+    _FACTORIAL_TABLE = np.array(
+        [float(math.factorial(n)) for n in range(_MAX_FLOAT_FACTORIAL + 1)]
+    )
+
+
+def _numpy_finish(result, error):
+    """Mark non-finite values as errors and round like the scalar path"""
+    error |= ~np.isfinite(result)
+    # Round to 10 places only where a fractional part can still exist
+    small = np.abs(result) < _ROUND_LIMIT
+    np.copyto(result, np.round(result, 10), where=small)
+    result[error] = np.nan
+    return result, error
+
+
+def _numpy_binary(operation, operands1, operands2):
+    a = np.asarray(operands1, dtype=np.float64)
+    b = np.asarray(operands2, dtype=np.float64)
+    try:
+        a, b = np.broadcast_arrays(a, b)
+    except ValueError:
+        raise ValueError("Operand arrays must have the same length")
+
+    with np.errstate(all="ignore"):
+        if operation == "+":
+            result = a + b
+        elif operation == "-":
+            result = a - b
+        elif operation == "*":
+            result = a * b
+        elif operation == "/":
+            result = a / b
+        elif operation == "power":
+            result = np.power(a, b)
+        else:
+            result = a * b / 100
+
+        if operation == "/":
+            error = b == 0
+        else:
+            error = np.zeros(result.shape, dtype=bool)
+        return _numpy_finish(result, error)
+
+
+def _numpy_function(function, values, degrees=True):
+    v = np.asarray(values, dtype=np.float64)
+
+    with np.errstate(all="ignore"):
+        if function == "sqrt":
+            error = v < 0
+            result = np.sqrt(v)
+        elif function == "square":
+            error = np.zeros(v.shape, dtype=bool)
+            result = v * v
+        elif function == "reciprocal":
+            error = v == 0
+            result = 1 / v
+        elif function in ("sin", "cos", "tan"):
+            error = np.zeros(v.shape, dtype=bool)
+            result = getattr(np, function)(np.radians(v) if degrees else v)
+        elif function == "log":
+            error = v <= 0
+            result = np.log10(v)
+        elif function == "ln":
+            error = v <= 0
+            result = np.log(v)
+        elif function == "exp":
+            error = np.zeros(v.shape, dtype=bool)
+            result = np.exp(v)
+        elif function == "factorial":
+            error = (v < 0) | (v != np.floor(v)) | (v > _MAX_FLOAT_FACTORIAL)
+            index = np.where(error, 0, v).astype(np.intp)
+            result = _FACTORIAL_TABLE[index]
+        elif function == "abs":
+            error = np.zeros(v.shape, dtype=bool)
+            result = np.abs(v)
+        else:
+            error = np.zeros(v.shape, dtype=bool)
+            result = v / 100
+        return _numpy_finish(result, error)
+
+
+# ---------------------------------------------------------------------------
+# Plain Python fallback
+# ---------------------------------------------------------------------------
+
+def _divide(a, b):
+    if b == 0:
+        raise ZeroDivisionError("Cannot divide by zero")
+    return a / b
+
+
+_PYTHON_BINARY = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": _divide,
+    "power": lambda a, b: a ** b,
+    "percentage": lambda a, b: (a * b) / 100,
+}
+
+
+def _sqrt(value):
+    if value < 0:
+        raise ValueError("Cannot calculate square root of negative number")
+    return math.sqrt(value)
+
+
+def _reciprocal(value):
+    if value == 0:
+        raise ZeroDivisionError("Cannot calculate reciprocal of zero")
+    return 1 / value
+
+
+def _log(value):
+    if value <= 0:
+        raise ValueError("Logarithm undefined for non-positive numbers")
+    return math.log10(value)
+
+
+def _ln(value):
+    if value <= 0:
+        raise ValueError("Natural logarithm undefined for non-positive numbers")
+    return math.log(value)
+
+
+def _factorial(value):
+    if value < 0 or value != int(value):
+        raise ValueError("Factorial only defined for non-negative integers")
+    return float(math.factorial(int(value)))
+
+
+_PYTHON_FUNCTIONS = {
+    "sqrt": _sqrt,
+    "square": lambda value: value * value,
+    "reciprocal": _reciprocal,
+    "sin": lambda value: math.sin(math.radians(value)),
+    "cos": lambda value: math.cos(math.radians(value)),
+    "tan": lambda value: math.tan(math.radians(value)),
+    "log": _log,
+    "ln": _ln,
+    "exp": math.exp,
+    "factorial": _factorial,
+    "abs": abs,
+    "percent": lambda value: value / 100,
+}
+
+# Trigonometric functions taking radians (angle_mode="radians")
+_PYTHON_RADIAN_FUNCTIONS = {"sin": math.sin, "cos": math.cos, "tan": math.tan}
+
+_NAN = float("nan")
+
+
+def _python_finish(func, *columns):
+    """Apply func to each row of columns, collecting results and errors"""
+    results = []
+    errors = []
+    for args in zip(*columns):
+        try:
+            result = float(func(*args))
+            if result - result != 0:
+                # inf or nan - the scalar path cannot display these either
+                raise OverflowError
+        except (ValueError, ZeroDivisionError, OverflowError, TypeError):
+            results.append(_NAN)
+            errors.append(True)
+            continue
+        if result == int(result):
+            results.append(int(result))
+        else:
+            results.append(round(result, 10))
+        errors.append(False)
+    return results, errors
+
+
+def _as_list(values, length=None):
+    """Convert a sequence (or a scalar when length is given) to a float list"""
+    if isinstance(values, (int, float)):
+        return [float(values)] * (length if length is not None else 1)
+    return [float(value) for value in values]
+
+
+def _python_binary(operation, operands1, operands2):
+    scalar1 = isinstance(operands1, (int, float))
+    scalar2 = isinstance(operands2, (int, float))
+    if scalar1 and not scalar2:
+        b = _as_list(operands2)
+        a = _as_list(operands1, len(b))
+    else:
+        a = _as_list(operands1)
+        b = _as_list(operands2, len(a))
+    if len(a) != len(b):
+        raise ValueError("Operand arrays must have the same length")
+    return _python_finish(_PYTHON_BINARY[operation], a, b)
+
+
+def _python_function(function, values, degrees=True):
+    func = _PYTHON_FUNCTIONS[function]
+    if not degrees:
+        func = _PYTHON_RADIAN_FUNCTIONS.get(function, func)
+    return _python_finish(func, _as_list(values))
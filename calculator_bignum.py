@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Calculator Big Number Module
+Display and export of integers too long to show in full (e.g. large factorials)
+
+Converting a big int to a decimal string is quadratic, and Python refuses it
+outright past sys.get_int_max_str_digits(). The display format here is derived
+from the leading bits only; the full digits are produced on demand by a
+divide-and-conquer conversion through the decimal module (whose big-number
+multiplication is subquadratic) and streamed out in chunks.
+"""
+
+from decimal import MAX_EMAX, MAX_PREC, MIN_EMIN, ROUND_DOWN, ROUND_HALF_EVEN, Context, Decimal
+
+from config import Constants
+
+# Leading bits used to find the leading decimal digits of a huge integer
+_TOP_BITS = 128
+
+# Integers up to this many bits convert to Decimal directly and exactly
+_DIRECT_BITS = 20000
+
+# Working context for the leading-digit estimate, and an exact one; the
+# estimate is trusted to _ESTIMATE_DIGITS significant digits
+_ESTIMATE = Context(prec=40, Emax=MAX_EMAX, Emin=MIN_EMIN)
+_ESTIMATE_DIGITS = 30
+_EXACT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+DEFAULT_CHUNK_DIGITS = 65536
+
+
+def needs_scientific(value, max_digits=Constants.MAX_INTEGER_DIGITS):
+    """
+    Check whether an integer has more decimal digits than the display shows
+    Decided from the bit length alone except in a narrow band near the limit.
+    """
+    bits = abs(value).bit_length()
+    if bits <= max_digits * 3:
+        return False  # 2**(3d) = 8**d < 10**d
+    if bits > max_digits * 4:
+        return True  # 2**(4d-1) > 10**d
+    return len(str(abs(value))) > max_digits
+
+
+def _rounding_context(digits):
+    return Context(prec=digits, rounding=ROUND_HALF_EVEN, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+
+def _near_tie(estimate, digits):
+    """True if the estimate's digits past `digits` are too close to a half to round reliably"""
+    if digits >= _ESTIMATE_DIGITS:
+        return True
+    tail = estimate.as_tuple().digits[digits:]
+    tail_value = int("".join(map(str, tail)))
+    half = 5 * 10 ** (len(tail) - 1)
+    return abs(tail_value - half) < 10 ** (len(tail) - (_ESTIMATE_DIGITS - digits))
+
+
+def leading_decimal(value, digits=Constants.MAX_DIGITS):
+    """
+    Round an integer to its leading significant digits without converting it in full
+    Args:
+        value: int (or integral Decimal)
+        digits: Significant digits to keep
+    Returns:
+        Non-negative Decimal with at most `digits` digits and the magnitude's exponent
+    """
+    context = _rounding_context(digits)
+    if isinstance(value, Decimal):
+        return context.plus(value.copy_abs())
+    value = abs(value)
+    bits = value.bit_length()
+    if bits <= _DIRECT_BITS:
+        return context.plus(Decimal(value))
+
+    # value = top * 2**shift + rest with rest < 2**shift, so top * 2**shift
+    # matches value to ~38 digits - plenty unless the rounding digit is a tie
+    shift = bits - _TOP_BITS
+    estimate = _ESTIMATE.multiply(Decimal(value >> shift), _ESTIMATE.power(2, shift))
+    if not _near_tie(estimate, digits):
+        return context.plus(estimate)
+
+    # Exact fallback: keep two guard digits plus a sticky digit for the remainder
+    scale = estimate.adjusted() - digits - 1
+    quotient, remainder = divmod(value, 10 ** scale)
+    quotient = quotient * 10 + (1 if remainder else 0)
+    return context.plus(Decimal(quotient).scaleb(scale - 1, _EXACT))
+
+
+def format_scientific(value, digits=Constants.MAX_DIGITS):
+    """
+    Render an integer in scientific notation, e.g. "2.82422940796034e+456573"
+    Args:
+        value: int or integral Decimal of any size
+        digits: Significant digits in the mantissa (trailing zeros are dropped)
+    """
+    rounded = leading_decimal(value, digits)
+    coefficient = "".join(map(str, rounded.as_tuple().digits)).rstrip("0") or "0"
+    mantissa = coefficient[0] + ("." + coefficient[1:] if len(coefficient) > 1 else "")
+    sign = "-" if value < 0 else ""
+    return f"{sign}{mantissa}e+{rounded.adjusted()}"
+
+
+def format_integer(value):
+    """Render an integer for the display: in full when it fits, else scientific"""
+    if needs_scientific(value):
+        return format_scientific(value)
+    return str(value)
+
+
+def to_decimal(value):
+    """
+    Convert an integer of any size to an exact Decimal in subquadratic time
+    The integer is split on bit boundaries (free) and recombined with decimal
+    arithmetic: D(n) = D(high) * 2**w + D(low).
+    """
+    powers = {}
+
+    def power_of_two(bits):
+        power = powers.get(bits)
+        if power is None:
+            power = powers[bits] = _EXACT.power(2, bits)
+        return power
+
+    def convert(n, bits):
+        if bits <= _DIRECT_BITS:
+            return Decimal(n)
+        low_bits = bits >> 1
+        high = n >> low_bits
+        low = n - (high << low_bits)
+        return _EXACT.add(
+            _EXACT.multiply(convert(high, bits - low_bits), power_of_two(low_bits)),
+            convert(low, low_bits)
+        )
+
+    result = convert(abs(value), abs(value).bit_length())
+    return result.copy_negate() if value < 0 else result
+
+
+def iter_digits(value, chunk_digits=DEFAULT_CHUNK_DIGITS):
+    """
+    Stream the full decimal digits of an integer
+    Args:
+        value: int (or integral Decimal) of any size
+        chunk_digits: Digits per yielded piece (the first may be shorter)
+    Yields:
+        Strings that concatenate to the exact decimal representation
+    """
+    number = value if isinstance(value, Decimal) else to_decimal(value)
+    if number < 0:
+        yield "-"
+        number = number.copy_negate()
+    number = _EXACT.quantize(number, Decimal(1))
+    yield from _split_digits(number, number.adjusted() + 1, chunk_digits, True)
+
+
+def _split_digits(number, width, chunk_digits, leading):
+    """Yield `width` digits of a non-negative integral Decimal, high half first"""
+    if width <= chunk_digits:
+        text = str(number)
+        yield text if leading else text.zfill(width)
+        return
+    # Split on a chunk boundary so every piece but the first is full size
+    low_width = (width // 2 + chunk_digits - 1) // chunk_digits * chunk_digits
+    high = number.scaleb(-low_width, _EXACT).to_integral_value(rounding=ROUND_DOWN)
+    low = _EXACT.subtract(number, high.scaleb(low_width, _EXACT))
+    yield from _split_digits(high, width - low_width, chunk_digits, leading)
+    yield from _split_digits(low, low_width, chunk_digits, False)
+
+
+def decimal_string(value):
+    """Full decimal digits of an integer as one string (no int -> str digit limit)"""
+    return "".join(iter_digits(value))
+
+
+def write_digits(value, stream, chunk_digits=DEFAULT_CHUNK_DIGITS):
+    """
+    Write the full decimal digits of an integer to a text stream
+    Returns:
+        Number of characters written
+    """
+    written = 0
+    for piece in iter_digits(value, chunk_digits):
+        stream.write(piece)
+        written += len(piece)
+    return written
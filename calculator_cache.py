@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Calculator Cache Module
+Persistent result cache for scientific_function, power and evaluate, shared
+by every process on the host that opens the same file
+
+Results are stored in SQLite (WAL mode, so readers never block the writer)
+keyed by the call and every setting that can change its result: number
+mode, precision, the angle mode for trigonometry and expressions, and the
+exact operands (type, digits and exponent - 2, 2.0 and Decimal("2.0") are
+different keys). Values are stored in the engine's snapshot encoding, so a
+cached result is the same object a fresh call returns, bit for bit. Bump
+CACHE_VERSION when an engine change alters any result; a file written by
+another version is emptied on open.
+
+The file is bounded by max_bytes: once it grows past that, the least
+recently used entries are deleted down to EVICT_TO of the limit. Hits record
+their time in memory and are written in batches, so reads stay read-only
+most of the time and recency is approximate across processes.
+"""
+
+import sqlite3
+import threading
+import time
+from decimal import Decimal
+
+from calculator_engine import pack_value, unpack_value
+from calculator_rational import Rational
+
+# Schema and result semantics version of the cache file
+CACHE_VERSION = 1
+
+# Default size bound of the cache file contents
+DEFAULT_MAX_BYTES = 64 << 20
+
+# Results computed faster than this are not stored - a lookup costs about as much
+DEFAULT_MIN_SECONDS = 1e-4
+
+# Eviction deletes down to this fraction of max_bytes
+EVICT_TO = 0.9
+
+# Hits whose access time is kept in memory before being written
+TOUCH_BATCH = 256
+
+# Seconds to wait for another process holding the write lock
+BUSY_TIMEOUT = 10.0
+
+# Functions whose result depends on the angle mode
+ANGLE_FUNCTIONS = frozenset(("sin", "cos", "tan"))
+
+_VALUE_TYPES = (int, float, Decimal, Rational)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS results (
+    key BLOB PRIMARY KEY,
+    value BLOB NOT NULL,
+    used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+INSERT OR IGNORE INTO meta VALUES ('entries', 0), ('bytes', 0);
+CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results BEGIN
+    UPDATE meta SET value = value + 1 WHERE name = 'entries';
+    UPDATE meta SET value = value + length(NEW.key) + length(NEW.value) WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results BEGIN
+    UPDATE meta SET value = value - 1 WHERE name = 'entries';
+    UPDATE meta SET value = value - length(OLD.key) - length(OLD.value) WHERE name = 'bytes';
+END;
+"""
+
+
+def _packed(value):
+    """Key bytes of an operand, or None for types the cache does not handle"""
+    if not isinstance(value, _VALUE_TYPES):
+        return None
+    return pack_value(value)
+
+
+def call_key(engine, kind, name, arguments):
+    """
+    Cache key of an engine call
+    Args:
+        engine: CalculatorEngine making the call
+        kind: "function", "power" or "expression"
+        name: Function name or expression text ("" for power)
+        arguments: Operands, or the variables mapping of an expression
+    Returns:
+        Key bytes, or None if an operand cannot be keyed exactly
+    """
+    if kind == "expression" or name in ANGLE_FUNCTIONS:
+        angle_mode = engine.angle_mode
+    else:
+        angle_mode = ""
+    parts = [f"{kind}\0{name}\0{engine.number_mode}\0"
+             f"{engine.precision}\0{angle_mode}\0".encode()]
+    if kind == "expression":
+        for variable, value in sorted((arguments or {}).items()):
+            packed = _packed(value)
+            if packed is None:
+                return None
+            parts.append(variable.encode() + b"\0" + packed)
+    else:
+        for value in arguments:
+            packed = _packed(value)
+            if packed is None:
+                return None
+            parts.append(packed)
+    return b"".join(parts)
+
+
+class ResultCache:
+    """Size-bounded LRU cache of engine results in an SQLite file
+
+    One ResultCache can back many engines (any settings) in a process, and
+    any number of processes can open the same file. Methods are thread-safe.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, min_seconds=DEFAULT_MIN_SECONDS):
+        """
+        Args:
+            path: Cache file (created if missing)
+            max_bytes: Bound on the size of stored keys and values
+            min_seconds: Only results that took at least this long are stored
+        Raises:
+            sqlite3.Error: If the file cannot be opened as a cache
+        """
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.min_seconds = min_seconds
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT,
+                                           isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._open()
+
+    def _open(self):
+        connection = self._connection
+        connection.execute("PRAGMA journal_mode=WAL")
+        # WAL commits survive a process crash without an fsync each
+        connection.execute("PRAGMA synchronous=NORMAL")
+        # Every statement is idempotent, so processes may race to create the file
+        connection.executescript(_SCHEMA)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if row is None or row[0] != CACHE_VERSION:
+                # Written by another version - its results may differ
+                connection.execute("DELETE FROM results")
+                connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                                   (CACHE_VERSION,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    # Lookups ---------------------------------------------------------------
+
+    def lookup(self, key):
+        """
+        Cached value for a key
+        Returns:
+            (True, value) on a hit, (False, None) on a miss
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touched()
+        return True, unpack_value(row[0])
+
+    def store(self, key, value):
+        """Store a result (values of other types than the engine's are ignored)"""
+        if not isinstance(value, _VALUE_TYPES):
+            return
+        data = pack_value(value)
+        if len(key) + len(data) > self.max_bytes:
+            return
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._insert(key, data)
+                self._flush_touched()
+                self._evict()
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+    def call(self, engine, kind, name, arguments, compute):
+        """
+        Result of an engine call, from the cache or from compute()
+        Errors are never cached: compute() runs again next time.
+        """
+        key = call_key(engine, kind, name, arguments)
+        if key is None:
+            return compute()
+        found, value = self.lookup(key)
+        if found:
+            return value
+        start = time.perf_counter()
+        value = compute()
+        if time.perf_counter() - start >= self.min_seconds:
+            self.store(key, value)
+        return value
+
+    def _insert(self, key, data):
+        cursor = self._connection.execute(
+            "INSERT OR IGNORE INTO results VALUES (?, ?, ?)", (key, data, time.time()))
+        self.stores += cursor.rowcount
+
+    def _flush_touched(self):
+        """Write batched hit times (inside or outside a transaction)"""
+        if self._touched:
+            touched = self._touched
+            self._touched = {}
+            self._connection.executemany(
+                "UPDATE results SET used = ? WHERE key = ?",
+                [(used, key) for key, used in touched.items()])
+
+    def _evict(self):
+        """Delete least recently used entries while over max_bytes (in a transaction)"""
+        connection = self._connection
+        entries, size = self._usage()
+        if size <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TO
+        while size > target and entries:
+            # Enough average-sized entries to get under the target
+            count = int((size - target) * entries / size) + 1
+            cursor = connection.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY used LIMIT ?)", (count,))
+            if cursor.rowcount <= 0:
+                break
+            self.evictions += cursor.rowcount
+            entries, size = self._usage()
+
+    def _usage(self):
+        """(entries, bytes) stored in the file"""
+        meta = dict(self._connection.execute(
+            "SELECT name, value FROM meta WHERE name IN ('entries', 'bytes')"))
+        return meta["entries"], meta["bytes"]
+
+    # Warm-up ---------------------------------------------------------------
+
+    def warm(self, engine, calls):
+        """
+        Compute and store results ahead of use, in one transaction
+        Args:
+            engine: CalculatorEngine whose settings the results are for
+            calls: Iterable of ("scientific_function", function, value),
+                   ("power", base, exponent) or ("evaluate", expression[, variables])
+        Returns:
+            Number of results computed (calls already cached or failing are skipped)
+        Raises:
+            ValueError: For an unknown call kind
+        """
+        pending = []
+        for call in calls:
+            method, *arguments = call
+            if method == "scientific_function":
+                kind, name, operands = "function", arguments[0], arguments[1:]
+                compute = engine._scientific_function
+            elif method == "power":
+                kind, name, operands = "power", "", arguments
+                compute = engine._power
+            elif method == "evaluate":
+                kind, name = "expression", arguments[0]
+                operands = arguments[1] if len(arguments) > 1 else None
+                compute = engine._evaluate
+            else:
+                raise ValueError(f"Unknown call: {method}")
+            key = call_key(engine, kind, name, operands)
+            if key is None:
+                continue
+            with self._lock:
+                cached = self._connection.execute(
+                    "SELECT 1 FROM results WHERE key = ?", (key,)).fetchone()
+            if cached:
+                continue
+            try:
+                value = compute(*arguments)
+            except (ValueError, ZeroDivisionError, OverflowError):
+                continue
+            if isinstance(value, _VALUE_TYPES):
+                pending.append((key, pack_value(value)))
+
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for key, data in pending:
+                    if len(key) + len(data) <= self.max_bytes:
+                        self._insert(key, data)
+                self._flush_touched()
+                self._evict()
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return len(pending)
+
+    # Maintenance -------------------------------------------------------------
+
+    def info(self):
+        """
+        Get cache statistics
+        Returns:
+            Dictionary with this process's hits, misses, stores and evictions,
+            and the file's entries, bytes and max_bytes
+        """
+        with self._lock:
+            entries, size = self._usage()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        """Delete every stored result (for all processes using the file)"""
+        with self._lock:
+            self._touched.clear()
+            self._connection.execute("DELETE FROM results")
+
+    def close(self):
+        """Write pending hit times and close the file"""
+        with self._lock:
+            if self._connection is None:
+                return
+            try:
+                self._flush_touched()
+            except sqlite3.Error:
+                # Recency hints only - nothing is lost
+                pass
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
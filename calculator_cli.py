@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Calculator Command Line Module
+Headless batch mode: streams expressions or operation records through the engine
+
+Input is read line by line, so memory use stays constant regardless of input
+size. With --workers, chunks of lines are evaluated in a process pool while
+results are still written in input order.
+
+Input formats:
+    expr     One infix expression per line, e.g. "2 * sqrt(16) + PI"
+    records  One operation per line: "<op> <a> [<b>]" (spaces or commas),
+             e.g. "/ 10 4", "sqrt,2", "power 2 64", "percentage 250 15"
+    csv, tsv Delimited rows; each -e expression over the columns (by header
+             name or col1, col2, ...) adds a result column, e.g.
+             -e "total = price * 1.17" -e "sqrt(col3)" (see calculator_csv)
+"""
+
+import argparse
+import sys
+from collections import deque
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from calculator_engine import ANGLE_MODES, CalculatorEngine, NUMBER_MODES
+from calculator_rational import Rational
+from config import config
+
+# Operation codes accepted in records mode besides the scientific functions
+RECORD_BINARY_OPERATIONS = ("+", "-", "*", "/", "power", "percentage")
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Engine used by the current (worker) process
+_engine = None
+
+# Whether the current process writes integer results with every digit
+_full_digits = False
+
+
+def _init_worker(number_mode, precision, instrument=False, angle_mode="degrees",
+                 full_digits=False, result_cache=None):
+    """Create the engine for this process"""
+    global _engine, _full_digits
+    _engine = CalculatorEngine(number_mode=number_mode, precision=precision,
+                               angle_mode=angle_mode)
+    if instrument:
+        _engine.enable_instrumentation()
+    if result_cache:
+        _engine.enable_result_cache(result_cache)
+    _full_digits = full_digits
+
+
+def format_result(engine, value, full_digits=False):
+    """
+    Render an engine result the way the calculator display does
+    Huge integers are shown in scientific notation unless full_digits is set.
+    """
+    if isinstance(value, int) and full_digits:
+        from calculator_bignum import decimal_string
+        return decimal_string(value)
+    if isinstance(value, (Decimal, int, Rational)):
+        return engine.format_number(value)
+    return str(value)
+
+
+def _parse_operand(engine, text):
+    if engine.number_mode != "float":
+        # Rational mode takes the exact Decimal value
+        try:
+            return Decimal(text)
+        except InvalidOperation:
+            raise ValueError(f"Invalid input: {text}")
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"Invalid input: {text}")
+
+
+def evaluate_record(engine, line):
+    """
+    Evaluate one "<op> <a> [<b>]" record
+    Args:
+        engine: CalculatorEngine instance
+        line: Record text
+    Returns:
+        Calculation result
+    Raises:
+        ValueError: For malformed records or invalid calculations
+        ZeroDivisionError: For division by zero
+    """
+    fields = line.replace(",", " ").split()
+    if not fields:
+        raise ValueError("Empty record")
+    operation, operands = fields[0], [_parse_operand(engine, f) for f in fields[1:]]
+
+    if operation in RECORD_BINARY_OPERATIONS:
+        if len(operands) != 2:
+            raise ValueError(f"Operation {operation} needs two operands")
+        a, b = operands
+        if operation == "power":
+            return engine.power(a, b)
+        if operation == "percentage":
+            return engine.percentage_calculation(a, b)
+        return engine._perform_calculation(a, b, operation)
+
+    if len(operands) != 1:
+        raise ValueError(f"Function {operation} needs one operand")
+    return engine.scientific_function(operation, operands[0])
+
+
+def evaluate_line(engine, line, input_format, full_digits=False):
+    """
+    Evaluate one input line and return its output line (without newline)
+    Errors are reported inline as "Error: <message>" so one bad line never
+    aborts the run.
+    """
+    line = line.strip()
+    if not line:
+        return ""
+    try:
+        if input_format == "records":
+            result = evaluate_record(engine, line)
+        else:
+            result = engine.evaluate(line)
+        return format_result(engine, result, full_digits)
+    except (ValueError, ZeroDivisionError, OverflowError, TypeError) as e:
+        return f"Error: {e}"
+
+
+def _evaluate_chunk(lines, input_format):
+    """Worker entry point: evaluate a chunk of lines with this process's engine"""
+    return "".join(evaluate_line(_engine, line, input_format, _full_digits) + "\n"
+                   for line in lines)
+
+
+def _chunks(lines, chunk_size):
+    iterator = iter(lines)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def process_stream(lines, output, input_format="expr", workers=0,
+                   chunk_size=DEFAULT_CHUNK_SIZE, number_mode="float", precision=10,
+                   instrument=False, angle_mode="degrees", full_digits=False,
+                   result_cache=None):
+    """
+    Evaluate a stream of lines and write one output line per input line
+    Args:
+        lines: Iterable of input lines
+        output: Writable text stream
+        input_format: "expr" or "records"
+        workers: Number of worker processes (0 evaluates in this process)
+        chunk_size: Lines per chunk handed to a worker
+        number_mode: Engine number mode ("float", "decimal" or "rational")
+        precision: Decimal places kept in decimal mode
+        instrument: Record engine metrics (in-process evaluation only)
+        angle_mode: Unit of sin/cos/tan arguments ("degrees" or "radians")
+        full_digits: Write integer results in full instead of in scientific
+            notation when they are too long for the display
+        result_cache: calculator_cache file shared by every worker (optional)
+    Returns:
+        Number of lines processed
+    """
+    count = 0
+    if workers <= 0:
+        _init_worker(number_mode, precision, instrument, angle_mode, full_digits, result_cache)
+        for chunk in _chunks(lines, chunk_size):
+            output.write(_evaluate_chunk(chunk, input_format))
+            count += len(chunk)
+        return count
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Bound the number of chunks in flight so memory stays constant
+    max_pending = workers * 2
+    pending = deque()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(number_mode, precision, False, angle_mode, full_digits, result_cache)
+    ) as executor:
+        for chunk in _chunks(lines, chunk_size):
+            pending.append(executor.submit(_evaluate_chunk, chunk, input_format))
+            count += len(chunk)
+            if len(pending) >= max_pending:
+                output.write(pending.popleft().result())
+        while pending:
+            output.write(pending.popleft().result())
+    return count
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="calculator_cli.py",
+        description="Evaluate expressions or operation records without the GUI."
+    )
+    parser.add_argument("input", nargs="?", default="-",
+                        help="input file (default: stdin)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="output file (default: stdout)")
+    parser.add_argument("-f", "--format", choices=("expr", "records", "csv", "tsv"),
+                        default="expr", dest="input_format", help="input format")
+    parser.add_argument("-e", "--expression", action="append", default=[], dest="expressions",
+                        help="csv/tsv: result column, \"[name =] expression\" (repeatable)")
+    parser.add_argument("--delimiter", default=None,
+                        help="csv/tsv: field delimiter (default: comma, or tab for tsv)")
+    parser.add_argument("--no-header", action="store_true",
+                        help="csv/tsv: the first row is data, columns are col1, col2, ...")
+    parser.add_argument("--chunk-bytes", type=int, default=None,
+                        help="csv/tsv: bytes read per block")
+    parser.add_argument("-j", "--workers", type=int, default=0,
+                        help="worker processes (default: evaluate in-process)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="lines per worker chunk")
+    parser.add_argument("--mode", choices=NUMBER_MODES, default=None,
+                        help="number mode (default: from configuration)")
+    parser.add_argument("--precision", type=int, default=None,
+                        help="decimal places (default: from configuration)")
+    parser.add_argument("--angle-mode", choices=ANGLE_MODES, default=None,
+                        help="trigonometric argument unit (default: from configuration)")
+    parser.add_argument("--full-digits", action="store_true",
+                        help="write huge integer results (e.g. factorials) with every digit")
+    parser.add_argument("--result-cache", metavar="PATH",
+                        help="reuse results across runs and workers from this SQLite file")
+    parser.add_argument("--metrics", choices=("json", "prometheus"),
+                        help="print engine metrics to stderr when done (in-process only)")
+    return parser
+
+
+def _main_csv(args, number_mode, precision, angle_mode):
+    """main() for delimited input; returns the process exit code"""
+    from calculator_csv import DEFAULT_CHUNK_BYTES, process_csv
+
+    if not args.expressions:
+        print("csv/tsv input needs at least one -e expression", file=sys.stderr)
+        return 2
+    if args.workers > 0 or args.metrics or args.result_cache:
+        print("--workers, --metrics and --result-cache are not supported with csv/tsv input",
+              file=sys.stderr)
+    delimiter = args.delimiter or ("\t" if args.input_format == "tsv" else ",")
+    source = sys.stdin.buffer if args.input == "-" else args.input
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        rows, errors = process_csv(
+            source, target, args.expressions,
+            delimiter=delimiter,
+            header=not args.no_header,
+            chunk_bytes=max(1, args.chunk_bytes or DEFAULT_CHUNK_BYTES),
+            number_mode=number_mode,
+            precision=precision,
+            angle_mode=angle_mode,
+            full_digits=args.full_digits
+        )
+    except BrokenPipeError:
+        return 0
+    except (ValueError, OSError) as e:
+        # Malformed expression, unknown column or unreadable input
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if target is not sys.stdout:
+            target.close()
+        else:
+            target.flush()
+    if errors:
+        print(f"{errors} result cells in {rows} rows are errors", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    """Command line entry point; returns the process exit code"""
+    args = build_parser().parse_args(argv)
+    number_mode = args.mode or config.get("number_mode", "float")
+    precision = args.precision if args.precision is not None else config.get("precision", 10)
+    angle_mode = args.angle_mode or config.get("angle_mode", "degrees")
+
+    if args.input_format in ("csv", "tsv"):
+        return _main_csv(args, number_mode, precision, angle_mode)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        process_stream(
+            source, target,
+            input_format=args.input_format,
+            workers=args.workers,
+            chunk_size=max(1, args.chunk_size),
+            number_mode=number_mode,
+            precision=precision,
+            instrument=bool(args.metrics) and args.workers <= 0,
+            angle_mode=angle_mode,
+            full_digits=args.full_digits,
+            result_cache=args.result_cache
+        )
+    except BrokenPipeError:
+        # Downstream consumer (e.g. head) went away
+        return 0
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+        else:
+            target.flush()
+
+    if args.metrics:
+        if args.workers > 0:
+            print("Metrics are only collected without --workers", file=sys.stderr)
+        else:
+            from calculator_metrics import to_json, to_prometheus
+            snapshot = _engine.metrics_snapshot()
+            exporter = to_json if args.metrics == "json" else to_prometheus
+            sys.stderr.write(exporter(snapshot).rstrip("\n") + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
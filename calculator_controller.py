@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Calculator Controller Module
+Keystroke logic of the calculator, free of Tk
+
+The controller owns the display text and the history line and drives a
+CalculatorEngine. Keys are grouped into classes (digit, point, operator,
+...) and every (state, key class) pair has one entry in a transition table.
+The table is expanded once at import into a dictionary per state keyed by
+the key itself, so replaying a recorded session costs one dictionary lookup
+and a small handler call per key. The GUI only renders display_text and
+history_text; other frontends and load tests call press() or replay().
+"""
+
+import re
+from decimal import Decimal, InvalidOperation
+
+from calculator_rational import Rational
+from config import Constants
+
+# Display states
+ZERO, INTEGER, FRACTION, RESULT, ERROR = range(5)
+STATE_NAMES = ("zero", "integer", "fraction", "result", "error")
+
+# Key classes
+(KEY_ZERO, KEY_DIGIT, KEY_POINT, KEY_OPERATOR, KEY_EQUALS,
+ KEY_BACKSPACE, KEY_CLEAR, KEY_CLEAR_ENTRY) = range(8)
+
+# A whole number typed or pasted as one block of text
+NUMBER_PATTERN = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+
+_OPERATOR_SYMBOLS = {"*": "×", "/": "÷"}
+
+_ERRORS = (ValueError, ZeroDivisionError, OverflowError)
+
+
+def _classify(text):
+    """State of a display showing text with no result pending"""
+    if text == "0":
+        return ZERO
+    if text == "Error":
+        return ERROR
+    return FRACTION if "." in text else INTEGER
+
+
+def _key_class(action):
+    if action == "0":
+        return KEY_ZERO
+    if action.isdigit():
+        return KEY_DIGIT
+    if action in ("+", "-", "*", "/"):
+        return KEY_OPERATOR
+    return {
+        ".": KEY_POINT, "=": KEY_EQUALS, "backspace": KEY_BACKSPACE,
+        "clear": KEY_CLEAR, "clear_entry": KEY_CLEAR_ENTRY,
+    }[action]
+
+
+def _build_keys():
+    """key (character, keysym or action name) -> (key class, action)"""
+    actions = set(Constants.KEY_MAPPINGS.values())
+    keys = {action: (_key_class(action), action) for action in actions}
+    for key, action in Constants.KEY_MAPPINGS.items():
+        keys[key] = (_key_class(action), action)
+    return keys
+
+
+KEYS = _build_keys()
+
+
+class CalculatorController:
+    """Display and keystroke handling on top of a CalculatorEngine
+
+    state follows the display: ZERO ("0"), INTEGER or FRACTION while a number
+    is typed, RESULT after an operator or "=" (the next digit starts a new
+    number) and ERROR. It is kept in step with engine.should_reset_display.
+    """
+
+    def __init__(self, engine, history=None, on_error=None):
+        """
+        Args:
+            engine: CalculatorEngine to drive
+            history: HistoryBuffer receiving "=" results (optional)
+            on_error: Called with the message when a key produces an error
+        """
+        self.engine = engine
+        self.history = history
+        self.on_error = on_error
+        self.display_text = "0"
+        self.history_text = ""
+        # (display text, exact value) of a result the display only shows
+        # rounded or in scientific notation
+        self.exact_result = None
+        self.state = ZERO
+        self.sync()
+
+    def sync(self):
+        """Re-derive the state after the engine changed behind the controller's back"""
+        if self.engine.should_reset_display and self.display_text != "Error":
+            self.state = RESULT
+        else:
+            self.state = _classify(self.display_text)
+
+    def press(self, key):
+        """
+        Handle one key
+        Args:
+            key: Key character, keysym (as in Constants.KEY_MAPPINGS) or action name
+        Returns:
+            False if the key is not a calculator key, else True
+        """
+        entry = _KEY_TABLES[self.state].get(key)
+        if entry is None:
+            return False
+        handler, action, next_state = entry
+        state = handler(self, action)
+        self.state = next_state if next_state is not None else state
+        return True
+
+    def replay(self, keys):
+        """
+        Press a recorded sequence of keys
+        Returns:
+            The display text afterwards
+        """
+        tables = _KEY_TABLES
+        state = self.state
+        try:
+            for key in keys:
+                entry = tables[state].get(key)
+                if entry is not None:
+                    handler, action, next_state = entry
+                    state = handler(self, action)
+                    if next_state is not None:
+                        state = next_state
+        finally:
+            self.state = state
+        return self.display_text
+
+    # Values ---------------------------------------------------------------
+
+    def value(self):
+        """
+        Parse the display text as a number for the engine
+        Raises:
+            ValueError: If the display does not show a number
+        """
+        text = self.display_text
+        exact = self.exact_result
+        if exact is not None and exact[0] == text:
+            # Unchanged shortened result - continue with every digit
+            return exact[1]
+        number_mode = self.engine.number_mode
+        if number_mode != "float":
+            try:
+                value = Decimal(text)
+            except InvalidOperation:
+                raise ValueError(f"could not convert string to Decimal: '{text}'")
+            if number_mode == "rational":
+                return Rational.from_value(value)
+            return value
+        return float(text)
+
+    def format_value(self, value):
+        """Render an engine value for the display"""
+        if isinstance(value, (Decimal, int, Rational)):
+            return self.engine.format_number(value)
+        return str(value)
+
+    def show_result(self, value, text=None, reset_display=False):
+        """
+        Show an engine result, remembering the exact integer when the display
+        only shows it in scientific notation (e.g. a large factorial) and the
+        exact fraction behind a rounded rational-mode result (e.g. 1/3)
+        Args:
+            value: Engine result
+            text: Display text if already formatted (e.g. by the worker)
+            reset_display: Start a new number on the next digit
+        """
+        if text is None:
+            text = self.format_value(value)
+        if (isinstance(value, int) and "e" in text) or isinstance(value, Rational):
+            self.exact_result = (text, value)
+        else:
+            self.exact_result = None
+        self.display_text = text
+        if reset_display:
+            self.engine.should_reset_display = True
+        self.sync()
+
+    def show_error(self, message, clear_history=False):
+        """Show "Error" and report message through on_error"""
+        self.display_text = "Error"
+        self.state = ERROR
+        if clear_history:
+            self.history_text = ""
+        if self.on_error is not None:
+            self.on_error(message)
+
+    def enter_text(self, text):
+        """
+        Enter a block of text (pasted or scanned): a number replaces the
+        current entry, anything else is evaluated as an expression
+        """
+        text = text.strip().replace(" ", "").replace("_", "")
+        if not text:
+            return
+        if NUMBER_PATTERN.match(text):
+            if text.startswith("+"):
+                text = text[1:]
+            self.display_text = text
+            self.engine.should_reset_display = False
+            self.state = _classify(text)
+            return
+        try:
+            result = self.engine.evaluate(text)
+        except (ValueError, ZeroDivisionError, OverflowError) as e:
+            self.show_error(str(e))
+            return
+        self.show_result(result, reset_display=True)
+
+    # Key handlers: called as handler(controller, action); the return value
+    # is the next state when the table entry leaves it open (None)
+
+    def _replace(self, action):
+        self.display_text = action
+        self.engine.should_reset_display = False
+
+    def _append(self, action):
+        self.display_text += action
+
+    def _ignore(self, action):
+        pass
+
+    def _start_fraction(self, action):
+        self.display_text = "0."
+        self.engine.should_reset_display = False
+
+    def _chop(self, action):
+        text = self.display_text
+        self.display_text = text[:-1] if len(text) > 1 else "0"
+
+    def _chop_entry(self, action):
+        self._chop(action)
+        return _classify(self.display_text)
+
+    def _clear_error(self, action):
+        # A failed operator leaves a pending reset in place
+        self.display_text = "0"
+        return RESULT if self.engine.should_reset_display else ZERO
+
+    def _reset_entry(self, action):
+        self.display_text = "0"
+        self.engine.should_reset_display = False
+
+    def _clear(self, action):
+        self.display_text = "0"
+        self.history_text = ""
+        self.exact_result = None
+        self.engine.clear()
+
+    def _operator(self, action):
+        engine = self.engine
+        try:
+            engine.operator(action, self.value())
+        except _ERRORS as e:
+            self.show_error(str(e))
+            return ERROR
+        # The display keeps the operand - it resets on the next digit
+        if engine.pending_operation:
+            symbol = _OPERATOR_SYMBOLS.get(action, action)
+            self.history_text = f"{self.format_value(engine.stored_value)} {symbol}"
+        return RESULT
+
+    def _equals(self, action):
+        engine = self.engine
+        try:
+            operand = self.value()
+            result = engine.calculate(operand)
+        except _ERRORS as e:
+            self.show_error(str(e), clear_history=True)
+            return ERROR
+        if engine.last_operation and self.history is not None:
+            self.history.append_binary(engine.last_operand, engine.last_operation, operand, result)
+        self.history_text = ""
+        self.show_result(result)
+        return self.state
+
+
+def _build_transitions():
+    """TRANSITIONS[state][key class] -> (handler, next state or None)"""
+    C = CalculatorController
+    operator = (C._operator, None)
+    equals = (C._equals, None)
+    clear = (C._clear, ZERO)
+    clear_entry = (C._reset_entry, ZERO)
+    table = {
+        ZERO: {
+            KEY_ZERO: (C._replace, ZERO),
+            KEY_DIGIT: (C._replace, INTEGER),
+            KEY_POINT: (C._start_fraction, FRACTION),
+            KEY_BACKSPACE: (C._chop, ZERO),
+        },
+        INTEGER: {
+            KEY_ZERO: (C._append, INTEGER),
+            KEY_DIGIT: (C._append, INTEGER),
+            KEY_POINT: (C._append, FRACTION),
+            KEY_BACKSPACE: (C._chop_entry, None),
+        },
+        FRACTION: {
+            KEY_ZERO: (C._append, FRACTION),
+            KEY_DIGIT: (C._append, FRACTION),
+            KEY_POINT: (C._ignore, FRACTION),
+            KEY_BACKSPACE: (C._chop_entry, None),
+        },
+        RESULT: {
+            KEY_ZERO: (C._replace, ZERO),
+            KEY_DIGIT: (C._replace, INTEGER),
+            KEY_POINT: (C._start_fraction, FRACTION),
+            # Editing a result keeps it a result: the next digit still starts over
+            KEY_BACKSPACE: (C._chop, RESULT),
+        },
+        ERROR: {
+            KEY_ZERO: (C._replace, ZERO),
+            KEY_DIGIT: (C._replace, INTEGER),
+            KEY_POINT: (C._start_fraction, FRACTION),
+            KEY_BACKSPACE: (C._clear_error, None),
+        },
+    }
+    transitions = []
+    for state in range(len(STATE_NAMES)):
+        row = dict(table[state])
+        row.update({KEY_OPERATOR: operator, KEY_EQUALS: equals,
+                    KEY_CLEAR: clear, KEY_CLEAR_ENTRY: clear_entry})
+        transitions.append(tuple(row[key_class] for key_class in range(8)))
+    return tuple(transitions)
+
+
+TRANSITIONS = _build_transitions()
+
+# Per state: key -> (handler, action, next state or None)
+_KEY_TABLES = tuple(
+    {key: row[key_class][:1] + (action,) + row[key_class][1:]
+     for key, (key_class, action) in KEYS.items()}
+    for row in TRANSITIONS
+)
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Calculator CSV Module
+Streams a CSV/TSV file through the engine, adding one result column per
+expression
+
+Expressions use the expression syntax over the row's cells, by header name
+or as col1, col2, ... (1-based): "price * 1.17", "sqrt(col3)",
+"percentage_calculation(base, pct)". "name = expression" names the output
+column.
+
+The input is read in fixed-size blocks of whole records (memory-mapped when
+it is a regular file), so memory use stays constant however large the file
+is. In float mode each block is evaluated column by column through
+calculator_batch (NumPy when installed). Rows the vectorized path flags, and
+results of 2**53 or more that a float may not hold exactly, are re-run
+through the engine's scalar path, which either produces the exact result
+(e.g. 23! or 200!) or the engine's error message. Cells are written as the
+CLI writes results, vector ones to the 15 significant digits a float holds.
+A bad cell puts "Error: <message>" in that row's result and the run
+continues.
+"""
+
+import csv
+import io
+import math
+import mmap
+import os
+import re
+from decimal import Decimal, InvalidOperation
+
+from calculator_batch import batch_binary, batch_function
+from calculator_cli import format_result
+from calculator_engine import FLOAT_MODE_DIGITS
+from calculator_expression import free_variables
+from config import ErrorMessages
+
+# Bytes read per block (rounded to whole records)
+DEFAULT_CHUNK_BYTES = 1 << 20
+
+_COLUMN_RE = re.compile(r"col([1-9][0-9]*)$")
+_NAMED_RE = re.compile(r"\s*([A-Za-z_][A-Za-z_0-9]*)\s*=(.*)$", re.DOTALL)
+
+# AST operators and their calculator_batch operation codes
+_BATCH_OPERATIONS = {"+": "+", "-": "-", "*": "*", "/": "/", "^": "power", "%": "percentage"}
+
+_ERRORS = (ValueError, ZeroDivisionError, OverflowError, TypeError)
+
+_NAN = float("nan")
+
+# Vector results this large may not be the exact integer the scalar path
+# computes (factorials, integer powers), so those rows are recomputed
+_EXACT_FLOAT_LIMIT = 2.0 ** 53
+
+
+def iter_record_blocks(source, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Read input as blocks of whole CSV records
+    Args:
+        source: File path, or a binary file object (e.g. sys.stdin.buffer)
+        chunk_bytes: Bytes read at a time
+    Yields:
+        bytes ending after a newline outside quotes (the last block may not),
+        so quoted line breaks never split a record
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        yield from _blocks(source.read, chunk_bytes)
+        return
+    with open(source, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty file, or not mappable (e.g. a named pipe)
+            yield from _blocks(f.read, chunk_bytes)
+            return
+        with mapped:
+            yield from _blocks(_mapped_reader(mapped), chunk_bytes)
+
+
+def _mapped_reader(mapped):
+    """mapped.read, releasing pages already read so resident memory stays flat"""
+    release = getattr(mmap, "MADV_DONTNEED", None)
+    if release is None:
+        return mapped.read
+    released = 0
+
+    def read(size):
+        nonlocal released
+        data = mapped.read(size)
+        position = mapped.tell() // mmap.PAGESIZE * mmap.PAGESIZE
+        if position > released:
+            mapped.madvise(release, released, position - released)
+            released = position
+        return data
+    return read
+
+
+def _blocks(read, chunk_bytes):
+    rest = b""
+    while True:
+        data = read(chunk_bytes)
+        if not data:
+            if rest:
+                yield rest
+            return
+        block, rest = _split_records(rest + data if rest else data)
+        if block:
+            yield block
+
+
+def _split_records(data):
+    """(complete records, remainder): data cut after its last newline outside quotes"""
+    # Quotes are doubled inside quoted fields, so the parity of the count
+    # before a newline tells whether it ends a record
+    quotes = data.count(b'"')
+    end = len(data)
+    while True:
+        newline = data.rfind(b"\n", 0, end)
+        if newline < 0:
+            return b"", data
+        quotes -= data.count(b'"', newline, end)
+        if quotes % 2 == 0:
+            return data[:newline + 1], data[newline + 1:]
+        end = newline
+
+
+def parse_expressions(texts):
+    """
+    Split "name = expression" texts into (column name, expression)
+    Unnamed expressions are named by their own text.
+    """
+    parsed = []
+    for text in texts:
+        match = _NAMED_RE.match(text)
+        if match and not match.group(2).startswith("="):
+            parsed.append((match.group(1), match.group(2).strip()))
+        else:
+            parsed.append((text.strip(), text.strip()))
+    return parsed
+
+
+def _column_index(name, header):
+    match = _COLUMN_RE.match(name)
+    if match:
+        return int(match.group(1)) - 1
+    if header is not None and name in header:
+        return header.index(name)
+    raise ValueError(f"Unknown column: {name}")
+
+
+class _Column:
+    """One output column: a compiled expression and the cells it reads"""
+
+    def __init__(self, engine, name, text, header):
+        self.name = name
+        self.compiled = engine.expression_compiler.compile(text)
+        self.cells = {variable: _column_index(variable, header)
+                      for variable in self.compiled.variables}
+        self.vector = _vector_function(self.compiled.ast, engine.angle_mode)
+
+
+def _vector_function(node, angle_mode):
+    """
+    Turn an AST node into a function of the block's columns returning
+    (values, error mask); a mask of None means no errors, True all rows
+    """
+    kind = node[0]
+    if not free_variables(node):
+        # Folding leaves only constant subtrees that raise
+        try:
+            constant = (float(node[1]), None) if kind == "num" else (_NAN, True)
+        except OverflowError:
+            constant = (_NAN, True)
+        return lambda columns: constant
+
+    if kind == "var":
+        name = node[1]
+        return lambda columns: columns[name]
+
+    if kind == "neg":
+        operand = _vector_function(node[1], angle_mode)
+
+        def negate(columns):
+            values, mask = operand(columns)
+            if isinstance(values, list):
+                return [-value for value in values], mask
+            return -values, mask
+        return negate
+
+    if kind == "call":
+        function = node[1]
+        argument = _vector_function(node[2], angle_mode)
+
+        def call(columns):
+            values, mask = argument(columns)
+            results, errors = batch_function(function, values, angle_mode)
+            return results, _either(mask, errors)
+        return call
+
+    operation = _BATCH_OPERATIONS[node[1]]
+    left = _vector_function(node[2], angle_mode)
+    right = _vector_function(node[3], angle_mode)
+
+    def binary(columns):
+        a, mask_a = left(columns)
+        b, mask_b = right(columns)
+        results, errors = batch_binary(operation, a, b)
+        return results, _either(_either(mask_a, mask_b), errors)
+    return binary
+
+
+def _either(mask1, mask2):
+    """Element-wise OR of two error masks (None, True, list or array)"""
+    if mask1 is None or mask2 is True:
+        return mask2
+    if mask2 is None or mask1 is True:
+        return mask1
+    if isinstance(mask1, list) and isinstance(mask2, list):
+        return [a or b for a, b in zip(mask1, mask2)]
+    return mask1 | mask2
+
+
+def _parse_cell(engine, text):
+    """Cell text as an engine operand"""
+    text = text.strip()
+    if engine.number_mode != "float":
+        try:
+            return Decimal(text)
+        except InvalidOperation:
+            raise ValueError(f"{ErrorMessages.INVALID_INPUT}: {text}")
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"{ErrorMessages.INVALID_INPUT}: {text}")
+
+
+class CsvCalculator:
+    """Evaluates expressions over the rows of one CSV/TSV stream"""
+
+    def __init__(self, engine, expressions, delimiter=",", header=True, full_digits=False):
+        """
+        Args:
+            engine: CalculatorEngine (number mode, precision and angle mode are used)
+            expressions: Expression texts, optionally "name = expression"
+            delimiter: Field delimiter ("\\t" for TSV)
+            header: Whether the first row names the columns
+            full_digits: Write huge integer results with every digit
+        """
+        if not expressions:
+            raise ValueError("No expressions given")
+        self.engine = engine
+        self.expressions = parse_expressions(expressions)
+        self.delimiter = delimiter
+        self.header = header
+        self.full_digits = full_digits
+        self.columns = None
+        self.rows = 0
+        self.errors = 0
+        # Float mode can use the vectorized path; other modes are exact per row
+        self.vectorized = engine.number_mode == "float"
+
+    def _start(self, header):
+        self.columns = [_Column(self.engine, name, text, header)
+                        for name, text in self.expressions]
+
+    def process(self, blocks, output):
+        """
+        Evaluate every record and write it with its result columns appended
+        Args:
+            blocks: Iterable of byte blocks of whole records (iter_record_blocks)
+            output: Writable text stream
+        Returns:
+            Number of data rows processed
+        """
+        writer = csv.writer(output, delimiter=self.delimiter, lineterminator="\n")
+        first = True
+        for block in blocks:
+            text = block.decode("utf-8-sig" if first else "utf-8", errors="replace")
+            rows = list(csv.reader(io.StringIO(text, newline=""), delimiter=self.delimiter))
+            if first:
+                first = False
+                if self.header and rows:
+                    header = rows.pop(0)
+                    self._start(header)
+                    writer.writerow(header + [column.name for column in self.columns])
+                else:
+                    self._start(None)
+            if rows:
+                writer.writerows(self.process_rows(rows))
+        if first:
+            # Empty input - still validate the expressions
+            self._start(None)
+        return self.rows
+
+    def process_rows(self, rows):
+        """
+        Evaluate a block of parsed rows
+        Returns:
+            The rows with one result cell per expression appended
+        """
+        results = [self._column_results(column, rows) for column in self.columns]
+        out = []
+        for i, row in enumerate(rows):
+            if not row:
+                # Blank line - passed through
+                out.append(row)
+                continue
+            out.append(row + [column_results[i] for column_results in results])
+        self.rows += sum(1 for row in rows if row)
+        return out
+
+    def _column_results(self, column, rows):
+        if not self.vectorized:
+            return [self._scalar(column, row) if row else "" for row in rows]
+
+        inputs = {name: self._parse_column(rows, index) for name, index in column.cells.items()}
+        values, mask = column.vector(inputs)
+        count = len(rows)
+        if not isinstance(values, list):
+            if getattr(values, "ndim", 1) == 0:
+                values = [float(values)] * count
+            else:
+                values = values.tolist()
+        if mask is None:
+            mask = [False] * count
+        elif mask is True:
+            mask = [True] * count
+        engine = self.engine
+        results = []
+        for row, value, error in zip(rows, values, mask):
+            if not row:
+                results.append("")
+            elif error or value != value or abs(value) >= _EXACT_FLOAT_LIMIT:
+                # Flagged by the vector path or possibly inexact: the scalar path decides
+                results.append(self._scalar(column, row))
+            else:
+                # Only FLOAT_MODE_DIGITS are significant (the scalar path's + - * /
+                # round there), and integral results are ints on the scalar path too
+                text = f"{value:.{FLOAT_MODE_DIGITS}g}"
+                if "." in text and "e" not in text:
+                    # Already what str() gives for the rounded float
+                    results.append(text)
+                else:
+                    value = float(text)
+                    results.append(format_result(engine, int(value) if value.is_integer() else value))
+        return results
+
+    def _parse_column(self, rows, index):
+        """(float values, error mask) of one input column, NaN for bad cells"""
+        values = []
+        mask = []
+        for row in rows:
+            try:
+                value = float(row[index])
+                if math.isnan(value):
+                    raise ValueError
+                values.append(value)
+                mask.append(False)
+            except (IndexError, ValueError):
+                values.append(_NAN)
+                mask.append(True)
+        return values, mask
+
+    def _scalar(self, column, row):
+        """One row through the engine's scalar path, errors as "Error: <message>\""""
+        engine = self.engine
+        try:
+            variables = {}
+            for name, index in column.cells.items():
+                if index >= len(row):
+                    raise ValueError(f"{ErrorMessages.INVALID_INPUT}: missing {name}")
+                variables[name] = _parse_cell(engine, row[index])
+            result = column.compiled.evaluate(variables)
+        except _ERRORS as e:
+            self.errors += 1
+            return f"Error: {e}"
+        return format_result(engine, result, self.full_digits)
+
+
+def process_csv(source, output, expressions, delimiter=",", header=True,
+                chunk_bytes=DEFAULT_CHUNK_BYTES, number_mode="float", precision=10,
+                angle_mode="degrees", full_digits=False):
+    """
+    Stream a CSV/TSV file through the engine
+    Args:
+        source: File path (memory-mapped) or binary file object
+        output: Writable text stream
+        expressions: Expression texts, optionally "name = expression"
+        delimiter: Field delimiter
+        header: Whether the first row names the columns
+        chunk_bytes: Bytes read per block
+        number_mode, precision, angle_mode: Engine settings
+        full_digits: Write huge integer results with every digit
+    Returns:
+        (rows processed, result cells holding an error)
+    Raises:
+        ValueError: For malformed expressions or unknown columns
+    """
+    from calculator_engine import CalculatorEngine
+
+    engine = CalculatorEngine(number_mode=number_mode, precision=precision, angle_mode=angle_mode)
+    calculator = CsvCalculator(engine, expressions, delimiter, header, full_digits)
+    rows = calculator.process(iter_record_blocks(source, chunk_bytes), output)
+    return rows, calculator.errors
@@ -5,22 +5,297 @@ Handles all mathematical operations and calculations
 """
 
 import math
-from decimal import Decimal, InvalidOperation, getcontext
+import struct
+import threading
+from decimal import Context, Decimal, DecimalException, InvalidOperation, Overflow, localcontext
+
+from calculator_memo import SHARED_CACHE
+from calculator_rational import Rational
+from config import Constants
+
+# Significant digits of the Decimal arithmetic behind float mode
+FLOAT_MODE_DIGITS = 15
+
+# Number modes: "float" round-trips through float after every operation,
+# "decimal" keeps values as Decimal (or int) end to end, "rational" keeps
+# exact fractions and rounds only for display
+NUMBER_MODES = ("float", "decimal", "rational")
+
+# Extra significant digits carried by decimal mode beyond the display places
+DECIMAL_GUARD_DIGITS = 20
+
+# Units of sin/cos/tan arguments
+ANGLE_MODES = ("degrees", "radians")
+
+# Significant digits a double holds; a higher precision switches factorial,
+# power, exp, ln and sqrt to calculator_precision
+DOUBLE_PRECISION_DIGITS = 15
+HIGH_PRECISION_FUNCTIONS = frozenset(("factorial", "exp", "ln", "sqrt"))
+
+# Integral Decimal results with more digits stay Decimal: exp(1e10) has a
+# short coefficient but billions of digits once spelled out as an int
+EXACT_INTEGER_DIGITS = 100000
+
+# Functions rational mode computes exactly (sqrt only for perfect squares)
+RATIONAL_FUNCTIONS = frozenset(("square", "reciprocal", "abs", "percent", "factorial", "sqrt"))
+
+# Snapshot layout: version, flags, pending and last operation codes, precision,
+# then any spelled-out operations and the stored value and last operand
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct("<BBBBI")
+_SNAPSHOT_OPERATIONS = (None, "+", "-", "*", "/")
+_SNAPSHOT_CODES = {operation: code for code, operation in enumerate(_SNAPSHOT_OPERATIONS)}
+_SPELLED_OPERATION = 255
+_RESET_DISPLAY_FLAG = 1
+_DECIMAL_MODE_FLAG = 2
+_RADIANS_FLAG = 4
+_RATIONAL_MODE_FLAG = 8
+# Value tags: small int, float, big int (two's complement bytes), Decimal
+# text, Rational (numerator and denominator as big ints)
+_INT, _FLOAT, _BIG_INT, _DECIMAL, _RATIONAL = range(5)
+_INT64 = struct.Struct("<q")
+_FLOAT64 = struct.Struct("<d")
+_LENGTH = struct.Struct("<I")
+
+
+def _pack_operation(operation, parts):
+    code = _SNAPSHOT_CODES.get(operation)
+    if code is None:
+        text = str(operation).encode()
+        parts.append(bytes((len(text),)) + text)
+        return _SPELLED_OPERATION
+    return code
+
+
+def _pack_value(value, parts):
+    if isinstance(value, Rational):
+        parts.append(bytes((_RATIONAL,)))
+        _pack_value(value.numerator, parts)
+        _pack_value(value.denominator, parts)
+    elif isinstance(value, int):
+        if -2 ** 63 <= value < 2 ** 63:
+            parts.append(bytes((_INT,)) + _INT64.pack(value))
+        else:
+            data = value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+            parts.append(bytes((_BIG_INT,)) + _LENGTH.pack(len(data)) + data)
+    elif isinstance(value, Decimal):
+        data = str(value).encode()
+        parts.append(bytes((_DECIMAL,)) + _LENGTH.pack(len(data)) + data)
+    elif isinstance(value, float):
+        parts.append(bytes((_FLOAT,)) + _FLOAT64.pack(value))
+    else:
+        raise TypeError(f"Cannot snapshot a value of type {type(value).__name__}")
+
+
+def _unpack_operation(code, data, offset):
+    if code != _SPELLED_OPERATION:
+        return _SNAPSHOT_OPERATIONS[code], offset
+    end = offset + 1 + data[offset]
+    return data[offset + 1:end].decode(), end
+
+
+def _unpack_value(data, offset):
+    tag = data[offset]
+    offset += 1
+    if tag == _INT:
+        return _INT64.unpack_from(data, offset)[0], offset + _INT64.size
+    if tag == _FLOAT:
+        return _FLOAT64.unpack_from(data, offset)[0], offset + _FLOAT64.size
+    if tag == _RATIONAL:
+        numerator, offset = _unpack_value(data, offset)
+        denominator, offset = _unpack_value(data, offset)
+        return Rational(numerator, denominator), offset
+    (length,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    payload = data[offset:offset + length]
+    if tag == _BIG_INT:
+        return int.from_bytes(payload, "little", signed=True), offset + length
+    return Decimal(payload.decode()), offset + length
+
+
+def pack_value(value):
+    """
+    Exact bytes for an engine value (int, float, Decimal or Rational), as in snapshots
+    Raises:
+        TypeError: For a value of any other type
+    """
+    parts = []
+    _pack_value(value, parts)
+    return b"".join(parts)
+
+
+def unpack_value(data):
+    """Value packed by pack_value()"""
+    return _unpack_value(data, 0)[0]
 
-# Set decimal precision for accurate calculations
-getcontext().prec = 15
 
 class CalculatorEngine:
-    def __init__(self):
+    # No per-instance __dict__: idle sessions stay small
+    __slots__ = (
+        "number_mode", "precision", "angle_mode", "high_precision",
+        "stored_value", "pending_operation", "last_operation", "last_operand",
+        "should_reset_display",
+        "_expression_compiler", "_metrics", "_float_context", "_decimal_context",
+        "_quantum", "_lock", "_result_cache", "_function_cache",
+    )
+
+    def __init__(self, number_mode="float", precision=10, angle_mode="degrees"):
+        """
+        Args:
+            number_mode: "float" (default) or "decimal"
+            precision: Decimal places kept in results (config["precision"])
+            angle_mode: "degrees" (default) or "radians" (config["angle_mode"])
+        """
+        if number_mode not in NUMBER_MODES:
+            raise ValueError(f"Unknown number mode: {number_mode}")
+        self.number_mode = number_mode
+        self._expression_compiler = None
+        self._metrics = None
+        self._result_cache = None
+        self._function_cache = SHARED_CACHE
+        # Every engine owns its contexts, so results never depend on the
+        # calling thread's decimal context
+        self._float_context = Context(prec=FLOAT_MODE_DIGITS)
+        # Guards the pending-operation state and settings changes
+        self._lock = threading.RLock()
+        self.set_precision(precision)
+        self.set_angle_mode(angle_mode)
         self.reset()
         
     def reset(self):
         """Reset the calculator engine to initial state"""
-        self.stored_value = 0
-        self.pending_operation = None
-        self.last_operation = None
-        self.last_operand = 0
-        self.should_reset_display = False  # This is crucial!
+        with self._lock:
+            self.stored_value = 0
+            self.pending_operation = None
+            self.last_operation = None
+            self.last_operand = 0
+            self.should_reset_display = False  # This is crucial!
+
+    def snapshot(self):
+        """
+        Pack the calculation state and settings into bytes
+        Metrics and compiled expressions are not included.
+        Returns:
+            Compact bytes for restore() or CalculatorEngine.from_snapshot()
+        """
+        parts = []
+        with self._lock:
+            flags = _RESET_DISPLAY_FLAG if self.should_reset_display else 0
+            if self.number_mode == "decimal":
+                flags |= _DECIMAL_MODE_FLAG
+            elif self.number_mode == "rational":
+                flags |= _RATIONAL_MODE_FLAG
+            if self.angle_mode == "radians":
+                flags |= _RADIANS_FLAG
+            pending = _pack_operation(self.pending_operation, parts)
+            last = _pack_operation(self.last_operation, parts)
+            _pack_value(self.stored_value, parts)
+            _pack_value(self.last_operand, parts)
+            precision = self.precision
+        header = _SNAPSHOT_HEADER.pack(SNAPSHOT_VERSION, flags, pending, last, precision)
+        return header + b"".join(parts)
+
+    def restore(self, data):
+        """
+        Replace the calculation state and settings with a snapshot()
+        Args:
+            data: Bytes returned by snapshot()
+        Raises:
+            ValueError: For data that is not a supported snapshot
+        """
+        try:
+            version, flags, pending, last, precision = _SNAPSHOT_HEADER.unpack_from(data, 0)
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version: {version}")
+            offset = _SNAPSHOT_HEADER.size
+            pending_operation, offset = _unpack_operation(pending, data, offset)
+            last_operation, offset = _unpack_operation(last, data, offset)
+            stored_value, offset = _unpack_value(data, offset)
+            last_operand, offset = _unpack_value(data, offset)
+        except (struct.error, IndexError, UnicodeDecodeError, DecimalException,
+                ZeroDivisionError) as e:
+            raise ValueError(f"Invalid snapshot: {e}")
+
+        with self._lock:
+            if flags & _DECIMAL_MODE_FLAG:
+                number_mode = "decimal"
+            elif flags & _RATIONAL_MODE_FLAG:
+                number_mode = "rational"
+            else:
+                number_mode = "float"
+            if number_mode != self.number_mode:
+                self.number_mode = number_mode
+                # Compiled expressions read literals and fold constants in the old mode
+                if self._expression_compiler is not None:
+                    self._expression_compiler.clear()
+            if precision != self.precision:
+                self.set_precision(precision)
+            angle_mode = "radians" if flags & _RADIANS_FLAG else "degrees"
+            if angle_mode != self.angle_mode:
+                self.set_angle_mode(angle_mode)
+            self.stored_value = stored_value
+            self.pending_operation = pending_operation
+            self.last_operation = last_operation
+            self.last_operand = last_operand
+            self.should_reset_display = bool(flags & _RESET_DISPLAY_FLAG)
+
+    @classmethod
+    def from_snapshot(cls, data):
+        """Create an engine from snapshot() bytes"""
+        engine = cls()
+        engine.restore(data)
+        return engine
+
+    def set_precision(self, precision):
+        """
+        Set the number of decimal places kept in decimal-mode results
+        Args:
+            precision: Decimal places (config["precision"])
+        """
+        precision = int(precision)
+        context = Context(prec=precision + DECIMAL_GUARD_DIGITS)
+        with self._lock:
+            self.precision = precision
+            self._decimal_context = context
+            self._quantum = Decimal(1).scaleb(-precision, context)
+            # More places than a double holds: use the arbitrary-precision algorithms
+            self.high_precision = precision > DOUBLE_PRECISION_DIGITS
+            # Folded constants in compiled expressions depend on the precision
+            if self._expression_compiler is not None:
+                self._expression_compiler.clear()
+
+    def set_angle_mode(self, angle_mode):
+        """
+        Set the unit of trigonometric function arguments
+        Args:
+            angle_mode: "degrees" or "radians" (config["angle_mode"])
+        Raises:
+            ValueError: For unknown angle modes
+        """
+        if angle_mode not in ANGLE_MODES:
+            raise ValueError(f"Unknown angle mode: {angle_mode}")
+        with self._lock:
+            self.angle_mode = angle_mode
+            if self._expression_compiler is not None:
+                self._expression_compiler.clear()
+
+    def _to_radians(self, value):
+        """Convert a trigonometric argument to radians according to angle_mode"""
+        if self.angle_mode == "degrees":
+            return math.radians(value)
+        return value
+
+    @property
+    def expression_compiler(self):
+        """Compiler (and compiled-expression cache) used by evaluate()"""
+        compiler = self._expression_compiler
+        if compiler is None:
+            from calculator_expression import ExpressionCompiler
+            with self._lock:
+                compiler = self._expression_compiler
+                if compiler is None:
+                    compiler = self._expression_compiler = ExpressionCompiler(self)
+        return compiler
         
     def clear(self):
         """Clear all stored values and operations"""
@@ -35,15 +310,16 @@ class CalculatorEngine:
         Returns:
             Value to display
         """
-        if self.pending_operation is not None:
-            # If there's already a pending operation, calculate it first
-            result = self._perform_calculation(self.stored_value, current_value, self.pending_operation)
-            self.stored_value = result
-        else:
-            self.stored_value = current_value
-            
-        self.pending_operation = operation
-        self.should_reset_display = True  # This MUST be set to True
+        with self._lock:
+            if self.pending_operation is not None:
+                # If there's already a pending operation, calculate it first
+                result = self._perform_calculation(self.stored_value, current_value, self.pending_operation)
+                self.stored_value = result
+            else:
+                self.stored_value = current_value
+                
+            self.pending_operation = operation
+            self.should_reset_display = True  # This MUST be set to True
         
         # Return the current value for display (don't change what user sees)
         return current_value
@@ -56,21 +332,22 @@ class CalculatorEngine:
         Returns:
             Calculation result
         """
-        if self.pending_operation is None:
-            return current_value
+        with self._lock:
+            if self.pending_operation is None:
+                return current_value
+                
+            result = self._perform_calculation(self.stored_value, current_value, self.pending_operation)
             
-        result = self._perform_calculation(self.stored_value, current_value, self.pending_operation)
-        
-        # Store for repeat calculations
-        self.last_operation = self.pending_operation
-        self.last_operand = self.stored_value
-        
-        # Reset pending operation
-        self.pending_operation = None
-        self.stored_value = result
-        self.should_reset_display = True
-        
-        return result
+            # Store for repeat calculations
+            self.last_operation = self.pending_operation
+            self.last_operand = self.stored_value
+            
+            # Reset pending operation
+            self.pending_operation = None
+            self.stored_value = result
+            self.should_reset_display = True
+            
+            return result
         
     def _perform_calculation(self, operand1, operand2, operation):
         """
@@ -85,21 +362,27 @@ class CalculatorEngine:
             ValueError: For invalid operations
             ZeroDivisionError: For division by zero
         """
+        if self.number_mode == "decimal":
+            return self._decimal_calculation(operand1, operand2, operation)
+        if self.number_mode == "rational":
+            return self._rational_calculation(operand1, operand2, operation)
+
+        context = self._float_context
         try:
             # Use Decimal for precise calculations
             a = Decimal(str(operand1))
             b = Decimal(str(operand2))
             
             if operation == "+":
-                result = a + b
+                result = context.add(a, b)
             elif operation == "-":
-                result = a - b
+                result = context.subtract(a, b)
             elif operation == "*":
-                result = a * b
+                result = context.multiply(a, b)
             elif operation == "/":
                 if b == 0:
                     raise ZeroDivisionError("Cannot divide by zero")
-                result = a / b
+                result = context.divide(a, b)
             else:
                 raise ValueError(f"Unknown operation: {operation}")
                 
@@ -115,7 +398,90 @@ class CalculatorEngine:
                 
         except (InvalidOperation, ValueError) as e:
             raise ValueError(f"Invalid calculation: {e}")
+
+    def _to_decimal(self, value):
+        """Convert an operand to Decimal without going through str() when possible"""
+        if isinstance(value, Decimal):
+            return value
+        if isinstance(value, int):
+            return Decimal(value)
+        if isinstance(value, Rational):
+            return value.to_decimal(self._decimal_context)
+        # Floats use their shortest repr so 0.1 stays 0.1
+        return Decimal(repr(value))
+
+    def _decimal_result(self, result):
+        """Round a Decimal result to the configured places, int when integral"""
+        try:
+            result = self._decimal_context.quantize(result, self._quantum)
+        except InvalidOperation:
+            # Too many integer digits to keep every decimal place - keep as is
+            pass
+        if result == result.to_integral_value() and result.adjusted() < EXACT_INTEGER_DIGITS:
+            return int(result)
+        return result.normalize(self._decimal_context)
+
+    def _decimal_calculation(self, operand1, operand2, operation):
+        """
+        Decimal-mode counterpart of _perform_calculation
+        Operands and results stay Decimal (or int); no float round-trip.
+        """
+        context = self._decimal_context
+        try:
+            a = self._to_decimal(operand1)
+            b = self._to_decimal(operand2)
+
+            if operation == "+":
+                result = context.add(a, b)
+            elif operation == "-":
+                result = context.subtract(a, b)
+            elif operation == "*":
+                result = context.multiply(a, b)
+            elif operation == "/":
+                if not b:
+                    raise ZeroDivisionError("Cannot divide by zero")
+                result = context.divide(a, b)
+            else:
+                raise ValueError(f"Unknown operation: {operation}")
+
+            return self._decimal_result(result)
+
+        except (DecimalException, ValueError) as e:
+            raise ValueError(f"Invalid calculation: {e}")
             
+    def _rational_result(self, result):
+        """int when the fraction is whole, else the (possibly unreduced) Rational"""
+        if result.is_integer():
+            return result.numerator // result.denominator
+        return result
+
+    def _rational_calculation(self, operand1, operand2, operation):
+        """
+        Rational-mode counterpart of _perform_calculation
+        Exact: 1 / 3 * 3 is 1. Fractions are reduced lazily (see calculator_rational).
+        """
+        try:
+            a = Rational.from_value(operand1)
+            b = Rational.from_value(operand2)
+
+            if operation == "+":
+                result = a + b
+            elif operation == "-":
+                result = a - b
+            elif operation == "*":
+                result = a * b
+            elif operation == "/":
+                if not b:
+                    raise ZeroDivisionError("Cannot divide by zero")
+                result = a / b
+            else:
+                raise ValueError(f"Unknown operation: {operation}")
+
+            return self._rational_result(result)
+
+        except (DecimalException, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid calculation: {e}")
+
     def scientific_function(self, function, value):
         """
         Perform scientific functions
@@ -127,6 +493,38 @@ class CalculatorEngine:
         Raises:
             ValueError: For invalid input or function
         """
+        memo = self._function_cache
+        # Cheap float-mode functions skip the memo: a lookup costs more
+        if memo is not None and (self.number_mode != "float" or self.high_precision
+                                 or function in memo.float_functions
+                                 and memo.large_result(function, value)):
+            if self._result_cache is None:
+                compute = self._scientific_function
+            else:
+                compute = self._stored_scientific_function
+            return memo.function(self, function, value, compute)
+        if self._result_cache is None:
+            return self._scientific_function(function, value)
+        return self._stored_scientific_function(function, value)
+
+    def _stored_scientific_function(self, function, value):
+        """scientific_function below the in-memory cache: the result cache, then computation"""
+        cache = self._result_cache
+        if cache is not None:
+            return cache.call(self, "function", function, (value,),
+                              lambda: self._scientific_function(function, value))
+        return self._scientific_function(function, value)
+
+    def _scientific_function(self, function, value):
+        """scientific_function without any cache"""
+        if self.number_mode == "rational" and function in RATIONAL_FUNCTIONS:
+            return self._rational_scientific_function(function, value)
+        if self.high_precision and function in HIGH_PRECISION_FUNCTIONS:
+            return self._high_precision_function(function, value)
+        if self.number_mode != "float":
+            # Inexact functions in rational mode return a rounded Decimal
+            return self._decimal_scientific_function(function, value)
+
         try:
             if function == "sqrt":
                 if value < 0:
@@ -142,13 +540,13 @@ class CalculatorEngine:
                 result = 1 / value
                 
             elif function == "sin":
-                result = math.sin(math.radians(value))
+                result = math.sin(self._to_radians(value))
                 
             elif function == "cos":
-                result = math.cos(math.radians(value))
+                result = math.cos(self._to_radians(value))
                 
             elif function == "tan":
-                result = math.tan(math.radians(value))
+                result = math.tan(self._to_radians(value))
                 
             elif function == "log":
                 if value <= 0:
@@ -185,7 +583,394 @@ class CalculatorEngine:
                 
         except (ValueError, OverflowError) as e:
             raise ValueError(f"Function error: {e}")
-            
+
+    def _decimal_scientific_function(self, function, value):
+        """Decimal-mode counterpart of scientific_function"""
+        context = self._decimal_context
+        try:
+            value = self._to_decimal(value)
+
+            if function == "sqrt":
+                if value < 0:
+                    raise ValueError("Cannot calculate square root of negative number")
+                result = context.sqrt(value)
+
+            elif function == "square":
+                result = context.multiply(value, value)
+
+            elif function == "reciprocal":
+                if not value:
+                    raise ZeroDivisionError("Cannot calculate reciprocal of zero")
+                result = context.divide(1, value)
+
+            elif function in ("sin", "cos", "tan"):
+                # No Decimal trigonometry - compute in float, keep the repr digits
+                radians = self._to_radians(float(value))
+                result = Decimal(repr(getattr(math, function)(radians)))
+
+            elif function == "log":
+                if value <= 0:
+                    raise ValueError("Logarithm undefined for non-positive numbers")
+                result = context.log10(value)
+
+            elif function == "ln":
+                if value <= 0:
+                    raise ValueError("Natural logarithm undefined for non-positive numbers")
+                result = context.ln(value)
+
+            elif function == "exp":
+                result = context.exp(value)
+
+            elif function == "factorial":
+                if value < 0 or value != value.to_integral_value():
+                    raise ValueError("Factorial only defined for non-negative integers")
+                return math.factorial(int(value))
+
+            elif function == "abs":
+                result = context.abs(value)
+
+            elif function == "percent":
+                result = value.scaleb(-2, context)
+
+            else:
+                raise ValueError(f"Unknown function: {function}")
+
+            return self._decimal_result(result)
+
+        except (DecimalException, ValueError, OverflowError) as e:
+            raise ValueError(f"Function error: {e}")
+
+    def _rational_scientific_function(self, function, value):
+        """Exact scientific functions for rational mode"""
+        try:
+            value = Rational.from_value(value)
+
+            if function == "square":
+                result = value * value
+            elif function == "reciprocal":
+                if not value:
+                    raise ZeroDivisionError("Cannot calculate reciprocal of zero")
+                result = 1 / value
+            elif function == "abs":
+                result = abs(value)
+            elif function == "percent":
+                result = value / 100
+            elif function == "factorial":
+                if value < 0 or not value.is_integer():
+                    raise ValueError("Factorial only defined for non-negative integers")
+                value = int(value)
+                if not self.high_precision:
+                    return math.factorial(value)
+                result = None
+            else:
+                if value < 0:
+                    raise ValueError("Cannot calculate square root of negative number")
+                value = value.normalized()
+                root_numerator = math.isqrt(value.numerator)
+                root_denominator = math.isqrt(value.denominator)
+                if (root_numerator * root_numerator != value.numerator or
+                        root_denominator * root_denominator != value.denominator):
+                    result = None
+                else:
+                    result = Rational(root_numerator, root_denominator)
+
+            if result is not None:
+                return self._rational_result(result)
+
+        except (DecimalException, TypeError, ValueError, OverflowError) as e:
+            raise ValueError(f"Function error: {e}")
+
+        # High-precision factorials and irrational roots: these raise their
+        # own messages, rounded like decimal mode
+        if self.high_precision:
+            return self._high_precision_function(function, value)
+        return self._decimal_scientific_function(function, value)
+
+    def _high_precision_function(self, function, value):
+        """
+        scientific_function for precisions beyond a double, in either number mode
+        Results carry the decimal-mode significant digits, so exp(1000) or
+        ln of a 300-digit number keep every requested place.
+        """
+        import calculator_precision
+        if isinstance(value, (float, Decimal)) and not math.isfinite(value):
+            if value != value:
+                raise ValueError("Invalid calculation: not a number")
+            if value > 0:
+                raise ValueError("Result too large to display")
+            # Negative infinity: exp gives 0, the others reject negatives
+
+        try:
+            if function == "factorial":
+                if value < 0 or value != int(value):
+                    raise ValueError("Factorial only defined for non-negative integers")
+                return calculator_precision.factorial(int(value))
+
+            value = self._to_decimal(value)
+            digits = self._decimal_context.prec
+            if function == "sqrt":
+                result = calculator_precision.sqrt(value, digits)
+            elif function == "exp":
+                result = calculator_precision.exp(value, digits)
+            else:
+                result = calculator_precision.ln(value, digits)
+            return self._decimal_result(result)
+
+        except Overflow:
+            raise ValueError("Result too large to display")
+        except (DecimalException, ValueError, OverflowError) as e:
+            raise ValueError(f"Function error: {e}")
+
+    def enable_instrumentation(self):
+        """
+        Start recording per-operation counts, errors and latencies
+        The engine switches to calculator_metrics.InstrumentedCalculatorEngine,
+        so a disabled engine pays nothing for the feature.
+        """
+        from calculator_metrics import EngineMetrics, InstrumentedCalculatorEngine
+        if self._metrics is None:
+            self._metrics = EngineMetrics()
+        self.__class__ = InstrumentedCalculatorEngine
+        # Compiled expressions hold bound methods of the previous class
+        if self._expression_compiler is not None:
+            self._expression_compiler.clear()
+
+    def disable_instrumentation(self):
+        """Stop recording metrics (collected counters are kept)"""
+        self.__class__ = CalculatorEngine
+        if self._expression_compiler is not None:
+            self._expression_compiler.clear()
+
+    @property
+    def instrumentation_enabled(self):
+        """True while metrics are being recorded"""
+        return self.__class__ is not CalculatorEngine
+
+    def metrics_snapshot(self):
+        """
+        Get recorded metrics
+        Returns:
+            Dictionary keyed by operation (e.g. "operator[+]") with count,
+            errors, timing totals and latency histogram buckets; empty if
+            instrumentation was never enabled
+        """
+        if self._metrics is None:
+            return {}
+        return self._metrics.snapshot()
+
+    def reset_metrics(self):
+        """Clear recorded metrics"""
+        if self._metrics is not None:
+            self._metrics.reset()
+
+    def evaluate(self, expression, variables=None):
+        """
+        Evaluate an infix expression
+        Supports + - * / ^, parentheses, unary minus, PI/E and every function
+        in Constants.SCIENTIFIC_FUNCTIONS. Compiled forms are cached by text,
+        so re-evaluating a formula with new variable bindings skips parsing.
+        Args:
+            expression: Expression text, e.g. "price * (1 + rate / 100)"
+            variables: Optional mapping of variable names to values
+        Returns:
+            Expression result
+        Raises:
+            ValueError: For malformed expressions or invalid calculations
+            ZeroDivisionError: For division by zero
+        """
+        cache = self._result_cache
+        if cache is not None:
+            return cache.call(self, "expression", expression, variables,
+                              lambda: self._evaluate(expression, variables))
+        return self._evaluate(expression, variables)
+
+    def _evaluate(self, expression, variables=None):
+        """evaluate without the result cache"""
+        # Unary minus and folding round Decimals in the current context - use ours
+        with localcontext(self._decimal_context):
+            return self.expression_compiler.compile(expression).evaluate(variables)
+
+    def expression_cache_info(self):
+        """
+        Get compiled-expression cache statistics
+        Returns:
+            Dictionary with hits, misses, size and maxsize
+        """
+        return self.expression_compiler.cache_info()
+
+    def set_function_cache(self, cache):
+        """
+        Choose the in-memory cache of scientific_function and power results
+        Args:
+            cache: calculator_memo.FunctionCache, or None to compute every call
+                   (engines share calculator_memo.SHARED_CACHE by default)
+        """
+        with self._lock:
+            self._function_cache = cache
+
+    def cache_info(self):
+        """
+        Get in-memory function cache statistics
+        Returns:
+            Dictionary with hits, misses, evictions, size, maxsize, bytes and
+            max_bytes; empty if the cache is switched off
+        """
+        memo = self._function_cache
+        return memo.info() if memo is not None else {}
+
+    def clear_cache(self):
+        """Empty the in-memory function cache (shared with engines using the same one)"""
+        memo = self._function_cache
+        if memo is not None:
+            memo.clear()
+
+    def enable_result_cache(self, path, max_bytes=None):
+        """
+        Serve scientific_function, power and evaluate from a persistent cache
+        Args:
+            path: SQLite cache file shared with other engines and processes,
+                  or an open calculator_cache.ResultCache
+            max_bytes: Size bound when opening a file (default: calculator_cache's)
+        """
+        from calculator_cache import DEFAULT_MAX_BYTES, ResultCache
+        if isinstance(path, ResultCache):
+            cache = path
+        else:
+            cache = ResultCache(path, max_bytes or DEFAULT_MAX_BYTES)
+        with self._lock:
+            self._result_cache = cache
+
+    def disable_result_cache(self):
+        """Compute every call again (the cache file is left as it is)"""
+        with self._lock:
+            self._result_cache = None
+
+    def result_cache_info(self):
+        """
+        Get persistent result cache statistics
+        Returns:
+            Dictionary with hits, misses, stores, evictions, entries, bytes
+            and max_bytes; empty if no cache is enabled
+        """
+        cache = self._result_cache
+        return cache.info() if cache is not None else {}
+
+    def warm_result_cache(self, calls):
+        """
+        Compute results ahead of use and store them in the enabled cache
+        Args:
+            calls: Iterable of ("scientific_function", function, value),
+                   ("power", base, exponent) or ("evaluate", expression[, variables])
+        Returns:
+            Number of results computed
+        Raises:
+            ValueError: If no cache is enabled or for an unknown call kind
+        """
+        cache = self._result_cache
+        if cache is None:
+            raise ValueError("No result cache enabled")
+        return cache.warm(self, calls)
+
+    def batch_calculation(self, operation, operands1, operands2):
+        """
+        Perform a binary operation over whole arrays of operands
+        Uses NumPy when available and a plain Python loop otherwise.
+        Args:
+            operation: Operation code (+, -, *, /, power, percentage)
+            operands1: Sequence or array of first operands (or a scalar)
+            operands2: Sequence or array of second operands (or a scalar)
+        Returns:
+            Tuple of (results, error_mask). Elements that would raise in
+            _perform_calculation (e.g. division by zero) are NaN in results
+            and True in error_mask.
+        Raises:
+            ValueError: For unknown operations
+        """
+        from calculator_batch import batch_binary
+        return batch_binary(operation, operands1, operands2)
+
+    def batch_scientific_function(self, function, values):
+        """
+        Perform a scientific function over a whole array of values
+        Args:
+            function: Function name (sqrt, square, reciprocal, etc.)
+            values: Sequence or array of input values
+        Returns:
+            Tuple of (results, error_mask). Elements outside the function's
+            domain (sqrt of negatives, log of non-positives, ...) are NaN in
+            results and True in error_mask.
+        Raises:
+            ValueError: For unknown functions
+        """
+        from calculator_batch import batch_function
+        return batch_function(function, values, self.angle_mode)
+
+    def parallel_calculation(self, operation, operands1, operands2, workers=None):
+        """
+        Perform a binary operation over many operands on a thread pool
+        Unlike batch_calculation, every element goes through the scalar path,
+        so results keep this engine's number mode and precision exactly.
+        Args:
+            operation: Operation code (+, -, *, /, power, percentage)
+            operands1: Sequence of first operands (or a scalar)
+            operands2: Sequence of second operands (or a scalar)
+            workers: Pool threads (default: based on the CPU count)
+        Returns:
+            Tuple of (results, error_mask) lists; failed elements are NaN in results
+        Raises:
+            ValueError: For unknown operations or mismatched lengths
+        """
+        from calculator_parallel import parallel_binary
+        return parallel_binary(self, operation, operands1, operands2, workers)
+
+    def parallel_scientific_function(self, function, values, workers=None):
+        """
+        Perform a scientific function over many values on a thread pool
+        Args:
+            function: Function name (sqrt, square, reciprocal, etc.)
+            values: Sequence of input values
+            workers: Pool threads (default: based on the CPU count)
+        Returns:
+            Tuple of (results, error_mask) lists; failed elements are NaN in results
+        Raises:
+            ValueError: For unknown functions
+        """
+        from calculator_parallel import parallel_function
+        return parallel_function(self, function, values, workers)
+
+    def shared_calculation(self, operation, operands1, operands2, workers=None):
+        """
+        Perform a binary operation over large arrays on worker processes
+        Operands sit in shared memory and each worker evaluates a slice in
+        place, with batch_calculation's float semantics.
+        Args:
+            operation: Operation code (+, -, *, /, power, percentage)
+            operands1: calculator_shared.SharedArray, other sequence or scalar
+            operands2: Same, for the second operands
+            workers: Worker processes (default: the CPU count)
+        Returns:
+            Tuple of (results, error_mask) SharedArrays; close() them when done
+        Raises:
+            ValueError: For unknown operations or mismatched lengths
+        """
+        from calculator_shared import shared_binary
+        return shared_binary(operation, operands1, operands2, workers)
+
+    def shared_scientific_function(self, function, values, workers=None):
+        """
+        Perform a scientific function over a large array on worker processes
+        Args:
+            function: Function name (sqrt, square, reciprocal, etc.)
+            values: calculator_shared.SharedArray or other sequence
+            workers: Worker processes (default: the CPU count)
+        Returns:
+            Tuple of (results, error_mask) SharedArrays; close() them when done
+        Raises:
+            ValueError: For unknown functions
+        """
+        from calculator_shared import shared_function
+        return shared_function(function, values, workers, self.angle_mode)
+
     def power(self, base, exponent):
         """
         Calculate base raised to exponent
@@ -195,6 +980,63 @@ class CalculatorEngine:
         Returns:
             Power result
         """
+        memo = self._function_cache
+        # Float powers skip the memo unless an exact integer power is large
+        if memo is not None and (self.number_mode != "float" or self.high_precision
+                                 or type(base) is int and type(exponent) is int
+                                 and memo.large_power(base, exponent)):
+            compute = self._power if self._result_cache is None else self._stored_power
+            return memo.power(self, base, exponent, compute)
+        if self._result_cache is None:
+            return self._power(base, exponent)
+        return self._stored_power(base, exponent)
+
+    def _stored_power(self, base, exponent):
+        """power below the in-memory cache: the result cache, then computation"""
+        cache = self._result_cache
+        if cache is not None:
+            return cache.call(self, "power", "", (base, exponent),
+                              lambda: self._power(base, exponent))
+        return self._power(base, exponent)
+
+    def _power(self, base, exponent):
+        """power without any cache"""
+        if self.number_mode == "rational":
+            result = self._rational_power(base, exponent)
+            if result is not None:
+                return result
+
+        if self.high_precision:
+            import calculator_precision
+            try:
+                result = calculator_precision.power(
+                    self._to_decimal(base), self._to_decimal(exponent), self._decimal_context.prec
+                )
+            except Overflow:
+                raise ValueError("Result too large to display")
+            except DecimalException:
+                raise ValueError("Invalid calculation: undefined power")
+            if isinstance(result, int):
+                return result
+            return self._decimal_result(result)
+
+        if self.number_mode != "float":
+            if not base:
+                if exponent < 0:
+                    raise ZeroDivisionError("Cannot divide by zero")
+                if not exponent:
+                    # The decimal context calls 0 ** 0 undefined; every other mode gives 1
+                    return 1
+            try:
+                result = self._decimal_context.power(
+                    self._to_decimal(base), self._to_decimal(exponent)
+                )
+                return self._decimal_result(result)
+            except Overflow:
+                raise ValueError("Result too large to display")
+            except DecimalException:
+                raise ValueError("Invalid calculation: undefined power")
+
         try:
             result = base ** exponent
             if result == int(result):
@@ -204,6 +1046,24 @@ class CalculatorEngine:
         except OverflowError:
             raise ValueError("Result too large to display")
             
+    def _rational_power(self, base, exponent):
+        """Exact power for an integral exponent, None when it must be rounded"""
+        from calculator_precision import EXACT_POWER_DIGITS
+        try:
+            base = Rational.from_value(base)
+            exponent = Rational.from_value(exponent)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid calculation: {e}")
+        if not exponent.is_integer():
+            return None
+        exponent = int(exponent)
+        base = base.normalized()
+        bits = max(abs(base.numerator).bit_length(), base.denominator.bit_length())
+        if bits * abs(exponent) * math.log10(2) > EXACT_POWER_DIGITS:
+            # Too long to keep exactly - round like decimal mode
+            return None
+        return self._rational_result(base ** exponent)
+
     def percentage_calculation(self, base_value, percentage):
         """
         Calculate percentage of a value
@@ -213,6 +1073,18 @@ class CalculatorEngine:
         Returns:
             Percentage result
         """
+        if self.number_mode == "rational":
+            try:
+                result = Rational.from_value(base_value) * Rational.from_value(percentage) / 100
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Invalid calculation: {e}")
+            return self._rational_result(result)
+
+        if self.number_mode == "decimal":
+            context = self._decimal_context
+            result = context.multiply(self._to_decimal(base_value), self._to_decimal(percentage))
+            return self._decimal_result(result.scaleb(-2, context))
+
         result = (base_value * percentage) / 100
         if result == int(result):
             return int(result)
@@ -227,6 +1099,28 @@ class CalculatorEngine:
         Returns:
             Formatted number string
         """
+        if isinstance(number, Rational):
+            # The only place a rational result is rounded
+            number = self._decimal_result(number.to_decimal(self._decimal_context))
+        if isinstance(number, Decimal):
+            if number == number.to_integral_value():
+                if number.adjusted() >= Constants.MAX_INTEGER_DIGITS:
+                    from calculator_bignum import format_scientific
+                    return format_scientific(number)
+                return str(int(number))
+            text = f"{number.normalize(self._decimal_context):f}"
+            point = text.find(".")
+            if point < 0 or len(text) - point - 1 <= self.precision:
+                return text
+            # A literal with more places than a computed result: round it the same way
+            number = self._decimal_result(number)
+            if isinstance(number, int):
+                return str(number)
+            return f"{number:f}"
+        if isinstance(number, int) and number.bit_length() > Constants.MAX_INTEGER_DIGITS * 3:
+            # Possibly too long to show (or even convert) in full
+            from calculator_bignum import format_integer
+            return format_integer(number)
         if isinstance(number, (int, float)):
             if number == int(number):
                 return str(int(number))
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Calculator Expression Module
+Parses infix expressions into an AST, folds constants and caches compiled forms
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+
+from config import Constants
+
+# Default number of compiled expressions kept per engine
+DEFAULT_CACHE_SIZE = 4096
+
+# Named constants usable inside expressions
+EXPRESSION_CONSTANTS = {
+    "PI": Constants.PI,
+    "pi": Constants.PI,
+    "π": Constants.PI,
+    "E": Constants.E,
+}
+
+# Deepest nesting of parentheses, calls, signs and powers the parser accepts;
+# far below the recursion limit that compiling and evaluating also need
+MAX_NESTING = 100
+
+# Display symbols accepted as aliases for the engine operators
+OPERATOR_ALIASES = {"×": "*", "÷": "/", "**": "^", "−": "-"}
+
+# Two-argument engine operations callable as functions, and their AST operator
+# ("%" is percentage_calculation, which has no infix form)
+BINARY_FUNCTIONS = {
+    "power": "^",
+    "percentage": "%",
+    "percentage_calculation": "%",
+}
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_π][A-Za-z_0-9]*)
+      | (?P<op>\*\*|[-+*/^×÷−(),])
+    )""", re.VERBOSE)
+
+
+class ExpressionError(ValueError):
+    """Raised for malformed expressions"""
+
+
+def tokenize(text):
+    """
+    Split expression text into (kind, value) tokens
+    Args:
+        text: Expression text
+    Returns:
+        List of tokens
+    Raises:
+        ExpressionError: For characters that cannot start a token
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if match is None:
+            character = text[position:].lstrip()[:1]
+            raise ExpressionError(f"Unexpected character: {character!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "op":
+            value = OPERATOR_ALIASES.get(value, value)
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser producing tuple-based AST nodes
+
+    Node shapes:
+        ("num", value)                     value is an int, a constant, or the
+                                           text of a literal with a point or
+                                           exponent (converted on compiling)
+        ("var", name)
+        ("neg", operand)
+        ("bin", operator, left, right)     operator is + - * / ^ or %
+        ("call", function, argument)
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+        self.depth = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("Empty expression")
+        node = self._expression()
+        if self.position != len(self.tokens):
+            raise ExpressionError(f"Unexpected token: {self.tokens[self.position][1]}")
+        return node
+
+    def _peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def _advance(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def _nested(self, parse):
+        """Run a parse method one nesting level deeper"""
+        self.depth += 1
+        if self.depth > MAX_NESTING:
+            raise ExpressionError("Expression nested too deeply")
+        node = parse()
+        self.depth -= 1
+        return node
+
+    def _expect(self, value):
+        kind, token = self._advance()
+        if token != value or kind != "op":
+            raise ExpressionError(f"Expected '{value}'")
+
+    def _expression(self):
+        node = self._term()
+        while self._peek() in (("op", "+"), ("op", "-")):
+            operator = self._advance()[1]
+            node = ("bin", operator, node, self._term())
+        return node
+
+    def _term(self):
+        node = self._unary()
+        while self._peek() in (("op", "*"), ("op", "/")):
+            operator = self._advance()[1]
+            node = ("bin", operator, node, self._unary())
+        return node
+
+    def _unary(self):
+        if self._peek() == ("op", "-"):
+            self._advance()
+            return ("neg", self._nested(self._unary))
+        if self._peek() == ("op", "+"):
+            self._advance()
+            return self._nested(self._unary)
+        return self._power()
+
+    def _power(self):
+        node = self._primary()
+        if self._peek() == ("op", "^"):
+            self._advance()
+            # Right associative, and binds tighter than unary minus on the left
+            node = ("bin", "^", node, self._nested(self._unary))
+        return node
+
+    def _primary(self):
+        kind, value = self._advance()
+        if kind == "number":
+            if "." in value or "e" in value or "E" in value:
+                # Kept as text: its value depends on the engine's number mode
+                return ("num", value)
+            return ("num", int(value))
+        if kind == "name":
+            if self._peek() == ("op", "(") and value in BINARY_FUNCTIONS:
+                self._advance()
+                left = self._nested(self._expression)
+                self._expect(",")
+                right = self._nested(self._expression)
+                self._expect(")")
+                return ("bin", BINARY_FUNCTIONS[value], left, right)
+            if self._peek() == ("op", "("):
+                if value not in Constants.SCIENTIFIC_FUNCTIONS:
+                    raise ExpressionError(f"Unknown function: {value}")
+                self._advance()
+                argument = self._nested(self._expression)
+                self._expect(")")
+                return ("call", value, argument)
+            if value in EXPRESSION_CONSTANTS:
+                return ("num", EXPRESSION_CONSTANTS[value])
+            return ("var", value)
+        if (kind, value) == ("op", "("):
+            node = self._nested(self._expression)
+            self._expect(")")
+            return node
+        if kind is None:
+            raise ExpressionError("Unexpected end of expression")
+        raise ExpressionError(f"Unexpected token: {value}")
+
+
+def parse(text):
+    """
+    Parse expression text into an AST
+    Args:
+        text: Expression text, e.g. "2 * sqrt(x) + PI"
+    Returns:
+        AST node tuple
+    Raises:
+        ExpressionError: For malformed expressions
+    """
+    return _Parser(tokenize(text)).parse()
+
+
+def free_variables(node):
+    """Return the set of variable names used by an AST node"""
+    kind = node[0]
+    if kind == "var":
+        return {node[1]}
+    if kind == "num":
+        return set()
+    if kind == "bin":
+        return free_variables(node[2]) | free_variables(node[3])
+    return free_variables(node[-1])
+
+
+class CompiledExpression:
+    """A parsed, constant-folded expression ready for repeated evaluation"""
+
+    def __init__(self, text, ast, function):
+        self.text = text
+        self.ast = ast
+        self.variables = frozenset(free_variables(ast))
+        self._function = function
+
+    def evaluate(self, variables=None):
+        """
+        Evaluate the expression
+        Args:
+            variables: Mapping of variable names to values
+        Returns:
+            Expression result
+        Raises:
+            ValueError: For unknown variables or invalid calculations
+            ZeroDivisionError: For division by zero
+        """
+        try:
+            return self._function(variables or {})
+        except RecursionError:
+            # A long operator chain (x+x+...+x) is as deep as it is long
+            raise ExpressionError("Expression nested too deeply")
+
+
+class ExpressionCompiler:
+    """Compiles expressions against an engine, caching results in an LRU"""
+
+    def __init__(self, engine, maxsize=DEFAULT_CACHE_SIZE):
+        self.engine = engine
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        # Engines may be shared between threads; the LRU bookkeeping is not atomic
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, text):
+        """
+        Return the compiled form of an expression, using the cache
+        Args:
+            text: Expression text
+        Returns:
+            CompiledExpression instance
+        Raises:
+            ExpressionError: For malformed expressions
+        """
+        cache = self._cache
+        with self._lock:
+            compiled = cache.get(text)
+            if compiled is not None:
+                self.hits += 1
+                cache.move_to_end(text)
+                return compiled
+            self.misses += 1
+
+        # Compile outside the lock; a concurrent miss on the same text just
+        # builds an identical expression
+        try:
+            ast = self.fold(parse(text))
+            compiled = CompiledExpression(text, ast, self._build(ast))
+        except RecursionError:
+            raise ExpressionError("Expression nested too deeply")
+        with self._lock:
+            cache[text] = compiled
+            if len(cache) > self.maxsize:
+                cache.popitem(last=False)
+        return compiled
+
+    def fold(self, node):
+        """
+        Evaluate every variable-free subtree at compile time
+        Subtrees that raise are left in place so the error surfaces on
+        evaluation, exactly like the unfolded expression would.
+        """
+        kind = node[0]
+        if kind == "num" and isinstance(node[1], str):
+            return ("num", self._literal(node[1]))
+        if kind in ("num", "var"):
+            return node
+        if kind == "bin":
+            folded = ("bin", node[1], self.fold(node[2]), self.fold(node[3]))
+            children = folded[2:]
+        else:
+            folded = node[:-1] + (self.fold(node[-1]),)
+            children = folded[-1:]
+        if all(child[0] == "num" for child in children):
+            try:
+                return ("num", self._build(folded)({}))
+            except (ValueError, ZeroDivisionError, OverflowError, TypeError):
+                pass
+        return folded
+
+    def _literal(self, text):
+        """Value of a numeric literal: exact Decimal outside float mode, as batch input is"""
+        if self.engine.number_mode != "float":
+            return Decimal(text)
+        return float(text)
+
+    def _build(self, node):
+        """Turn an AST node into a closure taking a variables mapping"""
+        kind = node[0]
+        engine = self.engine
+
+        if kind == "num":
+            value = node[1]
+            if isinstance(value, str):
+                value = self._literal(value)
+            return lambda variables: value
+
+        if kind == "var":
+            name = node[1]
+
+            def variable(variables):
+                try:
+                    return variables[name]
+                except KeyError:
+                    raise ValueError(f"Unknown variable: {name}")
+            return variable
+
+        if kind == "neg":
+            operand = self._build(node[1])
+            return lambda variables: -operand(variables)
+
+        if kind == "call":
+            function = node[1]
+            argument = self._build(node[2])
+            scientific = engine.scientific_function
+            return lambda variables: scientific(function, argument(variables))
+
+        operator, left, right = node[1], self._build(node[2]), self._build(node[3])
+        if operator == "^":
+            power = engine.power
+            return lambda variables: power(left(variables), right(variables))
+        if operator == "%":
+            percentage = engine.percentage_calculation
+            return lambda variables: percentage(left(variables), right(variables))
+        calculate = engine._perform_calculation
+        return lambda variables: calculate(left(variables), right(variables), operator)
+
+    def clear(self):
+        """Drop all compiled expressions and reset the counters"""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self):
+        """
+        Get cache statistics
+        Returns:
+            Dictionary with hits, misses, size and maxsize
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+        }
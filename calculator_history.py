@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Calculator History Module
+Fixed-capacity ring buffer of calculation records with an optional
+memory-mapped append-only journal
+"""
+
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections import namedtuple
+
+from config import Constants
+
+# Operation codes stored per record; the index is the on-disk op code
+BINARY_OPERATIONS = ("+", "-", "*", "/", "power", "percentage")
+OPERATION_CODES = BINARY_OPERATIONS + tuple(Constants.SCIENTIFIC_FUNCTIONS)
+_CODE_BY_OPERATION = {operation: code for code, operation in enumerate(OPERATION_CODES)}
+
+# Symbols used when rendering records as text
+OPERATOR_SYMBOLS = {"*": "×", "/": "÷", "power": "^", "percentage": "% of"}
+FUNCTION_SYMBOLS = {"sqrt": "√", "square": "²", "reciprocal": "1/x"}
+
+HistoryRecord = namedtuple(
+    "HistoryRecord", "timestamp operation operand1 operand2 result"
+)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except OverflowError:
+        # Huge integers (e.g. factorials) keep their sign as infinity
+        return float("inf") if value > 0 else float("-inf")
+
+
+def format_value(value):
+    """Render a stored float the way the display shows numbers"""
+    if value == value and value not in (float("inf"), float("-inf")) and value == int(value):
+        return str(int(value))
+    return str(value)
+
+
+def render_record(record):
+    """
+    Render a record as a history line
+    Args:
+        record: HistoryRecord
+    Returns:
+        Text such as "12 ÷ 4 = 3" or "√(2) = 1.4142135624"
+    """
+    operation = record.operation
+    if operation in BINARY_OPERATIONS:
+        symbol = OPERATOR_SYMBOLS.get(operation, operation)
+        return (
+            f"{format_value(record.operand1)} {symbol} "
+            f"{format_value(record.operand2)} = {format_value(record.result)}"
+        )
+    symbol = FUNCTION_SYMBOLS.get(operation, operation)
+    return f"{symbol}({format_value(record.operand1)}) = {format_value(record.result)}"
+
+
+class HistoryBuffer:
+    """Array-backed ring buffer holding the most recent calculations
+
+    Records are stored column-wise as doubles plus a one-byte op code, so
+    memory use is fixed by the capacity. Text is rendered only on demand.
+    """
+
+    def __init__(self, capacity=Constants.MAX_HISTORY_ENTRIES, journal=None, index=None):
+        """
+        Args:
+            capacity: Maximum number of records kept
+            journal: Optional HistoryJournal to persist records to and
+                restore the most recent records from
+            index: Optional calculator_search.HistoryIndex kept up to date
+                as records are stored and evicted
+        """
+        if capacity <= 0:
+            raise ValueError("History capacity must be positive")
+        self.capacity = capacity
+        self.journal = journal
+        self.index = index
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._operands1 = array("d", bytes(8 * capacity))
+        self._operands2 = array("d", bytes(8 * capacity))
+        self._results = array("d", bytes(8 * capacity))
+        self._codes = array("B", bytes(capacity))
+        self._start = 0
+        self._count = 0
+        # Total records ever appended; also the sequence number of the next one
+        self.total = 0
+
+        if journal is not None:
+            for record in journal.read_records(capacity):
+                self._store(record.timestamp, _CODE_BY_OPERATION[record.operation],
+                            record.operand1, record.operand2, record.result)
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def _store(self, timestamp, code, operand1, operand2, result):
+        capacity = self.capacity
+        if self._count < capacity:
+            index = (self._start + self._count) % capacity
+            self._count += 1
+        else:
+            # Full - overwrite the oldest record
+            if self.index is not None:
+                evicted = self.record(0)
+                self.index.remove(self.total - capacity, evicted, render_record(evicted))
+            index = self._start
+            self._start = (self._start + 1) % capacity
+        self._timestamps[index] = timestamp
+        self._codes[index] = code
+        self._operands1[index] = operand1
+        self._operands2[index] = operand2
+        self._results[index] = result
+        if self.index is not None:
+            record = HistoryRecord(timestamp, OPERATION_CODES[code], operand1, operand2, result)
+            self.index.add(self.total, record, render_record(record))
+        self.total += 1
+        return index
+
+    def append(self, operation, operand1, operand2, result, timestamp=None):
+        """
+        Record a calculation
+        Args:
+            operation: Operator (+, -, *, /, power, percentage) or function name
+            operand1: First operand (the function input for functions)
+            operand2: Second operand (ignored for functions)
+            result: Calculation result
+            timestamp: Seconds since the epoch (defaults to now)
+        Raises:
+            ValueError: For unknown operations
+        """
+        try:
+            code = _CODE_BY_OPERATION[operation]
+        except KeyError:
+            raise ValueError(f"Unknown operation: {operation}")
+        if timestamp is None:
+            timestamp = time.time()
+        operand1 = _to_float(operand1)
+        operand2 = _to_float(operand2) if operand2 is not None else 0.0
+        result = _to_float(result)
+        self._store(timestamp, code, operand1, operand2, result)
+        if self.journal is not None:
+            self.journal.append(timestamp, code, operand1, operand2, result)
+
+    def append_binary(self, operand1, operation, operand2, result):
+        """Record "operand1 operation operand2 = result\""""
+        self.append(operation, operand1, operand2, result)
+
+    def append_function(self, function, operand, result):
+        """Record "function(operand) = result\""""
+        self.append(function, operand, None, result)
+
+    def record(self, index):
+        """
+        Get a record by position (0 is the oldest kept, -1 the newest)
+        Returns:
+            HistoryRecord
+        """
+        count = self._count
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("history index out of range")
+        slot = (self._start + index) % self.capacity
+        return HistoryRecord(
+            self._timestamps[slot],
+            OPERATION_CODES[self._codes[slot]],
+            self._operands1[slot],
+            self._operands2[slot],
+            self._results[slot],
+        )
+
+    def record_by_sequence(self, seq):
+        """
+        Get a record by its sequence number (position among all appends)
+        Returns:
+            HistoryRecord, or None if it has been evicted or cleared
+        """
+        index = seq - (self.total - self._count)
+        if 0 <= index < self._count:
+            return self.record(index)
+        return None
+
+    @staticmethod
+    def render(record):
+        """Rendered text of a record"""
+        return render_record(record)
+
+    def __getitem__(self, index):
+        """Rendered text of the record at index"""
+        return render_record(self.record(index))
+
+    def records(self):
+        """Iterate over records from oldest to newest"""
+        for index in range(self._count):
+            yield self.record(index)
+
+    def __iter__(self):
+        """Iterate over rendered history lines from oldest to newest"""
+        for record in self.records():
+            yield render_record(record)
+
+    def clear(self):
+        """Drop all records (and the journal contents)"""
+        self._start = 0
+        self._count = 0
+        if self.index is not None:
+            self.index.clear()
+        if self.journal is not None:
+            self.journal.clear()
+
+    def close(self):
+        """Flush and close the journal, if any"""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+
+class HistoryJournal:
+    """Append-only, memory-mapped file of fixed-size history records
+
+    Layout: a 16-byte header (magic + record count) followed by packed
+    records. Appends write one record into the mapping and bump the count;
+    the file grows in chunks and is never rewritten as a whole.
+    """
+
+    MAGIC = b"CALCHST1"
+    HEADER = struct.Struct("<8sQ")
+    RECORD = struct.Struct("<ddddB7x")
+    GROW_RECORDS = 4096
+
+    def __init__(self, path, max_records=100000):
+        """
+        Args:
+            path: Journal file path
+            max_records: Once exceeded, the oldest records are compacted away
+                in place, keeping the newest half
+        """
+        self.path = path
+        self.max_records = max_records
+        self._file = open(path, "a+b")
+        self._map = None
+        self.count = 0
+
+        size = os.fstat(self._file.fileno()).st_size
+        if size >= self.HEADER.size:
+            self._remap(size)
+            magic, count = self.HEADER.unpack_from(self._map, 0)
+            capacity = (size - self.HEADER.size) // self.RECORD.size
+            if magic == self.MAGIC and count <= capacity:
+                self.count = count
+                return
+        # New or unreadable journal - start fresh
+        self._resize(self.GROW_RECORDS)
+        self._write_header()
+
+    def _offset(self, index):
+        return self.HEADER.size + index * self.RECORD.size
+
+    def _remap(self, size):
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def _resize(self, records):
+        size = self._offset(records)
+        self._file.truncate(size)
+        self._remap(size)
+
+    def _write_header(self):
+        self.HEADER.pack_into(self._map, 0, self.MAGIC, self.count)
+
+    def append(self, timestamp, code, operand1, operand2, result):
+        """Append one packed record"""
+        if self._offset(self.count + 1) > len(self._map):
+            if self.count >= self.max_records:
+                self.compact(self.max_records // 2)
+            else:
+                self._resize(self.count + self.GROW_RECORDS)
+        self.RECORD.pack_into(self._map, self._offset(self.count),
+                              timestamp, operand1, operand2, result, code)
+        # The count is written last, so a torn append is simply ignored
+        self.count += 1
+        self._write_header()
+
+    def read_records(self, limit=None):
+        """
+        Read the newest records, oldest first
+        Args:
+            limit: Maximum number of records to return
+        Returns:
+            List of HistoryRecord
+        """
+        first = 0 if limit is None else max(0, self.count - limit)
+        records = []
+        for index in range(first, self.count):
+            timestamp, operand1, operand2, result, code = self.RECORD.unpack_from(
+                self._map, self._offset(index)
+            )
+            if code < len(OPERATION_CODES):
+                records.append(HistoryRecord(
+                    timestamp, OPERATION_CODES[code], operand1, operand2, result
+                ))
+        return records
+
+    def compact(self, keep):
+        """Keep only the newest `keep` records, moving them to the front in place"""
+        keep = min(keep, self.count)
+        source = self._offset(self.count - keep)
+        self._map.move(self.HEADER.size, source, keep * self.RECORD.size)
+        self.count = keep
+        self._write_header()
+
+    def clear(self):
+        """Drop all records"""
+        self.count = 0
+        self._write_header()
+
+    def close(self):
+        """Flush the mapping and close the file"""
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+        self._file.close()
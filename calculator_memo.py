@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Calculator Memo Module
+In-memory memoization of scientific_function and power results
+
+Every engine uses SHARED_CACHE unless given its own (or none), so repeated
+function presses, repeated values in parallel_* inputs and re-evaluated
+expressions become dictionary lookups. Keys hold the function, the operands
+with their types (2 and 2.0 can give different results), the number mode,
+the precision and, for sin/cos/tan, the angle mode. Errors are not cached.
+
+What is cached depends on the function's policy:
+    NO_CACHE  computed every time - cheaper than a lookup (abs, percent, ...)
+    LRU       kept in least-recently-used order, bounded by max_entries
+    SIZED     as LRU, and also weighed by result size against max_bytes, so
+              a few huge factorials or powers evict many small results
+
+In float mode at up to double precision an LRU function is a single math
+module call and a power a single **, both cheaper than the lookup, so there
+the engine only consults the cache for float_functions (the SIZED ones) with
+large results (factorials from LARGE_FACTORIAL, integer powers of
+LARGE_POWER_BITS or more - see large_result() and large_power()).
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+from calculator_rational import Rational
+
+# Caching policies
+NO_CACHE, LRU, SIZED = "none", "lru", "sized"
+
+# Policy per function name ("power" for CalculatorEngine.power); others are LRU
+DEFAULT_POLICIES = {
+    "abs": NO_CACHE,
+    "percent": NO_CACHE,
+    "square": NO_CACHE,
+    "reciprocal": NO_CACHE,
+    "factorial": SIZED,
+    "power": SIZED,
+}
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 32 << 20
+
+# Float mode caches integer powers from this many result bits on, and
+# factorials from this input on (smaller ones compute faster than a lookup)
+LARGE_POWER_BITS = 4096
+LARGE_FACTORIAL = 128
+
+# Functions whose result depends on the angle mode
+ANGLE_FUNCTIONS = frozenset(("sin", "cos", "tan"))
+
+
+def _key_value(value):
+    """Hashable form of an operand that equal values of other types do not share"""
+    if type(value) is Rational:
+        # Exact parts - equal fractions in other terms are separate entries
+        return (value.numerator, value.denominator)
+    return value
+
+
+def _size(value):
+    """Approximate bytes held by a result"""
+    if type(value) is Rational:
+        return sys.getsizeof(value.numerator) + sys.getsizeof(value.denominator)
+    return sys.getsizeof(value)
+
+
+class FunctionCache:
+    """Bounded in-memory cache of scientific_function and power results
+
+    Thread-safe; one cache can serve any number of engines with any settings.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 policies=None):
+        """
+        Args:
+            max_entries: Maximum number of cached results
+            max_bytes: Bound on the total size of SIZED results
+            policies: Function name -> NO_CACHE, LRU or SIZED, replacing
+                      DEFAULT_POLICIES for the names given
+        """
+        if max_entries <= 0 or max_bytes <= 0:
+            raise ValueError("max_entries and max_bytes must be positive")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policies = dict(DEFAULT_POLICIES)
+        if policies:
+            self.policies.update(policies)
+        # Functions worth a lookup even in float mode at double precision
+        self.float_functions = frozenset(
+            function for function, policy in self.policies.items()
+            if policy == SIZED and function != "power")
+        # key -> (result, size counted against max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def function(self, engine, function, value, compute):
+        """
+        Result of engine.scientific_function(function, value)
+        Args:
+            engine: CalculatorEngine making the call (its settings are part of the key)
+            function: Function name
+            value: Operand
+            compute: Uncached implementation, called as compute(function, value)
+        """
+        policy = self.policies.get(function, LRU)
+        if policy == NO_CACHE:
+            return compute(function, value)
+        key = (function, engine.number_mode, engine.precision,
+               engine.angle_mode if function in ANGLE_FUNCTIONS else None,
+               type(value), _key_value(value))
+        return self._cached(key, policy, compute, function, value)
+
+    def power(self, engine, base, exponent, compute):
+        """
+        Result of engine.power(base, exponent)
+        Args:
+            engine: CalculatorEngine making the call
+            base, exponent: Operands
+            compute: Uncached implementation, called as compute(base, exponent)
+        """
+        policy = self.policies.get("power", LRU)
+        if policy == NO_CACHE:
+            return compute(base, exponent)
+        key = ("power", engine.number_mode, engine.precision, None,
+               type(base), _key_value(base), type(exponent), _key_value(exponent))
+        return self._cached(key, policy, compute, base, exponent)
+
+    def large_result(self, function, value):
+        """True if a float_functions call is costly enough to look up in float mode"""
+        if function == "factorial":
+            try:
+                return value >= LARGE_FACTORIAL
+            except TypeError:
+                # Not a number - the computation reports it
+                return False
+        return True
+
+    def large_power(self, base, exponent):
+        """True for integer operands whose exact power has LARGE_POWER_BITS or more"""
+        return exponent * base.bit_length() >= LARGE_POWER_BITS
+
+    def _cached(self, key, policy, compute, *arguments):
+        entries = self._entries
+        try:
+            with self._lock:
+                entry = entries.get(key)
+                if entry is not None:
+                    entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self.misses += 1
+        except TypeError:
+            # Unhashable operand (e.g. a signaling NaN)
+            return compute(*arguments)
+
+        result = compute(*arguments)
+        size = _size(result) if policy == SIZED else 0
+        if size <= self.max_bytes // 4:
+            self._store(key, result, size)
+        return result
+
+    def _store(self, key, result, size):
+        entries = self._entries
+        with self._lock:
+            previous = entries.pop(key, None)
+            if previous is not None:
+                # Another thread computed it meanwhile
+                self._bytes -= previous[1]
+            entries[key] = (result, size)
+            self._bytes += size
+            while len(entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def info(self):
+        """
+        Get cache statistics
+        Returns:
+            Dictionary with hits, misses, evictions, size, maxsize, bytes and max_bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        """Drop every cached result and reset the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+# Cache used by every engine unless set_function_cache() says otherwise
+SHARED_CACHE = FunctionCache()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Calculator Metrics Module
+Per-operation call counts, error counts and latency histograms for
+CalculatorEngine, with JSON and Prometheus text exporters
+
+Instrumentation is switched on by swapping the engine's class for
+InstrumentedCalculatorEngine, so a disabled engine runs the plain methods
+with no extra checks at all.
+"""
+
+import json
+import threading
+from bisect import bisect_left
+from time import perf_counter_ns
+
+from calculator_engine import CalculatorEngine
+
+# Histogram bucket upper bounds in nanoseconds (the last bucket is +Inf)
+BUCKET_BOUNDS_NS = (
+    250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000,
+    250000, 500000, 1000000, 10000000, 100000000, 1000000000,
+)
+
+
+class OperationStats:
+    """Counters and latency histogram for one operation"""
+
+    __slots__ = ("count", "errors", "total_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+
+    def record(self, elapsed_ns, failed):
+        self.count += 1
+        if failed:
+            self.errors += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.buckets[bisect_left(BUCKET_BOUNDS_NS, elapsed_ns)] += 1
+
+    def snapshot(self):
+        cumulative = []
+        running = 0
+        for bound, count in zip(BUCKET_BOUNDS_NS + (None,), self.buckets):
+            running += count
+            cumulative.append((None if bound is None else bound / 1e9, running))
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_seconds": self.total_ns / 1e9,
+            "mean_seconds": self.total_ns / self.count / 1e9 if self.count else 0.0,
+            "max_seconds": self.max_ns / 1e9,
+            "buckets": cumulative,
+        }
+
+
+class EngineMetrics:
+    """Collection of OperationStats keyed by operation name"""
+
+    def __init__(self):
+        self.operations = {}
+        # Instrumented engines may be called from several threads at once
+        self._lock = threading.Lock()
+
+    def record(self, name, elapsed_ns, failed=False):
+        with self._lock:
+            stats = self.operations.get(name)
+            if stats is None:
+                stats = self.operations[name] = OperationStats()
+            stats.record(elapsed_ns, failed)
+
+    def reset(self):
+        with self._lock:
+            self.operations.clear()
+
+    def snapshot(self):
+        """
+        Get a point-in-time copy of all counters
+        Returns:
+            Dictionary mapping operation names (e.g. "operator[+]",
+            "scientific_function[sqrt]") to count, errors, timing totals and
+            cumulative histogram buckets as (upper_bound_seconds, count)
+        """
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in sorted(self.operations.items())}
+
+
+class InstrumentedCalculatorEngine(CalculatorEngine):
+    """CalculatorEngine whose public entry points record metrics"""
+
+    # Same layout as CalculatorEngine, so engines can switch classes in place
+    __slots__ = ()
+
+    def _timed(self, name, method, *args):
+        start = perf_counter_ns()
+        try:
+            result = method(self, *args)
+        except Exception:
+            self._metrics.record(name, perf_counter_ns() - start, True)
+            raise
+        self._metrics.record(name, perf_counter_ns() - start)
+        return result
+
+    def operator(self, operation, current_value):
+        return self._timed(f"operator[{operation}]", CalculatorEngine.operator,
+                           operation, current_value)
+
+    def calculate(self, current_value):
+        return self._timed(f"calculate[{self.pending_operation}]", CalculatorEngine.calculate,
+                           current_value)
+
+    def scientific_function(self, function, value):
+        return self._timed(f"scientific_function[{function}]",
+                           CalculatorEngine.scientific_function, function, value)
+
+    def power(self, base, exponent):
+        return self._timed("power", CalculatorEngine.power, base, exponent)
+
+
+def to_json(snapshot, indent=2):
+    """Render a metrics snapshot as JSON text"""
+    return json.dumps(snapshot, indent=indent)
+
+
+def _label_value(text):
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def to_prometheus(snapshot, prefix="calculator_engine"):
+    """
+    Render a metrics snapshot in the Prometheus text exposition format
+    Args:
+        snapshot: Result of CalculatorEngine.metrics_snapshot()
+        prefix: Metric name prefix
+    Returns:
+        Exposition text
+    """
+    lines = [
+        f"# HELP {prefix}_calls_total Engine calls by operation",
+        f"# TYPE {prefix}_calls_total counter",
+    ]
+    for name, stats in snapshot.items():
+        lines.append(f'{prefix}_calls_total{{operation="{_label_value(name)}"}} {stats["count"]}')
+    lines += [
+        f"# HELP {prefix}_errors_total Engine calls that raised, by operation",
+        f"# TYPE {prefix}_errors_total counter",
+    ]
+    for name, stats in snapshot.items():
+        lines.append(f'{prefix}_errors_total{{operation="{_label_value(name)}"}} {stats["errors"]}')
+    lines += [
+        f"# HELP {prefix}_latency_seconds Engine call latency by operation",
+        f"# TYPE {prefix}_latency_seconds histogram",
+    ]
+    for name, stats in snapshot.items():
+        label = _label_value(name)
+        for bound, count in stats["buckets"]:
+            le = "+Inf" if bound is None else repr(bound)
+            lines.append(f'{prefix}_latency_seconds_bucket{{operation="{label}",le="{le}"}} {count}')
+        lines.append(f'{prefix}_latency_seconds_sum{{operation="{label}"}} {stats["total_seconds"]!r}')
+        lines.append(f'{prefix}_latency_seconds_count{{operation="{label}"}} {stats["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def format_table(snapshot):
+    """Render a metrics snapshot as a plain-text table, busiest operations first"""
+    rows = sorted(snapshot.items(), key=lambda item: item[1]["total_seconds"], reverse=True)
+    lines = [f"{'Operation':<28}{'Calls':>9}{'Errors':>8}{'Mean µs':>10}{'Total ms':>11}"]
+    for name, stats in rows:
+        lines.append(
+            f"{name:<28}{stats['count']:>9}{stats['errors']:>8}"
+            f"{stats['mean_seconds'] * 1e6:>10.2f}{stats['total_seconds'] * 1e3:>11.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Calculator Parallel Module
+Thread-pool evaluation of engine operations through the engine's own scalar path
+
+Unlike calculator_batch, which recomputes in float (or NumPy), results here
+are exactly what the engine returns one call at a time - Decimal in decimal
+mode, arbitrary precision above a double's digits. Every call uses the
+engine's own decimal contexts, so the pool threads' contexts do not matter.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from calculator_batch import BINARY_OPERATIONS
+from config import Constants
+
+# Elements handed to a pool thread at a time
+DEFAULT_CHUNK_SIZE = 256
+
+_NAN = float("nan")
+
+_ERRORS = (ValueError, ZeroDivisionError, OverflowError, TypeError)
+
+
+def default_workers():
+    """Pool size used when none is given"""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def _binary_function(engine, operation):
+    """Engine call implementing a binary operation code"""
+    if operation not in BINARY_OPERATIONS:
+        raise ValueError(f"Unknown operation: {operation}")
+    if operation == "power":
+        return engine.power
+    if operation == "percentage":
+        return engine.percentage_calculation
+    calculation = engine._perform_calculation
+    return lambda a, b: calculation(a, b, operation)
+
+
+def _evaluate_rows(func, rows):
+    """Apply func to each row, collecting results and errors"""
+    results = []
+    errors = []
+    for args in rows:
+        try:
+            results.append(func(*args))
+            errors.append(False)
+        except _ERRORS:
+            results.append(_NAN)
+            errors.append(True)
+    return results, errors
+
+
+def _run(func, rows, workers, chunk_size):
+    """Evaluate rows in chunks on a thread pool, keeping input order"""
+    if workers is None:
+        workers = default_workers()
+    if workers <= 1 or len(rows) <= chunk_size:
+        return _evaluate_rows(func, rows)
+
+    results = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+        for chunk_results, chunk_errors in executor.map(_evaluate_rows, [func] * len(chunks), chunks):
+            results.extend(chunk_results)
+            errors.extend(chunk_errors)
+    return results, errors
+
+
+def _is_scalar(value):
+    return not hasattr(value, "__len__")
+
+
+def parallel_binary(engine, operation, operands1, operands2, workers=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Apply a binary operation element-wise on a thread pool
+    Args:
+        engine: CalculatorEngine whose number mode and precision are used
+        operation: Operation code (+, -, *, /, power, percentage)
+        operands1: Sequence of first operands (or a scalar)
+        operands2: Sequence of second operands (or a scalar)
+        workers: Pool threads (default: default_workers(); 1 runs inline)
+        chunk_size: Elements per pool task
+    Returns:
+        Tuple of (results, error_mask) as lists. Failed elements are NaN in results.
+    Raises:
+        ValueError: For unknown operations or mismatched lengths
+    """
+    func = _binary_function(engine, operation)
+    scalar1 = _is_scalar(operands1)
+    scalar2 = _is_scalar(operands2)
+    if scalar1 and scalar2:
+        a, b = [operands1], [operands2]
+    elif scalar1:
+        b = list(operands2)
+        a = [operands1] * len(b)
+    elif scalar2:
+        a = list(operands1)
+        b = [operands2] * len(a)
+    else:
+        a, b = list(operands1), list(operands2)
+    if len(a) != len(b):
+        raise ValueError("Operand arrays must have the same length")
+    return _run(func, list(zip(a, b)), workers, chunk_size)
+
+
+def parallel_function(engine, function, values, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Apply a scientific function element-wise on a thread pool
+    Args:
+        engine: CalculatorEngine whose number mode, precision and angle mode are used
+        function: Function name (sqrt, square, reciprocal, etc.)
+        values: Sequence of input values
+        workers: Pool threads (default: default_workers(); 1 runs inline)
+        chunk_size: Elements per pool task
+    Returns:
+        Tuple of (results, error_mask) as lists. Failed elements are NaN in results.
+    Raises:
+        ValueError: For unknown functions
+    """
+    if function not in Constants.SCIENTIFIC_FUNCTIONS:
+        raise ValueError(f"Unknown function: {function}")
+    scientific = engine.scientific_function
+    return _run(lambda value: scientific(function, value),
+                [(value,) for value in values], workers, chunk_size)
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Calculator High-Precision Module
+factorial, power, exp, ln and sqrt to any number of significant digits
+
+Used by the engine when config["precision"] asks for more places than a
+double holds (see CalculatorEngine.high_precision). Every function works in a Decimal context sized to the
+requested digits plus guard digits, with an exponent range wide enough that
+large results never overflow:
+
+- factorial: prime-swing algorithm on exact integers
+- power: exponentiation by squaring for integral exponents, exp(y * ln x) otherwise
+- exp: binary splitting of the Taylor series after halving the argument
+- ln: Halley iteration on exp with precision tripling
+- sqrt: integer square root of the scaled coefficient
+"""
+
+import math
+import sys
+from decimal import MAX_EMAX, MIN_EMIN, ROUND_HALF_EVEN, Context, Decimal, Overflow
+
+# Extra working digits on top of those requested
+GUARD_DIGITS = 10
+
+# Integer powers with at most this many result digits are computed exactly
+EXACT_POWER_DIGITS = 100000
+
+# Exponents beyond this many digits overflow any Decimal context
+_MAX_EXPONENT_DIGITS = len(str(MAX_EMAX))
+
+_LOG10_2 = math.log10(2)
+
+# exp arguments with longer coefficients are evaluated by bit-burst splitting
+_SHORT_ARGUMENT_DIGITS = 40
+
+
+def _context(digits):
+    """Decimal context with `digits` significant digits and the widest exponent range"""
+    return Context(prec=digits, rounding=ROUND_HALF_EVEN, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+
+def _product(values, start, stop):
+    """Balanced product of values[start:stop] (keeps the multiplied integers similar in size)"""
+    if stop - start <= 8:
+        result = 1
+        for i in range(start, stop):
+            result *= values[i]
+        return result
+    middle = (start + stop) // 2
+    return _product(values, start, middle) * _product(values, middle, stop)
+
+
+def _odd_primes(limit):
+    """Odd primes up to and including limit"""
+    if limit < 3:
+        return []
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[0:2] = b"\x00\x00"
+    for p in range(2, math.isqrt(limit) + 1):
+        if sieve[p]:
+            sieve[p * p::p] = bytes(len(range(p * p, limit + 1, p)))
+    return [p for p in range(3, limit + 1, 2) if sieve[p]]
+
+
+def _odd_swing(n, primes):
+    """Odd part of the swing number n! / (n // 2)!**2"""
+    factors = []
+    for p in primes:
+        if p > n:
+            break
+        q = n
+        power = 1
+        while q:
+            q //= p
+            if q & 1:
+                power *= p
+        if power > 1:
+            factors.append(power)
+    return _product(factors, 0, len(factors))
+
+
+def factorial(n):
+    """
+    Exact n! by the prime-swing algorithm
+    n! = ((n // 2)!)**2 * swing(n); the odd parts recurse and the powers of
+    two are added back with a single shift.
+    Raises:
+        decimal.Overflow: If n is beyond what math.factorial accepts
+    """
+    if n < 0:
+        raise ValueError("Factorial only defined for non-negative integers")
+    if n > sys.maxsize:
+        # The same bound as math.factorial
+        raise Overflow("factorial argument too large")
+    if n < 20:
+        return math.factorial(n)
+    primes = _odd_primes(n)
+
+    def odd_factorial(m):
+        if m < 2:
+            return 1
+        half = odd_factorial(m // 2)
+        return half * half * _odd_swing(m, primes)
+
+    return odd_factorial(n) << (n - bin(n).count("1"))
+
+
+def _exp_series(p, q, terms):
+    """
+    Binary splitting of sum((p/q)**k / k!, k=1..terms)
+    Returns:
+        (T, Q) with the sum equal to T / Q
+    """
+    def split(a, b):
+        if b - a == 1:
+            return p, a * q, p
+        middle = (a + b) // 2
+        p1, q1, t1 = split(a, middle)
+        p2, q2, t2 = split(middle, b)
+        return p1 * p2, q1 * q2, t1 * q2 + p1 * t2
+
+    _, total_q, total_t = split(1, terms + 1)
+    return total_t, total_q
+
+
+def _exp_fraction(p, q, working, context):
+    """e**(p/q) for 0 < p/q < 1 by one binary-split series"""
+    # Terms needed until (p/q)**k / k! drops below 10**-working
+    log_r = math.log10(p) - math.log10(q)
+    terms, magnitude = 0, 0.0
+    while magnitude > -working - 1 or terms == 0:
+        terms += 1
+        magnitude += log_r - math.log10(terms)
+    t, total_q = _exp_series(p, q, terms)
+    return context.divide(Decimal(total_q + t), Decimal(total_q))
+
+
+def _exp_bit_burst(p, q, working, context):
+    """
+    e**(p/q) for 0 < p/q < 1 with a long numerator
+    The argument is cut into binary chunks of doubling length; chunk k has a
+    numerator of ~2**k bits but is below 2**-(2**k), so every series stays
+    cheap where a single series over the whole numerator would not.
+    """
+    bits = int(working / _LOG10_2) + 16
+    fixed = (p << bits) // q
+    result = Decimal(1)
+    low = 0
+    width = 16
+    while low < bits:
+        high = min(bits, low + width)
+        # Bits low+1 .. high after the binary point
+        chunk = (fixed >> (bits - high)) & ((1 << (high - low)) - 1)
+        if chunk:
+            result = context.multiply(result, _exp_fraction(chunk, 1 << high, working, context))
+        low = high
+        width *= 2
+    return result
+
+
+def exp(x, digits):
+    """
+    e**x to `digits` significant digits
+    Raises:
+        decimal.Overflow: If the result's exponent is out of range
+    """
+    x = Decimal(x)
+    if not x:
+        return Decimal(1)
+    if x.is_infinite() or x.adjusted() >= _MAX_EXPONENT_DIGITS:
+        if x < 0:
+            # Underflows any context
+            return Decimal(0)
+        raise Overflow("exp argument too large")
+
+    # x = r * 2**halvings with |r| < 2**-8; squaring the result back doubles
+    # the relative error each time, so carry a digit per ~3 halvings
+    halvings = max(0, int((x.adjusted() + 1) / _LOG10_2)) + 8
+    working = digits + GUARD_DIGITS + int(halvings * _LOG10_2) + 1
+    context = _context(working)
+    x = context.plus(x)
+
+    sign, coefficient, exponent = x.as_tuple()
+    p = int("".join(map(str, coefficient)))
+    q = 1 << halvings
+    if exponent >= 0:
+        p *= 10 ** exponent
+    else:
+        q *= 10 ** -exponent
+
+    if len(coefficient) <= _SHORT_ARGUMENT_DIGITS:
+        result = _exp_fraction(p, q, working, context)
+    else:
+        result = _exp_bit_burst(p, q, working, context)
+    for _ in range(halvings):
+        result = context.multiply(result, result)
+    if sign:
+        result = context.divide(1, result)
+    return _context(digits).plus(result)
+
+
+def _ln_reduced(x, digits):
+    """
+    Natural logarithm of x in [0.1, 10) to `digits` digits after the point
+    Halley's iteration y += 2 * (x - e**y) / (x + e**y) triples the correct
+    digits per step, so only the last step runs at full precision.
+    """
+    steps = [digits]
+    while steps[-1] > 40:
+        steps.append(steps[-1] // 3 + 2)
+
+    # The float logarithm is correct to ~15 places - enough to start from
+    y = Decimal(repr(math.log(float(x))))
+    for places in reversed(steps):
+        # |y| < 2.31, so one integer digit on top of the places
+        context = _context(places + 2)
+        power = exp(y, places + 2)
+        y = context.add(y, context.divide(
+            context.multiply(2, context.subtract(x, power)), context.add(x, power)
+        ))
+    return y
+
+
+def ln(x, digits):
+    """Natural logarithm of a positive x to `digits` significant digits"""
+    x = Decimal(x)
+    if x <= 0:
+        raise ValueError("Natural logarithm undefined for non-positive numbers")
+    if x == 1:
+        return Decimal(0)
+
+    adjusted = x.adjusted()
+    if adjusted in (-1, 0):
+        # Close to 1 the result is small - the places must cover its leading zeros
+        near_one = _context(digits + GUARD_DIGITS).subtract(x, 1)
+        places = digits + GUARD_DIGITS + max(0, -near_one.adjusted())
+        return _context(digits).plus(_ln_reduced(x, places))
+
+    # ln(m * 10**k) = ln(m) + k * ln(10) keeps the iterated argument small
+    places = digits + GUARD_DIGITS + len(str(abs(adjusted)))
+    context = _context(places + 2)
+    mantissa = x.scaleb(-adjusted, context)
+    result = context.add(
+        _ln_reduced(mantissa, places),
+        context.multiply(adjusted, _ln_reduced(Decimal(10), places))
+    )
+    return _context(digits).plus(result)
+
+
+def sqrt(x, digits):
+    """Square root of a non-negative x to `digits` significant digits, correctly rounded"""
+    x = Decimal(x)
+    if x < 0:
+        raise ValueError("Cannot calculate square root of negative number")
+    if not x:
+        return Decimal(0)
+    _, coefficient, exponent = x.as_tuple()
+    n = int("".join(map(str, coefficient)))
+
+    # Scale to an even power of ten with 2 * (digits + 2) integer digits
+    shift = max(0, 2 * (digits + 2) - len(coefficient))
+    if (exponent - shift) % 2:
+        shift += 1
+    n *= 10 ** shift
+    root = math.isqrt(n)
+    # A sticky digit marks an inexact root so the final rounding is correct
+    sticky = 1 if root * root != n else 0
+    result = Decimal(root * 10 + sticky).scaleb((exponent - shift) // 2 - 1, _context(digits + 4))
+    return _context(digits).plus(result)
+
+
+def power(base, exponent, digits):
+    """
+    base**exponent to `digits` significant digits
+    Integer powers that fit in EXACT_POWER_DIGITS digits are returned as exact ints.
+    Raises:
+        ValueError: For a negative base with a non-integral exponent
+        ZeroDivisionError: For zero to a negative power
+    """
+    base = Decimal(base)
+    exponent = Decimal(exponent)
+    if not base:
+        if exponent < 0:
+            raise ZeroDivisionError("Cannot divide by zero")
+        return Decimal(1) if not exponent else Decimal(0)
+
+    if exponent == exponent.to_integral_value():
+        n = int(exponent)
+        if base == base.to_integral_value() and n >= 0:
+            integer = int(base)
+            if abs(integer).bit_length() * n * _LOG10_2 <= EXACT_POWER_DIGITS:
+                return integer ** n
+        # Each squaring can add an ulp of error: carry a guard digit per doubling
+        context = _context(digits + GUARD_DIGITS + len(str(abs(n))))
+        result, square = Decimal(1), base
+        remaining = abs(n)
+        while remaining:
+            if remaining & 1:
+                result = context.multiply(result, square)
+            remaining >>= 1
+            if remaining:
+                square = context.multiply(square, square)
+        if n < 0:
+            result = context.divide(1, result)
+        return _context(digits).plus(result)
+
+    if base < 0:
+        raise ValueError("Invalid calculation: undefined power")
+    # Absolute error in y * ln(x) becomes relative error in the result
+    logarithm = ln(base, digits + GUARD_DIGITS)
+    product = _context(GUARD_DIGITS).multiply(exponent, logarithm)
+    working = digits + GUARD_DIGITS + max(0, product.adjusted() + 1)
+    if working > digits + GUARD_DIGITS:
+        logarithm = ln(base, working)
+    return exp(_context(working).multiply(exponent, logarithm), digits)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Calculator Rational Module
+Exact fractions for the engine's "rational" number mode
+
+fractions.Fraction reduces by the gcd after every operation, which dominates
+long calculation chains. Rational keeps numerator and denominator as they
+come and only reduces once either grows past NORMALIZE_BITS (or when asked),
+so a chain pays for a gcd every few dozen steps instead of at each one.
+"""
+
+import math
+import numbers
+from decimal import Decimal
+
+# Reduce once the numerator or denominator is longer than this many bits
+NORMALIZE_BITS = 256
+
+
+class Rational:
+    """Exact fraction numerator / denominator, not necessarily in lowest terms
+
+    The denominator is always positive. Arithmetic accepts Rational and int
+    operands; other types go through Rational.from_value() first.
+    """
+
+    __slots__ = ("numerator", "denominator")
+
+    def __init__(self, numerator, denominator=1):
+        if not denominator:
+            raise ZeroDivisionError("Cannot divide by zero")
+        if denominator < 0:
+            numerator, denominator = -numerator, -denominator
+        self.numerator = numerator
+        self.denominator = denominator
+
+    @classmethod
+    def from_value(cls, value):
+        """
+        Exact Rational for an int, float, Decimal, Fraction or Rational
+        Floats use their shortest repr, so 0.1 becomes 1/10.
+        """
+        if isinstance(value, Rational):
+            return value
+        if isinstance(value, int):
+            return _make(value, 1)
+        if isinstance(value, float):
+            value = Decimal(repr(value))
+        if isinstance(value, Decimal):
+            if not value.is_finite():
+                raise ValueError(f"Cannot represent {value} exactly")
+            numerator, denominator = value.as_integer_ratio()
+            return _make(numerator, denominator)
+        if isinstance(value, numbers.Rational):
+            # fractions.Fraction (not imported here: it slows the engine's import)
+            return _make(value.numerator, value.denominator)
+        raise TypeError(f"Cannot convert {type(value).__name__} to Rational")
+
+    def normalized(self):
+        """Equal Rational in lowest terms"""
+        numerator, denominator = self.numerator, self.denominator
+        divisor = math.gcd(numerator, denominator)
+        if divisor == 1:
+            return self
+        return _make(numerator // divisor, denominator // divisor)
+
+    def is_integer(self):
+        return self.denominator == 1 or self.numerator % self.denominator == 0
+
+    def to_decimal(self, context):
+        """Quotient as a Decimal rounded by context"""
+        return context.divide(Decimal(self.numerator), Decimal(self.denominator))
+
+    # Arithmetic ------------------------------------------------------------
+
+    def __add__(self, other):
+        if isinstance(other, int):
+            return _reduce(self.numerator + other * self.denominator, self.denominator)
+        if not isinstance(other, Rational):
+            return NotImplemented
+        if self.denominator == other.denominator:
+            # Common in accounting chains (e.g. cents) - no growth, no gcd
+            return _reduce(self.numerator + other.numerator, self.denominator)
+        return _reduce(self.numerator * other.denominator + other.numerator * self.denominator,
+                       self.denominator * other.denominator)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, (int, Rational)):
+            return self + (-other)
+        return NotImplemented
+
+    def __rsub__(self, other):
+        if isinstance(other, int):
+            return (-self) + other
+        return NotImplemented
+
+    def __mul__(self, other):
+        if isinstance(other, int):
+            return _reduce(self.numerator * other, self.denominator)
+        if not isinstance(other, Rational):
+            return NotImplemented
+        return _reduce(self.numerator * other.numerator, self.denominator * other.denominator)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, int):
+            other = _make(other, 1)
+        elif not isinstance(other, Rational):
+            return NotImplemented
+        if not other.numerator:
+            raise ZeroDivisionError("Cannot divide by zero")
+        return self * _make_signed(other.denominator, other.numerator)
+
+    def __rtruediv__(self, other):
+        if isinstance(other, int):
+            if not self.numerator:
+                raise ZeroDivisionError("Cannot divide by zero")
+            return _make_signed(self.denominator, self.numerator) * other
+        return NotImplemented
+
+    def __pow__(self, exponent):
+        if not isinstance(exponent, int):
+            return NotImplemented
+        base = self.normalized()
+        if exponent >= 0:
+            return _make(base.numerator ** exponent, base.denominator ** exponent)
+        if not base.numerator:
+            raise ZeroDivisionError("Cannot divide by zero")
+        return _make_signed(base.denominator ** -exponent, base.numerator ** -exponent)
+
+    def __neg__(self):
+        return _make(-self.numerator, self.denominator)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return _make(abs(self.numerator), self.denominator)
+
+    # Comparison and conversion ----------------------------------------------
+
+    def _cross(self, other):
+        """(self, other) scaled to a common denominator, or None for other types"""
+        if isinstance(other, int):
+            return self.numerator, other * self.denominator
+        if isinstance(other, Rational):
+            return self.numerator * other.denominator, other.numerator * self.denominator
+        if isinstance(other, (float, Decimal, numbers.Rational)):
+            return self._cross(Rational.from_value(other))
+        return None
+
+    def __eq__(self, other):
+        pair = self._cross(other)
+        return NotImplemented if pair is None else pair[0] == pair[1]
+
+    def __lt__(self, other):
+        pair = self._cross(other)
+        return NotImplemented if pair is None else pair[0] < pair[1]
+
+    def __le__(self, other):
+        pair = self._cross(other)
+        return NotImplemented if pair is None else pair[0] <= pair[1]
+
+    def __gt__(self, other):
+        pair = self._cross(other)
+        return NotImplemented if pair is None else pair[0] > pair[1]
+
+    def __ge__(self, other):
+        pair = self._cross(other)
+        return NotImplemented if pair is None else pair[0] >= pair[1]
+
+    def __hash__(self):
+        # Equal to the hash of the equal int / Fraction
+        from fractions import Fraction
+        return hash(Fraction(self.numerator, self.denominator))
+
+    def __bool__(self):
+        return self.numerator != 0
+
+    def __float__(self):
+        return self.numerator / self.denominator
+
+    def __int__(self):
+        # Truncates toward zero, like int(float)
+        quotient = abs(self.numerator) // self.denominator
+        return quotient if self.numerator >= 0 else -quotient
+
+    def __reduce__(self):
+        return (Rational, (self.numerator, self.denominator))
+
+    def __repr__(self):
+        return f"Rational({self.numerator}, {self.denominator})"
+
+    def __str__(self):
+        value = self.normalized()
+        if value.denominator == 1:
+            return str(value.numerator)
+        return f"{value.numerator}/{value.denominator}"
+
+
+def _make(numerator, denominator):
+    """Rational from a positive denominator without any checks"""
+    value = object.__new__(Rational)
+    value.numerator = numerator
+    value.denominator = denominator
+    return value
+
+
+def _make_signed(numerator, denominator):
+    """Rational from a non-zero denominator of either sign"""
+    if denominator < 0:
+        return _make(-numerator, -denominator)
+    return _make(numerator, denominator)
+
+
+def _reduce(numerator, denominator):
+    """Rational, reduced only once a part is longer than NORMALIZE_BITS"""
+    if (numerator.bit_length() > NORMALIZE_BITS or
+            denominator.bit_length() > NORMALIZE_BITS):
+        divisor = math.gcd(numerator, denominator)
+        if divisor != 1:
+            numerator //= divisor
+            denominator //= divisor
+    return _make(numerator, denominator)
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Calculator Search Module
+Incremental indexes over calculation history for fast queries such as
+"every result above 10,000" or "every sqrt of 2.x"
+"""
+
+import struct
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
+
+from calculator_history import (
+    BINARY_OPERATIONS, FUNCTION_SYMBOLS, OPERATION_CODES, OPERATOR_SYMBOLS, render_record
+)
+
+SearchResult = namedtuple("SearchResult", "total matches")
+
+# Words and symbols accepted as operation names in query text
+_OPERATION_WORDS = {operation: operation for operation in OPERATION_CODES}
+_OPERATION_WORDS.update({symbol: operation for operation, symbol in OPERATOR_SYMBOLS.items()})
+_OPERATION_WORDS.update({symbol: operation for operation, symbol in FUNCTION_SYMBOLS.items()})
+_OPERATION_WORDS.pop("% of", None)
+
+
+class SortedIndex:
+    """Sorted multimap from keys to sequence numbers
+
+    Entries live in blocks of bounded size, so inserts and removals move at
+    most one block and range queries bisect over block boundaries first.
+    """
+
+    BLOCK_SIZE = 512
+
+    def __init__(self):
+        self._keys = []      # list of sorted key blocks
+        self._seqs = []      # parallel blocks of sequence numbers
+        self._maxes = []     # last key of each block
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def add(self, key, seq):
+        """Insert key -> seq (after existing equal keys, so seqs stay ascending)"""
+        self._length += 1
+        if not self._keys:
+            self._keys.append([key])
+            self._seqs.append([seq])
+            self._maxes.append(key)
+            return
+        block = bisect_right(self._maxes, key)
+        if block == len(self._maxes):
+            block -= 1
+        keys, seqs = self._keys[block], self._seqs[block]
+        position = bisect_right(keys, key)
+        keys.insert(position, key)
+        seqs.insert(position, seq)
+        self._maxes[block] = keys[-1]
+        if len(keys) > 2 * self.BLOCK_SIZE:
+            half = self.BLOCK_SIZE
+            self._keys[block:block + 1] = [keys[:half], keys[half:]]
+            self._seqs[block:block + 1] = [seqs[:half], seqs[half:]]
+            self._maxes[block:block + 1] = [keys[half - 1], keys[-1]]
+
+    def remove(self, key, seq):
+        """Remove one key -> seq entry; missing entries are ignored"""
+        block = bisect_left(self._maxes, key)
+        while block < len(self._maxes):
+            keys, seqs = self._keys[block], self._seqs[block]
+            position = bisect_left(keys, key)
+            while position < len(keys) and keys[position] == key:
+                if seqs[position] == seq:
+                    del keys[position]
+                    del seqs[position]
+                    self._length -= 1
+                    if keys:
+                        self._maxes[block] = keys[-1]
+                    else:
+                        del self._keys[block], self._seqs[block], self._maxes[block]
+                    return
+                position += 1
+            if position < len(keys):
+                return
+            block += 1
+
+    def _locate(self, key, right):
+        """Global (block, position) of the first entry >= key (> key if right)"""
+        search = bisect_right if right else bisect_left
+        block = search(self._maxes, key)
+        if block == len(self._maxes):
+            return block, 0
+        return block, search(self._keys[block], key)
+
+    def range(self, low=None, high=None, high_inclusive=False):
+        """
+        Iterate (key, seq) pairs with low <= key < high in key order
+        Args:
+            low: Inclusive lower bound (None for unbounded)
+            high: Upper bound (None for unbounded)
+            high_inclusive: Include keys equal to high
+        """
+        block, position = (0, 0) if low is None else self._locate(low, right=False)
+        while block < len(self._keys):
+            keys, seqs = self._keys[block], self._seqs[block]
+            for i in range(position, len(keys)):
+                key = keys[i]
+                if high is not None and (key > high or (key == high and not high_inclusive)):
+                    return
+                yield key, seqs[i]
+            block += 1
+            position = 0
+
+    def count(self, low=None, high=None, high_inclusive=False):
+        """Number of entries in the range, without iterating them"""
+        start = self._rank(low, right=False) if low is not None else 0
+        end = self._rank(high, right=high_inclusive) if high is not None else self._length
+        return max(0, end - start)
+
+    def _rank(self, key, right):
+        block, position = self._locate(key, right)
+        # Sum of preceding block sizes; blocks are few (length / BLOCK_SIZE)
+        return sum(len(keys) for keys in self._keys[:block]) + position
+
+    def clear(self):
+        self._keys.clear()
+        self._seqs.clear()
+        self._maxes.clear()
+        self._length = 0
+
+
+class HistoryIndex:
+    """Incremental indexes maintained alongside a HistoryBuffer
+
+    - results / operands: sorted numeric indexes over all records
+    - results_by_operation / operands_by_operation: the same, per operation,
+      so "sqrt with operand in [2, 3)" is a single range lookup
+    - operations: per-operation buckets of sequence numbers
+    - texts: sorted index on rendered text for prefix queries
+    """
+
+    def __init__(self):
+        self.results = SortedIndex()
+        self.operands = SortedIndex()
+        self.texts = SortedIndex()
+        self.operations = {}
+        self.results_by_operation = {}
+        self.operands_by_operation = {}
+
+    def add(self, seq, record, text):
+        """Index a newly stored record"""
+        operation = record.operation
+        result = record.result
+        if result == result:  # NaN cannot be ordered
+            self.results.add(result, seq)
+            self._bucket(self.results_by_operation, operation).add(result, seq)
+        operands = self._bucket(self.operands_by_operation, operation)
+        for operand in record_operands(record):
+            self.operands.add(operand, seq)
+            operands.add(operand, seq)
+        self.operations.setdefault(operation, deque()).append(seq)
+        self.texts.add(text, seq)
+
+    def remove(self, seq, record, text):
+        """Drop an evicted record from every index"""
+        operation = record.operation
+        result = record.result
+        if result == result:
+            self.results.remove(result, seq)
+            self._bucket(self.results_by_operation, operation).remove(result, seq)
+        operands = self._bucket(self.operands_by_operation, operation)
+        for operand in record_operands(record):
+            self.operands.remove(operand, seq)
+            operands.remove(operand, seq)
+        bucket = self.operations.get(operation)
+        if bucket:
+            # Evictions happen oldest-first, so the seq is at the left end
+            if bucket[0] == seq:
+                bucket.popleft()
+            else:
+                bucket.remove(seq)
+        self.texts.remove(text, seq)
+
+    @staticmethod
+    def _bucket(mapping, operation):
+        index = mapping.get(operation)
+        if index is None:
+            index = mapping[operation] = SortedIndex()
+        return index
+
+    def clear(self):
+        for index in (self.results, self.operands, self.texts):
+            index.clear()
+        self.operations.clear()
+        self.results_by_operation.clear()
+        self.operands_by_operation.clear()
+
+
+def record_operands(record):
+    """Operands of a record that can be indexed (both for binary operations)"""
+    if record.operation in BINARY_OPERATIONS:
+        operands = (record.operand1, record.operand2)
+    else:
+        operands = (record.operand1,)
+    return [operand for operand in operands if operand == operand]
+
+
+class HistorySearch:
+    """Query front end over a HistoryBuffer that was created with an index"""
+
+    def __init__(self, history):
+        if history.index is None:
+            raise ValueError("History buffer has no index")
+        self.history = history
+        self.index = history.index
+
+    def search(self, min_result=None, max_result=None, min_operand=None, max_operand=None,
+               operation=None, prefix=None, offset=0, limit=50):
+        """
+        Find history entries matching every given criterion
+        Numeric ranges include the minimum and exclude the maximum.
+        Args:
+            min_result, max_result: Result range
+            min_operand, max_operand: Operand range (any operand matches)
+            operation: Operator or function name
+            prefix: Prefix of the rendered history line
+            offset: Number of matches to skip (for paging)
+            limit: Maximum number of matches to return
+        Returns:
+            SearchResult(total, matches) where matches is a list of
+            (sequence, HistoryRecord, text) tuples
+        """
+        index = self.index
+        by_result = min_result is not None or max_result is not None
+        by_operand = min_operand is not None or max_operand is not None
+
+        # Candidate sources: (size, exact, criteria covered, iterator factory).
+        # With an operation, the per-operation numeric indexes cover both.
+        sources = []
+        if by_result:
+            results = index.results
+            if operation is not None:
+                results = index.results_by_operation.get(operation, SortedIndex())
+            sources.append((
+                results.count(min_result, max_result), True,
+                {"result"} | ({"operation"} if operation is not None else set()),
+                lambda: (seq for _, seq in results.range(min_result, max_result)),
+            ))
+        if by_operand:
+            operands = index.operands
+            if operation is not None:
+                operands = index.operands_by_operation.get(operation, SortedIndex())
+            # Binary records index both operands, so the count may repeat entries
+            sources.append((
+                operands.count(min_operand, max_operand), False,
+                {"operand"} | ({"operation"} if operation is not None else set()),
+                lambda: _unique(seq for _, seq in operands.range(min_operand, max_operand)),
+            ))
+        if operation is not None and not sources:
+            bucket = index.operations.get(operation, ())
+            sources.append((len(bucket), True, {"operation"}, lambda: reversed(bucket)))
+        if prefix:
+            high = prefix + "\U0010ffff"
+            sources.append((
+                index.texts.count(prefix, high), True, {"prefix"},
+                lambda: (seq for _, seq in index.texts.range(prefix, high)),
+            ))
+        if not sources:
+            return SearchResult(0, [])
+
+        # Drive the query from the most selective index, check the rest per record
+        sources.sort(key=lambda source: source[0])
+        size, exact, covered, make_iterator = sources[0]
+        checks = _checks(
+            None if "result" in covered else (min_result, max_result),
+            None if "operand" in covered or not by_operand else (min_operand, max_operand),
+            None if "operation" in covered else operation,
+            None if "prefix" in covered else prefix,
+        )
+        stop_early = exact and not checks
+
+        history = self.history
+        matches = []
+        total = 0
+        for seq in make_iterator():
+            record = history.record_by_sequence(seq)
+            if record is None:
+                continue
+            if checks and not all(check(record) for check in checks):
+                continue
+            total += 1
+            if total > offset:
+                if len(matches) < limit:
+                    matches.append((seq, record, history.render(record)))
+                elif stop_early:
+                    # The index already knows how many entries match
+                    total = size
+                    break
+        return SearchResult(total, matches)
+
+
+def _unique(seqs):
+    seen = set()
+    for seq in seqs:
+        if seq not in seen:
+            seen.add(seq)
+            yield seq
+
+
+def _checks(result_range, operand_range, operation, prefix):
+    """Per-record predicates for criteria not covered by the driving index"""
+    checks = []
+    if result_range is not None and result_range != (None, None):
+        low, high = result_range
+        low = float("-inf") if low is None else low
+        high = float("inf") if high is None else high
+        checks.append(lambda record: low <= record.result < high)
+    if operand_range is not None:
+        low, high = operand_range
+        low = float("-inf") if low is None else low
+        high = float("inf") if high is None else high
+        checks.append(lambda record: any(low <= x < high for x in record_operands(record)))
+    if operation is not None:
+        checks.append(lambda record: record.operation == operation)
+    if prefix:
+        checks.append(lambda record: render_record(record).startswith(prefix))
+    return checks
+
+
+def parse_query(text):
+    """
+    Turn search-box text into search() keyword arguments
+    Terms (space separated, combined with AND):
+        >N  >=N  <N  <=N   result comparisons
+        A..B               result range
+        x:A..B             operand range
+        sqrt  √  +  ×  ... operation
+        anything else      prefix of the rendered history line
+    Examples: ">10000", "sqrt x:2..3", "√(2."
+    """
+    criteria = {}
+    words = []
+    for term in text.split():
+        try:
+            if term.startswith(">="):
+                criteria["min_result"] = float(term[2:])
+            elif term.startswith(">"):
+                # Exclusive bound on a float index: nudge past the value
+                criteria["min_result"] = _next_up(float(term[1:]))
+            elif term.startswith("<="):
+                criteria["max_result"] = _next_up(float(term[2:]))
+            elif term.startswith("<"):
+                criteria["max_result"] = float(term[1:])
+            elif term.startswith("x:") and ".." in term:
+                low, high = term[2:].split("..", 1)
+                criteria["min_operand"] = float(low) if low else None
+                criteria["max_operand"] = float(high) if high else None
+            elif ".." in term and not term.startswith("."):
+                low, high = term.split("..", 1)
+                criteria["min_result"] = float(low) if low else None
+                criteria["max_result"] = float(high) if high else None
+            elif term in _OPERATION_WORDS and "operation" not in criteria:
+                criteria["operation"] = _OPERATION_WORDS[term]
+            else:
+                words.append(term)
+        except ValueError:
+            words.append(term)
+    if words:
+        criteria["prefix"] = " ".join(words)
+    return criteria
+
+
+def _next_up(value):
+    """Smallest float greater than value (math.nextafter needs Python 3.9)"""
+    if value != value or value == float("inf"):
+        return value
+    if value == 0:
+        return 5e-324
+    bits = struct.unpack("<q", struct.pack("<d", value))[0]
+    bits += 1 if value > 0 else -1
+    return struct.unpack("<d", struct.pack("<q", bits))[0]
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Calculator Server Module
+Asyncio evaluation service speaking line-delimited JSON over TCP or a Unix socket
+
+Every connection gets its own CalculatorEngine session, so pending operations
+and stored values never leak between clients. Stateless requests
+("compute", "scientific_function") from all connections are collected for a
+short window and evaluated together through the engine's batch API.
+
+Request:   {"id": 1, "method": "compute", "params": {"operation": "+", "a": 1, "b": 2}}
+Response:  {"id": 1, "result": 3}   or   {"id": 1, "error": "Cannot divide by zero"}
+
+Methods:
+    compute              operation (+ - * / power percentage), a, b   [batched]
+    scientific_function  function, value                               [batched]
+    evaluate             expression, variables (optional)
+    operator             operation, value     (session state)
+    calculate            value                (session state)
+    clear                                     (session state)
+    state                                     (session state)
+
+Session requests may name a session shared across connections with a
+top-level "session" key, e.g. {"id": 2, "session": "alice", "method":
+"operator", ...}. Named sessions live in a calculator_sessions.SessionPool
+that evicts idle ones (to --session-store on disk, if given).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+from decimal import Decimal
+
+from calculator_batch import BINARY_OPERATIONS
+from calculator_engine import CalculatorEngine
+from calculator_sessions import DEFAULT_IDLE_SECONDS, SessionPool
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_BATCH_DELAY = 0.0005  # seconds
+
+# Operators a session's operator() may leave pending
+SESSION_OPERATIONS = ("+", "-", "*", "/")
+
+# Largest int encoded as a JSON number; longer ones are sent as digit strings
+_JSON_INT_BITS = 13000  # ~3900 digits, inside the default 4300-digit limit
+
+
+def _json_number(value):
+    """
+    Convert engine and NumPy results into JSON-friendly values
+    Raises:
+        ValueError: For infinities and NaN, which JSON cannot represent
+    """
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, int):
+        # json cannot encode ints past the interpreter's int -> str digit limit
+        if value.bit_length() > _JSON_INT_BITS:
+            from calculator_bignum import decimal_string
+            return decimal_string(value)
+        return value
+    value = float(value)
+    if value.is_integer():
+        return int(value)
+    if not math.isfinite(value):
+        raise ValueError("Number too large" if value == value else "Invalid calculation: not a number")
+    return value
+
+
+class MicroBatcher:
+    """Coalesces concurrent stateless requests into vectorized evaluations"""
+
+    # Exact integer results that a float batch would round - always scalar
+    UNBATCHED = frozenset([("function", "factorial")])
+
+    def __init__(self, engine, max_batch=DEFAULT_BATCH_SIZE, max_delay=DEFAULT_BATCH_DELAY):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = {}
+        self._timer = None
+        self.batches = 0
+        self.requests = 0
+
+    def submit(self, key, args):
+        """
+        Queue one evaluation
+        Args:
+            key: ("binary", operation) or ("function", name)
+            args: Operand tuple
+        Returns:
+            Future resolved with the result or a ValueError/ZeroDivisionError
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if key in self.UNBATCHED:
+            try:
+                future.set_result(self._scalar(key[0], key[1], args))
+            except (ValueError, ZeroDivisionError, OverflowError, TypeError) as e:
+                future.set_exception(ValueError(str(e)))
+            return future
+        bucket = self._pending.setdefault(key, [])
+        bucket.append((args, future))
+        if len(bucket) >= self.max_batch:
+            self._run(key, self._pending.pop(key))
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self.flush)
+        return future
+
+    def flush(self):
+        """Evaluate everything queued so far"""
+        self._timer = None
+        pending, self._pending = self._pending, {}
+        for key, bucket in pending.items():
+            self._run(key, bucket)
+
+    def _run(self, key, bucket):
+        kind, name = key
+        self.batches += 1
+        self.requests += len(bucket)
+        try:
+            if kind == "binary":
+                results, errors = self.engine.batch_calculation(
+                    name, [args[0] for args, _ in bucket], [args[1] for args, _ in bucket]
+                )
+            else:
+                results, errors = self.engine.batch_scientific_function(
+                    name, [args[0] for args, _ in bucket]
+                )
+        except (ValueError, TypeError) as e:
+            for _, future in bucket:
+                if not future.done():
+                    future.set_exception(ValueError(str(e)))
+            return
+
+        for (args, future), result, error in zip(bucket, results, errors):
+            if future.done():
+                continue
+            if error:
+                # Rerun the scalar path so the client sees the engine's message
+                try:
+                    future.set_result(self._scalar(kind, name, args))
+                except (ValueError, ZeroDivisionError, OverflowError, TypeError) as e:
+                    future.set_exception(ValueError(str(e)))
+            else:
+                future.set_result(_json_number(result))
+
+    def _scalar(self, kind, name, args):
+        engine = self.engine
+        if kind == "function":
+            result = engine.scientific_function(name, args[0])
+        elif name == "power":
+            result = engine.power(*args)
+        elif name == "percentage":
+            result = engine.percentage_calculation(*args)
+        else:
+            result = engine._perform_calculation(args[0], args[1], name)
+        return _json_number(result)
+
+
+class CalculatorServer:
+    """Line-delimited JSON front end for CalculatorEngine sessions"""
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, batch_delay=DEFAULT_BATCH_DELAY,
+                 session_pool=None):
+        self.batcher = MicroBatcher(CalculatorEngine(), batch_size, batch_delay)
+        self.sessions = 0
+        # Named sessions; connections without a "session" key use their own engine
+        self.session_pool = session_pool if session_pool is not None else SessionPool()
+
+    async def handle_connection(self, reader, writer):
+        """Serve one client; the engine session lives as long as the connection"""
+        session = CalculatorEngine()
+        self.sessions += 1
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                    method = request["method"]
+                    params = request.get("params") or {}
+                    session_name = request.get("session")
+                except (ValueError, KeyError, AttributeError):
+                    self._send(writer, {"id": None, "error": "Invalid request"})
+                    continue
+
+                if method in ("compute", "scientific_function"):
+                    # Batched requests resolve later; keep reading meanwhile
+                    task = asyncio.ensure_future(
+                        self._batched(writer, request_id, method, params)
+                    )
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    # Session requests run in arrival order
+                    engine = session
+                    if session_name is not None:
+                        engine = self.session_pool.get(str(session_name))
+                    self._send(writer, self._session_call(engine, request_id, method, params))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self.sessions -= 1
+            writer.close()
+
+    async def _batched(self, writer, request_id, method, params):
+        try:
+            if method == "compute":
+                operation = params["operation"]
+                if operation not in BINARY_OPERATIONS:
+                    raise ValueError(f"Unknown operation: {operation}")
+                future = self.batcher.submit(
+                    ("binary", operation), (float(params["a"]), float(params["b"]))
+                )
+            else:
+                future = self.batcher.submit(
+                    ("function", params["function"]), (float(params["value"]),)
+                )
+            response = {"id": request_id, "result": await future}
+        except KeyError as e:
+            response = {"id": request_id, "error": f"Missing parameter: {e.args[0]}"}
+        except (ValueError, TypeError, ZeroDivisionError) as e:
+            response = {"id": request_id, "error": str(e)}
+        if not writer.is_closing():
+            self._send(writer, response)
+
+    def _session_call(self, engine, request_id, method, params):
+        try:
+            # Values are parsed like compute's, so bad input never reaches session state
+            if method == "operator":
+                operation = params["operation"]
+                if operation not in SESSION_OPERATIONS:
+                    raise ValueError(f"Unknown operation: {operation}")
+                result = engine.operator(operation, float(params["value"]))
+            elif method == "calculate":
+                result = engine.calculate(float(params["value"]))
+            elif method == "evaluate":
+                result = engine.evaluate(params["expression"], params.get("variables"))
+            elif method == "clear":
+                engine.clear()
+                result = 0
+            elif method == "state":
+                return {"id": request_id, "result": {
+                    "stored_value": _json_number(engine.stored_value),
+                    "pending_operation": engine.pending_operation,
+                    "last_operation": engine.last_operation,
+                }}
+            else:
+                return {"id": request_id, "error": f"Unknown method: {method}"}
+            return {"id": request_id, "result": _json_number(result)}
+        except KeyError as e:
+            return {"id": request_id, "error": f"Missing parameter: {e.args[0]}"}
+        except (ValueError, TypeError, ZeroDivisionError, OverflowError) as e:
+            return {"id": request_id, "error": str(e)}
+
+    @staticmethod
+    def _send(writer, response):
+        try:
+            data = json.dumps(response, allow_nan=False)
+        except ValueError:
+            # Never write Infinity/NaN, which is not JSON
+            request_id = response.get("id")
+            if isinstance(request_id, float) and not math.isfinite(request_id):
+                request_id = None
+            data = json.dumps({"id": request_id, "error": "Result is not a finite number"})
+        writer.write(data.encode() + b"\n")
+
+
+async def _evict_idle_sessions(pool):
+    """Periodically move idle named sessions out of memory"""
+    interval = min(pool.idle_seconds / 4, 60.0)
+    while True:
+        await asyncio.sleep(interval)
+        pool.evict_idle()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None,
+                batch_size=DEFAULT_BATCH_SIZE, batch_delay=DEFAULT_BATCH_DELAY, ready=None,
+                session_store=None, session_idle=DEFAULT_IDLE_SECONDS):
+    """
+    Run the server until cancelled
+    Args:
+        host, port: TCP address (ignored when unix_path is given)
+        unix_path: Unix socket path
+        batch_size: Maximum requests per vectorized evaluation
+        batch_delay: Seconds to wait for more requests before evaluating
+        ready: Optional callback invoked with the listening server
+        session_store: File for evicted named sessions (default: kept in memory)
+        session_idle: Seconds after which an unused named session is evicted
+    """
+    pool = SessionPool(session_store, idle_seconds=session_idle)
+    server_state = CalculatorServer(batch_size, batch_delay, pool)
+    if unix_path:
+        server = await asyncio.start_unix_server(server_state.handle_connection, path=unix_path)
+    else:
+        server = await asyncio.start_server(server_state.handle_connection, host, port)
+    if ready is not None:
+        ready(server)
+    evictor = asyncio.ensure_future(_evict_idle_sessions(pool))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        evictor.cancel()
+        # Persist every named session for the next run
+        pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calculator JSON-lines evaluation server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", dest="unix_path", help="listen on a Unix socket instead")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--batch-delay-ms", type=float, default=DEFAULT_BATCH_DELAY * 1000)
+    parser.add_argument("--session-store", help="file for idle named sessions (default: memory)")
+    parser.add_argument("--session-idle", type=float, default=DEFAULT_IDLE_SECONDS,
+                        help="seconds before an unused named session is evicted")
+    args = parser.parse_args(argv)
+
+    def ready(server):
+        where = args.unix_path or f"{args.host}:{args.port}"
+        print(f"Calculator server listening on {where}", flush=True)
+
+    try:
+        asyncio.run(serve(
+            args.host, args.port, args.unix_path,
+            args.batch_size, args.batch_delay_ms / 1000, ready,
+            args.session_store, args.session_idle
+        ))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
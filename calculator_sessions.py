@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Calculator Sessions Module
+Pool of engine sessions keyed by id that evicts idle sessions to a compact
+on-disk store and faults them back in on demand
+
+A live session costs one CalculatorEngine; an evicted one costs its
+snapshot() bytes on disk plus an index entry in memory.
+"""
+
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from calculator_engine import CalculatorEngine
+
+# Defaults for SessionPool
+DEFAULT_MAX_LIVE = 10000
+DEFAULT_IDLE_SECONDS = 300.0
+
+
+class SessionStore:
+    """Append-only file of session snapshots with an in-memory index
+
+    Layout: an 8-byte magic followed by records of (key length, data length,
+    key, data). A data length of TOMBSTONE marks a removed session. Records
+    are buffered until flush(). The index is rebuilt by scanning the file on
+    open; once dead records outweigh live ones the file is rewritten atomically.
+    """
+
+    MAGIC = b"CALCSES1"
+    RECORD = struct.Struct("<HI")
+    TOMBSTONE = 0xFFFFFFFF
+    COMPACT_MIN_BYTES = 1 << 20
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Store file path (created if missing)
+        """
+        self.path = path
+        self._index = {}
+        self._live_bytes = 0
+        self._dead_bytes = 0
+        self._file = open(path, "a+b")
+        self._file.seek(0)
+        if self._file.read(len(self.MAGIC)) != self.MAGIC:
+            # New or unreadable store - start fresh
+            self._file.truncate(0)
+            self._file.write(self.MAGIC)
+            self._file.flush()
+        else:
+            self._load()
+
+    def _load(self):
+        """Rebuild the index from the records in the file"""
+        header_size = self.RECORD.size
+        offset = len(self.MAGIC)
+        while True:
+            self._file.seek(offset)
+            header = self._file.read(header_size)
+            if len(header) < header_size:
+                break
+            key_length, data_length = self.RECORD.unpack(header)
+            key = self._file.read(key_length)
+            data_start = offset + header_size + key_length
+            size = 0 if data_length == self.TOMBSTONE else data_length
+            if len(key) < key_length or data_start + size > os.fstat(self._file.fileno()).st_size:
+                # Torn final record - drop it
+                self._file.truncate(offset)
+                break
+            previous = self._index.pop(key, None)
+            if previous is not None:
+                self._live_bytes -= previous[1]
+                self._dead_bytes += previous[1]
+            if data_length != self.TOMBSTONE:
+                self._index[key] = (data_start, data_length)
+                self._live_bytes += data_length
+            offset = data_start + size
+
+    def _append(self, key, data_length, data=b""):
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(self.RECORD.pack(len(key), data_length) + key + data)
+        return offset + self.RECORD.size + len(key)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, session_id):
+        return session_id.encode() in self._index
+
+    def __setitem__(self, session_id, data):
+        key = session_id.encode()
+        previous = self._index.get(key)
+        if previous is not None:
+            self._live_bytes -= previous[1]
+            self._dead_bytes += previous[1]
+        self._index[key] = (self._append(key, len(data), data), len(data))
+        self._live_bytes += len(data)
+        self._maybe_compact()
+
+    def pop(self, session_id, default=None):
+        """Remove a session and return its snapshot bytes (default if absent)"""
+        key = session_id.encode()
+        entry = self._index.pop(key, None)
+        if entry is None:
+            return default
+        offset, length = entry
+        self._file.seek(offset)
+        data = self._file.read(length)
+        self._append(key, self.TOMBSTONE)
+        self._live_bytes -= length
+        self._dead_bytes += length
+        self._maybe_compact()
+        return data
+
+    def _maybe_compact(self):
+        if self._dead_bytes > max(self._live_bytes, self.COMPACT_MIN_BYTES):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the file with live records only (atomically replaced)"""
+        temp_path = self.path + ".tmp"
+        index = {}
+        with open(temp_path, "wb") as out:
+            out.write(self.MAGIC)
+            offset = len(self.MAGIC)
+            for key, (data_offset, length) in self._index.items():
+                self._file.seek(data_offset)
+                data = self._file.read(length)
+                out.write(self.RECORD.pack(len(key), length) + key + data)
+                offset += self.RECORD.size + len(key)
+                index[key] = (offset, length)
+                offset += length
+            out.flush()
+            os.fsync(out.fileno())
+        self._file.close()
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, "a+b")
+        self._index = index
+        self._dead_bytes = 0
+
+    def flush(self):
+        """Push buffered records to the operating system"""
+        self._file.flush()
+
+    def close(self):
+        """Close the file (the index is rebuilt when the store is reopened)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SessionPool:
+    """Engine sessions by id, with idle ones evicted as snapshots
+
+    Sessions are kept in least-recently-used order. evict_idle() moves those
+    unused for idle_seconds to the store, and the oldest are evicted whenever
+    more than max_live are in memory. get() faults evicted sessions back in.
+    """
+
+    def __init__(self, store_path=None, max_live=DEFAULT_MAX_LIVE,
+                 idle_seconds=DEFAULT_IDLE_SECONDS, number_mode="float",
+                 precision=10, angle_mode="degrees", clock=time.monotonic):
+        """
+        Args:
+            store_path: SessionStore file; None keeps evicted snapshots in memory
+            max_live: Maximum number of engines kept in memory
+            idle_seconds: Sessions unused this long are evicted by evict_idle()
+            number_mode, precision, angle_mode: Settings of new sessions
+            clock: Time source in seconds
+        """
+        if max_live <= 0:
+            raise ValueError("max_live must be positive")
+        self.max_live = max_live
+        self.idle_seconds = idle_seconds
+        self.settings = {"number_mode": number_mode, "precision": precision,
+                         "angle_mode": angle_mode}
+        self.clock = clock
+        self._store = SessionStore(store_path) if store_path else {}
+        # session id -> [engine, last used]
+        self._live = OrderedDict()
+        self._lock = threading.Lock()
+        self.faults = 0
+        self.evictions = 0
+        self.failed_evictions = 0
+
+    def __len__(self):
+        """Number of sessions, live and evicted"""
+        return len(self._live) + len(self._store)
+
+    def __contains__(self, session_id):
+        return session_id in self._live or session_id in self._store
+
+    def get(self, session_id):
+        """
+        Get a session's engine, restoring or creating it as needed
+        Args:
+            session_id: Session key (str)
+        Returns:
+            CalculatorEngine for the session
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._live.get(session_id)
+            if entry is not None:
+                entry[1] = now
+                self._live.move_to_end(session_id)
+                return entry[0]
+
+            data = self._store.pop(session_id, None)
+            engine = CalculatorEngine(**self.settings)
+            if data is not None:
+                engine.restore(data)
+                self.faults += 1
+            self._live[session_id] = [engine, now]
+            while len(self._live) > self.max_live and self._evict_oldest():
+                pass
+            self._flush_store()
+            return engine
+
+    def discard(self, session_id):
+        """Forget a session entirely"""
+        with self._lock:
+            if self._live.pop(session_id, None) is None:
+                self._store.pop(session_id, None)
+                self._flush_store()
+
+    def _flush_store(self):
+        if isinstance(self._store, SessionStore):
+            self._store.flush()
+
+    def _evict(self, session_id, engine):
+        """
+        Move one live session to the store
+        Returns:
+            False, leaving the session live, if its state cannot be snapshotted
+        """
+        try:
+            data = engine.snapshot()
+        except (TypeError, ValueError, OverflowError):
+            self.failed_evictions += 1
+            return False
+        self._store[session_id] = data
+        del self._live[session_id]
+        self.evictions += 1
+        return True
+
+    def _evict_oldest(self):
+        """Evict the least recently used session that can be evicted, False if none"""
+        for session_id, (engine, _) in self._live.items():
+            if self._evict(session_id, engine):
+                # Stop iterating - the dictionary just changed
+                return True
+        return False
+
+    def evict_idle(self, now=None):
+        """
+        Evict sessions unused for idle_seconds
+        Returns:
+            Number of sessions evicted
+        """
+        if now is None:
+            now = self.clock()
+        cutoff = now - self.idle_seconds
+        evicted = 0
+        with self._lock:
+            # Oldest first, so stop at the first recently used session
+            for session_id, (engine, used) in list(self._live.items()):
+                if used > cutoff:
+                    break
+                evicted += self._evict(session_id, engine)
+            if evicted:
+                self._flush_store()
+        return evicted
+
+    def stats(self):
+        """
+        Get pool counters
+        Returns:
+            Dictionary with live, evicted, faults, evictions and
+            failed_evictions (sessions kept live because snapshot() failed)
+        """
+        with self._lock:
+            return {
+                "live": len(self._live),
+                "evicted": len(self._store),
+                "faults": self.faults,
+                "evictions": self.evictions,
+                "failed_evictions": self.failed_evictions,
+            }
+
+    def close(self):
+        """Evict every live session (persisting it when a store file is used)"""
+        with self._lock:
+            while self._live and self._evict_oldest():
+                pass
+            if isinstance(self._store, SessionStore):
+                self._store.close()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Calculator Shared Module
+Multi-process batch evaluation over arrays held in shared memory
+
+Operands, results and the error mask live in multiprocessing.shared_memory
+blocks. Worker processes attach to the blocks by name and each evaluates a
+contiguous slice through calculator_batch, writing its results straight into
+the shared result array - only the block names and slice bounds cross the
+process boundary, never the data. Float semantics are those of
+batch_calculation (NumPy when installed, the plain Python loop otherwise).
+
+Worker pools are started on first use (spawn context, like
+calculator_worker) and kept per size for later calls; shutdown() stops them.
+"""
+
+import atexit
+import os
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from calculator_batch import BINARY_OPERATIONS, batch_binary, batch_function, np
+from config import Constants
+
+# Slices per worker process, so a slow slice does not hold up the others
+SLICES_PER_WORKER = 4
+
+# Arrays are not split below this many elements per slice
+MIN_SLICE_SIZE = 16384
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def default_workers():
+    """Worker processes used when none is given"""
+    return os.cpu_count() or 1
+
+
+def _open(name):
+    """Attach to an existing shared memory block"""
+    try:
+        # Python 3.13+: the creating process alone tracks the block
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedArray:
+    """Fixed-length array of doubles ("d") or bytes ("B") in a shared memory block
+
+    The creating process owns the block: close() releases this process's
+    mapping and, for the owner, also unlinks the block. Use it as a context
+    manager or call close() when done.
+    """
+
+    def __init__(self, length, typecode="d"):
+        """
+        Create a zero-filled shared array
+        Args:
+            length: Number of elements
+            typecode: "d" for float64 values, "B" for byte flags
+        """
+        itemsize = array(typecode).itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, length * itemsize))
+        self._owner = True
+        self.length = length
+        self.typecode = typecode
+        self.view = self._shm.buf[:length * itemsize].cast(typecode)
+
+    @classmethod
+    def from_values(cls, values, typecode="d"):
+        """New shared array holding a copy of values (sequence or array)"""
+        values = values if np is not None else array(typecode, values)
+        shared = cls(len(values), typecode)
+        if np is not None:
+            shared.to_numpy()[:] = values
+        else:
+            shared.view[:] = values
+        return shared
+
+    @property
+    def name(self):
+        """Block name other processes attach to"""
+        return self._shm.name
+
+    def to_numpy(self):
+        """NumPy array over the shared block (no copy); drop it before close()"""
+        dtype = np.float64 if self.typecode == "d" else np.uint8
+        return np.frombuffer(self._shm.buf, dtype=dtype, count=self.length)
+
+    def tolist(self):
+        if self.typecode == "B":
+            return [bool(flag) for flag in self.view]
+        return self.view.tolist()
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        value = self.view[index]
+        return bool(value) if self.typecode == "B" and isinstance(index, int) else value
+
+    def close(self):
+        """Release the mapping (and unlink the block if this process created it)"""
+        if self._shm is None:
+            return
+        self.view.release()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except (AttributeError, BufferError):
+            # Half-built, or a NumPy view of the block is still alive
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _slice(shm, typecode, start, stop):
+    """Elements start:stop of a block - a NumPy view, or a list of the values"""
+    if np is not None:
+        dtype = np.float64 if typecode == "d" else np.uint8
+        return np.frombuffer(shm.buf, dtype=dtype, count=stop - start,
+                             offset=start * np.dtype(dtype).itemsize)
+    itemsize = array(typecode).itemsize
+    with shm.buf[start * itemsize:stop * itemsize].cast(typecode) as view:
+        return view.tolist()
+
+
+def _store(shm, typecode, start, values):
+    """Write values into a block from element start on"""
+    if np is not None:
+        target = _slice(shm, typecode, start, start + len(values))
+        target[:] = values
+        del target
+        return
+    itemsize = array(typecode).itemsize
+    with shm.buf[start * itemsize:(start + len(values)) * itemsize].cast(typecode) as view:
+        view[:] = array(typecode, values)
+
+
+def _evaluate_slice(task):
+    """
+    Evaluate one slice in place (runs in a worker process, or inline)
+    Args:
+        task: (kind, name, operands, result block, mask block, start, stop, angle mode);
+              operands are block names (str) or float scalars
+    Returns:
+        Number of failed elements in the slice
+    """
+    kind, name, operands, result_name, mask_name, start, stop, angle_mode = task
+    blocks = []
+    try:
+        arguments = []
+        for operand in operands:
+            if isinstance(operand, str):
+                shm = _open(operand)
+                blocks.append(shm)
+                arguments.append(_slice(shm, "d", start, stop))
+            else:
+                arguments.append(operand)
+        if kind == "function":
+            results, errors = batch_function(name, arguments[0], angle_mode)
+        else:
+            results, errors = batch_binary(name, arguments[0], arguments[1])
+        arguments = None
+
+        result_block = _open(result_name)
+        blocks.append(result_block)
+        mask_block = _open(mask_name)
+        blocks.append(mask_block)
+        _store(result_block, "d", start, results)
+        _store(mask_block, "B", start, errors)
+        return int(sum(errors))
+    finally:
+        # NumPy views must be gone before their blocks close
+        arguments = None
+        for shm in blocks:
+            shm.close()
+
+
+# ---------------------------------------------------------------------------
+# Caller side
+# ---------------------------------------------------------------------------
+
+def _executor(workers):
+    """Process pool of the given size, started on first use"""
+    with _executors_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            import multiprocessing
+            executor = ProcessPoolExecutor(max_workers=workers,
+                                           mp_context=multiprocessing.get_context("spawn"))
+            _executors[workers] = executor
+        return executor
+
+
+def shutdown():
+    """Stop every worker pool (they restart on the next call)"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown()
+
+
+atexit.register(shutdown)
+
+
+def _is_scalar(value):
+    return isinstance(value, (int, float))
+
+
+def _run(kind, name, operands, workers, angle_mode):
+    """Share the operands, evaluate them in slices and return (results, mask)"""
+    if workers is None:
+        workers = default_workers()
+    lengths = {len(operand) for operand in operands if not _is_scalar(operand)}
+    if len(lengths) > 1:
+        raise ValueError("Operand arrays must have the same length")
+    if not lengths:
+        # Scalars only: one-element arrays
+        operands = [[operand] for operand in operands]
+        lengths = {1}
+    length = lengths.pop()
+
+    # Operands not already shared are copied into shared memory once
+    temporary = []
+    shared = []
+    for operand in operands:
+        if _is_scalar(operand):
+            shared.append(float(operand))
+        elif isinstance(operand, SharedArray):
+            shared.append(operand.name)
+        else:
+            operand = SharedArray.from_values(operand)
+            temporary.append(operand)
+            shared.append(operand.name)
+
+    results = SharedArray(length, "d")
+    mask = SharedArray(length, "B")
+    try:
+        slices = max(1, min(workers * SLICES_PER_WORKER, length // MIN_SLICE_SIZE))
+        bounds = [length * i // slices for i in range(slices + 1)]
+        tasks = [(kind, name, shared, results.name, mask.name, start, stop, angle_mode)
+                 for start, stop in zip(bounds, bounds[1:]) if stop > start]
+        if workers <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                _evaluate_slice(task)
+        else:
+            executor = _executor(workers)
+            try:
+                list(executor.map(_evaluate_slice, tasks))
+            except BrokenProcessPool:
+                # A worker died - start a fresh pool next time
+                with _executors_lock:
+                    if _executors.get(workers) is executor:
+                        del _executors[workers]
+                raise
+    except BaseException:
+        results.close()
+        mask.close()
+        raise
+    finally:
+        for operand in temporary:
+            operand.close()
+    return results, mask
+
+
+def shared_binary(operation, operands1, operands2, workers=None):
+    """
+    Apply a binary operation element-wise on worker processes
+    Args:
+        operation: Operation code (+, -, *, /, power, percentage)
+        operands1: SharedArray (used in place), other sequence (copied into
+                   shared memory once) or scalar
+        operands2: Same, for the second operands
+        workers: Worker processes (default: the CPU count; 1 runs inline)
+    Returns:
+        Tuple of (results, error_mask) as SharedArrays owned by the caller;
+        failed elements are NaN in results
+    Raises:
+        ValueError: For unknown operations or mismatched lengths
+    """
+    if operation not in BINARY_OPERATIONS:
+        raise ValueError(f"Unknown operation: {operation}")
+    return _run("binary", operation, [operands1, operands2], workers, None)
+
+
+def shared_function(function, values, workers=None, angle_mode="degrees"):
+    """
+    Apply a scientific function element-wise on worker processes
+    Args:
+        function: Function name (sqrt, square, reciprocal, etc.)
+        values: SharedArray (used in place) or other sequence of input values
+        workers: Worker processes (default: the CPU count; 1 runs inline)
+        angle_mode: Unit of sin/cos/tan arguments ("degrees" or "radians")
+    Returns:
+        Tuple of (results, error_mask) as SharedArrays owned by the caller;
+        failed elements are NaN in results
+    Raises:
+        ValueError: For unknown functions
+    """
+    if function not in Constants.SCIENTIFIC_FUNCTIONS:
+        raise ValueError(f"Unknown function: {function}")
+    return _run("function", function, [values], workers, angle_mode)
@@ -4,9 +4,45 @@ Calculator Theme Module
 Handles styling and theming for the calculator application
 """
 
+import re
 import tkinter as tk
 from tkinter import ttk
 
+# Colors every theme defines
+THEME_KEYS = (
+    "bg", "fg", "select_bg", "button_bg", "button_fg", "button_active",
+    "number_bg", "number_fg", "operator_bg", "operator_fg", "equals_bg", "equals_fg",
+    "function_bg", "function_fg", "clear_bg", "clear_fg", "scientific_bg", "scientific_fg",
+    "entry_bg", "entry_fg", "entry_select_bg",
+)
+
+# Button style prefixes (also the theme color key prefixes) and their font sizes
+BUTTON_STYLES = (
+    ("number", 14), ("operator", 14), ("equals", 16),
+    ("function", 11), ("clear", 12), ("scientific", 11),
+)
+
+_COLOR_PATTERN = re.compile(r"#[0-9a-fA-F]{3}$|#[0-9a-fA-F]{6}$|[A-Za-z][A-Za-z0-9 ]*$")
+
+_UNSET = object()
+
+
+def style_changes(old, new):
+    """
+    Options of a compiled style table that differ from another
+    Args:
+        old: Compiled table currently applied (empty when nothing is)
+        new: Compiled table to apply
+    Returns:
+        Dictionary mapping (style, kind) to {option: value} for changed options
+    """
+    changes = {}
+    for key, value in new.items():
+        if old.get(key, _UNSET) != value:
+            name, kind, option = key
+            changes.setdefault((name, kind), {})[option] = value
+    return changes
+
 class CalculatorTheme:
     def __init__(self):
         self.themes = {
@@ -81,42 +117,43 @@ class CalculatorTheme:
             }
         }
         
-    def apply_theme(self, root, theme_name):
+        # Resolved style tables by theme name, and what was last applied
+        self._compiled = {}
+        self._applied = {}
+        self._applied_root = None
+        self.current_theme = None
+        
+    def compiled_theme(self, theme_name):
         """
-        Apply a theme to the calculator
+        Get the resolved style table of a theme, compiling it on first use
         Args:
-            root: Root tkinter window
-            theme_name: Name of theme to apply
+            theme_name: Name of a registered theme
+        Returns:
+            Dictionary mapping (style, kind, option) to the option value, where
+            kind is "configure" or "map" (the root window is style "root")
         """
-        if theme_name not in self.themes:
-            theme_name = "dark"  # Default to dark theme
-            
-        theme = self.themes[theme_name]
-        style = ttk.Style()
-        
-        # Configure root window
-        root.configure(bg=theme["bg"])
+        table = self._compiled.get(theme_name)
+        if table is None:
+            table = self._compiled[theme_name] = self._compile(self.themes[theme_name])
+        return table
         
-        # Configure ttk styles
-        style.theme_use("clam")  # Use clam as base theme
+    def _compile(self, theme):
+        """Resolve every style option of a theme, including derived hover/pressed colors"""
+        table = {("root", "configure", "bg"): theme["bg"]}
         
-        # Configure Frame styles
-        style.configure(
-            "TFrame",
-            background=theme["bg"],
-            borderwidth=0
-        )
-        
-        # Configure Label styles
-        style.configure(
-            "TLabel",
-            background=theme["bg"],
-            foreground=theme["fg"],
-            font=("Segoe UI", 10)
-        )
-        
-        # Configure Entry styles
-        style.configure(
+        def configure(style, **options):
+            for option, value in options.items():
+                table[(style, "configure", option)] = value
+                
+        def state_map(style, **options):
+            for option, states in options.items():
+                table[(style, "map", option)] = tuple(states)
+                
+        # Frame, Label and Entry styles
+        configure("TFrame", background=theme["bg"], borderwidth=0)
+        configure("TLabel", background=theme["bg"], foreground=theme["fg"],
+                  font=("Segoe UI", 10))
+        configure(
             "TEntry",
             fieldbackground=theme["entry_bg"],
             foreground=theme["entry_fg"],
@@ -124,125 +161,58 @@ class CalculatorTheme:
             insertcolor=theme["entry_fg"],
             selectbackground=theme["entry_select_bg"]
         )
+        state_map("TEntry", focuscolor=[("!focus", theme["entry_bg"])])
         
-        style.map(
-            "TEntry",
-            focuscolor=[("!focus", theme["entry_bg"])]
-        )
-        
-        # Configure button styles
-        self._configure_button_styles(style, theme)
-        
-    def _configure_button_styles(self, style, theme):
-        """Configure all button styles"""
+        # Button styles: (style prefix, theme key prefix, font size)
+        for prefix, size in BUTTON_STYLES:
+            style = f"{prefix}.TButton"
+            configure(
+                style,
+                background=theme[f"{prefix}_bg"],
+                foreground=theme[f"{prefix}_fg"],
+                borderwidth=1,
+                font=("Segoe UI", size, "bold"),
+                focuscolor="none"
+            )
+            if prefix == "number":
+                active, pressed = theme["button_active"], theme["select_bg"]
+            else:
+                active = self._lighten_color(theme[f"{prefix}_bg"])
+                pressed = self._darken_color(theme[f"{prefix}_bg"])
+            state_map(style, background=[("active", active), ("pressed", pressed)])
+        return table
         
-        # Number buttons
-        style.configure(
-            "number.TButton",
-            background=theme["number_bg"],
-            foreground=theme["number_fg"],
-            borderwidth=1,
-            font=("Segoe UI", 14, "bold"),
-            focuscolor="none"
-        )
-        
-        style.map(
-            "number.TButton",
-            background=[
-                ("active", theme["button_active"]),
-                ("pressed", theme["select_bg"])
-            ]
-        )
-        
-        # Operator buttons
-        style.configure(
-            "operator.TButton",
-            background=theme["operator_bg"],
-            foreground=theme["operator_fg"],
-            borderwidth=1,
-            font=("Segoe UI", 14, "bold"),
-            focuscolor="none"
-        )
-        
-        style.map(
-            "operator.TButton",
-            background=[
-                ("active", self._lighten_color(theme["operator_bg"])),
-                ("pressed", self._darken_color(theme["operator_bg"]))
-            ]
-        )
-        
-        # Equals button
-        style.configure(
-            "equals.TButton",
-            background=theme["equals_bg"],
-            foreground=theme["equals_fg"],
-            borderwidth=1,
-            font=("Segoe UI", 16, "bold"),
-            focuscolor="none"
-        )
-        
-        style.map(
-            "equals.TButton",
-            background=[
-                ("active", self._lighten_color(theme["equals_bg"])),
-                ("pressed", self._darken_color(theme["equals_bg"]))
-            ]
-        )
-        
-        # Function buttons (MC, MR, M+, M-)
-        style.configure(
-            "function.TButton",
-            background=theme["function_bg"],
-            foreground=theme["function_fg"],
-            borderwidth=1,
-            font=("Segoe UI", 11, "bold"),
-            focuscolor="none"
-        )
-        
-        style.map(
-            "function.TButton",
-            background=[
-                ("active", self._lighten_color(theme["function_bg"])),
-                ("pressed", self._darken_color(theme["function_bg"]))
-            ]
-        )
-        
-        # Clear buttons (C, CE, Backspace)
-        style.configure(
-            "clear.TButton",
-            background=theme["clear_bg"],
-            foreground=theme["clear_fg"],
-            borderwidth=1,
-            font=("Segoe UI", 12, "bold"),
-            focuscolor="none"
-        )
-        
-        style.map(
-            "clear.TButton",
-            background=[
-                ("active", self._lighten_color(theme["clear_bg"])),
-                ("pressed", self._darken_color(theme["clear_bg"]))
-            ]
-        )
-        
-        # Scientific function buttons
-        style.configure(
-            "scientific.TButton",
-            background=theme["scientific_bg"],
-            foreground=theme["scientific_fg"],
-            borderwidth=1,
-            font=("Segoe UI", 11, "bold"),
-            focuscolor="none"
-        )
-        
-        style.map(
-            "scientific.TButton",
-            background=[
-                ("active", self._lighten_color(theme["scientific_bg"])),
-                ("pressed", self._darken_color(theme["scientific_bg"]))
-            ]
-        )
+    def apply_theme(self, root, theme_name):
+        """
+        Apply a theme to the calculator
+        Only options that differ from the theme currently applied to root are
+        sent to Tk, grouped into one configure/map call per style.
+        Args:
+            root: Root tkinter window
+            theme_name: Name of theme to apply
+        """
+        if theme_name not in self.themes:
+            theme_name = "dark"  # Default to dark theme
+            
+        table = self.compiled_theme(theme_name)
+        if self._applied_root is not root:
+            # First theme on this window: select the base theme once
+            ttk.Style(root).theme_use("clam")  # Use clam as base theme
+            self._applied_root = root
+            self._applied = {}
+            
+        changes = style_changes(self._applied, table)
+        if changes:
+            style = ttk.Style(root)
+            for (name, kind), options in changes.items():
+                if name == "root":
+                    root.configure(**options)
+                elif kind == "configure":
+                    style.configure(name, **options)
+                else:
+                    style.map(name, **options)
+        self._applied = table
+        self.current_theme = theme_name
         
     def _lighten_color(self, color):
         """Lighten a hex color by 20%"""
@@ -281,6 +251,32 @@ class CalculatorTheme:
         Add a custom theme
         Args:
             name: Theme name
-            theme_dict: Dictionary with theme colors
+            theme_dict: Dictionary with a color for every key of THEME_KEYS,
+                as "#rgb", "#rrggbb" or a Tk color name
+        Raises:
+            ValueError: If the name is empty or colors are missing, unknown or malformed
         """
-        self.themes[name] = theme_dict
\ No newline at end of file
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError("Theme name must be a non-empty string")
+        if not isinstance(theme_dict, dict):
+            raise ValueError("Theme must be a dictionary of colors")
+        missing = [key for key in THEME_KEYS if key not in theme_dict]
+        if missing:
+            raise ValueError(f"Theme {name} is missing colors: {', '.join(missing)}")
+        unknown = sorted(key for key in theme_dict if key not in THEME_KEYS)
+        if unknown:
+            raise ValueError(f"Theme {name} has unknown keys: {', '.join(unknown)}")
+            
+        theme = {}
+        for key in THEME_KEYS:
+            color = theme_dict[key]
+            if not isinstance(color, str) or not _COLOR_PATTERN.match(color):
+                raise ValueError(f"Theme {name}: invalid color for {key}: {color!r}")
+            if len(color) == 4:
+                # "#rgb" -> "#rrggbb" so hover/pressed colors can be derived
+                color = "#" + "".join(digit * 2 for digit in color[1:])
+            theme[key] = color
+            
+        table = self._compile(theme)
+        self.themes[name] = theme
+        self._compiled[name] = table
\ No newline at end of file
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Calculator Worker Module
+Runs long engine calls in a separate process so the GUI stays responsive
+
+A single worker process is started on first use and reused. Cancelling a call
+terminates the process (CPU-bound calls such as a huge factorial cannot be
+interrupted any other way); the next call starts a fresh one. Results come
+back through a queue that the GUI polls from its after() loop.
+"""
+
+import math
+import time
+from decimal import Decimal
+
+from calculator_rational import Rational
+
+# Factorials up to this input finish in microseconds and stay on the caller's thread
+FACTORIAL_INLINE_LIMIT = 1000
+
+# Functions computed to the full precision in high-precision mode, so their
+# cost grows with it (calculator_engine.HIGH_PRECISION_FUNCTIONS less factorial)
+PRECISION_FUNCTIONS = frozenset(("exp", "ln", "sqrt"))
+
+_LOG10_2 = math.log10(2)
+_LOG10_E = math.log10(math.e)
+
+
+def estimated_digits(function, value):
+    """
+    Estimate the number of decimal digits of a function result
+    Returns:
+        Digit estimate, or None when the result size is not input-dependent
+    """
+    if function == "factorial" and value >= 1:
+        return int(math.lgamma(float(value) + 1) / math.log(10)) + 1
+    return None
+
+
+def _check_digits(digits, max_digits):
+    if digits is not None and digits > max_digits:
+        if digits > 1e15:
+            raise ValueError(f"Result too large: more than {max_digits:,} digits")
+        raise ValueError(f"Result too large: about {int(digits):,} digits (limit {max_digits:,})")
+
+
+# Button presses and pasted expressions with a power, factorial or exp estimated
+# above this many digits run in the worker (as large as factorial(1000))
+INLINE_RESULT_DIGITS = estimated_digits("factorial", FACTORIAL_INLINE_LIMIT)
+
+
+def _log10(value):
+    """log10 of |value| for a number or numeric literal, -inf for zero"""
+    if isinstance(value, Rational):
+        # Either part may be beyond the float range
+        return _log10(value.numerator) - math.log10(value.denominator) if value else -math.inf
+    if not isinstance(value, int):
+        # Literals beyond the float range become inf
+        value = float(value)
+    return math.log10(abs(value)) if value else -math.inf
+
+
+def _power_of_ten(magnitude):
+    return math.inf if magnitude > 300 else 10.0 ** magnitude
+
+
+def _estimate(node, engine):
+    """
+    Estimate an unfolded expression AST without evaluating it
+    Returns:
+        (log10 of the result's magnitude or None when unknown, largest
+        estimated digit count of any power, factorial or exp in the tree)
+    """
+    kind = node[0]
+    if kind == "num":
+        return _log10(node[1]), 0
+    if kind == "var":
+        return None, 0
+    if kind == "neg":
+        return _estimate(node[1], engine)
+
+    if kind == "call":
+        function = node[1]
+        magnitude, digits = _estimate(node[2], engine)
+        if magnitude is None:
+            return None, digits
+        if function == "factorial":
+            value = _power_of_ten(magnitude)
+            size = math.inf if math.isinf(value) else estimated_digits("factorial", value) or 0
+            return size, max(digits, size)
+        if function in PRECISION_FUNCTIONS and engine.high_precision:
+            digits = max(digits, engine.precision)
+        if function == "exp":
+            return _power_of_ten(magnitude) * _LOG10_E, digits
+        if function == "sqrt":
+            return magnitude / 2, digits
+        if function in ("ln", "log"):
+            return math.log10(abs(magnitude) * math.log(10) + 1), digits
+        if function == "square":
+            return magnitude * 2, digits
+        if function == "reciprocal":
+            return -magnitude, digits
+        if function == "percent":
+            return magnitude - 2, digits
+        if function in ("sin", "cos", "tan"):
+            return 0.0, digits
+        return magnitude, digits
+
+    operator = node[1]
+    left, left_digits = _estimate(node[2], engine)
+    right, right_digits = _estimate(node[3], engine)
+    digits = max(left_digits, right_digits)
+    if left is None or right is None:
+        return None, digits
+    if operator == "^":
+        # A negative exponent still builds the huge power (exact modes keep
+        # it as a denominator), so only the base's distance from 1 matters
+        if not left or math.isinf(left) and left < 0:
+            return 0.0, digits
+        size = _power_of_ten(right) * abs(left)
+        return size, max(digits, size)
+    if operator in "+-":
+        magnitude = max(left, right) + _LOG10_2
+    elif operator == "*":
+        magnitude = left + right
+    elif operator == "/":
+        magnitude = left - right
+    else:
+        magnitude = left + right - 2
+    return (None if math.isnan(magnitude) else magnitude), digits
+
+
+def expression_digits(text, engine):
+    """
+    Estimate the largest power, factorial or exp result in an expression
+    The text is parsed but nothing is evaluated or constant-folded.
+    Args:
+        text: Expression text
+        engine: CalculatorEngine the expression will run on
+    Returns:
+        Estimated digit count (0 if there is none or the text does not parse)
+    """
+    from calculator_expression import ExpressionError, parse
+    try:
+        return _estimate(parse(text), engine)[1]
+    except (ExpressionError, RecursionError):
+        # Evaluating it fails just as fast
+        return 0
+
+
+def expression_is_long_running(text, engine):
+    """True if an expression can take long enough to freeze the window"""
+    return expression_digits(text, engine) > INLINE_RESULT_DIGITS
+
+
+def check_expression_size(text, engine, max_digits):
+    """
+    Refuse expressions with a power, factorial or exp over the size budget
+    Raises:
+        ValueError: If an estimated result has more than max_digits digits
+    """
+    _check_digits(expression_digits(text, engine), max_digits)
+
+
+def function_digits(function, value, engine):
+    """
+    Estimate the result of a scientific function button press
+    Uses the same rule as expression_digits, as if function(value) were pasted.
+    Args:
+        function: Function name
+        value: Input value
+        engine: CalculatorEngine the call will run on
+    Returns:
+        Estimated digit count (0 if the size does not grow with the input)
+    """
+    try:
+        return _estimate(("call", function, ("num", value)), engine)[1]
+    except (TypeError, ValueError):
+        # Not a number (or a signalling NaN): the engine rejects it at once
+        return 0
+
+
+def is_long_running(function, value, engine):
+    """
+    Decide whether a scientific function call should run in the worker
+    Args:
+        function: Function name
+        value: Input value
+        engine: CalculatorEngine the call will run on
+    Returns:
+        True if the call can take long enough to freeze the window
+    """
+    return function_digits(function, value, engine) > INLINE_RESULT_DIGITS
+
+
+def check_result_size(function, value, engine, max_digits):
+    """
+    Refuse calls whose result would exceed the size budget
+    Raises:
+        ValueError: If the estimated result has more than max_digits digits
+    """
+    _check_digits(function_digits(function, value, engine), max_digits)
+
+
+def format_result(engine, value):
+    """Render a result for the display, in the worker so huge values never block the GUI"""
+    if isinstance(value, (Decimal, int, Rational)):
+        return engine.format_number(value)
+    return str(value)
+
+
+def _worker_main(requests, results):
+    """Worker process loop: run (job_id, settings, method, args) jobs until None arrives"""
+    from calculator_engine import CalculatorEngine
+
+    engines = {}
+    while True:
+        job = requests.get()
+        if job is None:
+            return
+        job_id, settings, method, args = job
+        engine = engines.get(settings)
+        if engine is None:
+            number_mode, precision, angle_mode = settings
+            engine = engines[settings] = CalculatorEngine(
+                number_mode=number_mode, precision=precision, angle_mode=angle_mode
+            )
+        try:
+            value = getattr(engine, method)(*args)
+            results.put((job_id, True, value, format_result(engine, value)))
+        except (ValueError, ZeroDivisionError, OverflowError, TypeError) as e:
+            results.put((job_id, False, None, str(e)))
+
+
+class ComputeWorker:
+    """One background process running engine calls, one call at a time"""
+
+    def __init__(self):
+        import multiprocessing
+        import queue
+        self._empty = queue.Empty
+        # spawn: never fork a process that owns a Tk interpreter and threads
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._requests = None
+        self._results = None
+        self._next_id = 0
+        self._pending = None
+        self._started = 0.0
+
+    @property
+    def busy(self):
+        """True while a submitted call has not finished"""
+        return self._pending is not None
+
+    @property
+    def elapsed(self):
+        """Seconds since the pending call was submitted"""
+        return time.monotonic() - self._started if self._pending is not None else 0.0
+
+    def _ensure_process(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        self._requests = self._context.Queue()
+        self._results = self._context.Queue()
+        self._process = self._context.Process(
+            target=_worker_main, args=(self._requests, self._results),
+            name="calculator-worker", daemon=True
+        )
+        self._process.start()
+
+    def submit(self, engine, method, *args):
+        """
+        Run engine.method(*args) in the worker process
+        Args:
+            engine: CalculatorEngine whose number mode, precision and angle
+                mode the worker copies (its state is not shared)
+            method: Engine method name (e.g. "scientific_function", "evaluate")
+        Returns:
+            Job id
+        Raises:
+            ValueError: If a call is already running
+        """
+        if self._pending is not None:
+            raise ValueError("A calculation is already running")
+        self._ensure_process()
+        self._next_id += 1
+        self._pending = self._next_id
+        self._started = time.monotonic()
+        settings = (engine.number_mode, engine.precision, engine.angle_mode)
+        self._requests.put((self._next_id, settings, method, args))
+        return self._next_id
+
+    def poll(self):
+        """
+        Check for the pending call's outcome without blocking
+        Returns:
+            (job_id, ok, value, text) where text is the display text or the
+            error message, or None while the call is still running
+        """
+        if self._pending is None:
+            return None
+        try:
+            outcome = self._results.get_nowait()
+        except self._empty:
+            if self._process.is_alive():
+                return None
+            job_id, self._pending = self._pending, None
+            self._process = None
+            return (job_id, False, None, "Calculation worker stopped unexpectedly")
+        if outcome[0] != self._pending:
+            return None  # left over from a cancelled call
+        self._pending = None
+        return outcome
+
+    def cancel(self):
+        """Abandon the pending call by terminating the worker process"""
+        self._pending = None
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(1)
+            self._process = None
+            # The queues may be left locked by the killed process
+            for channel in (self._requests, self._results):
+                channel.close()
+                channel.cancel_join_thread()
+
+    def close(self):
+        """Stop the worker process"""
+        if self._pending is not None:
+            self.cancel()
+        elif self._process is not None:
+            self._requests.put(None)
+            self._process.join(1)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
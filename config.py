@@ -5,65 +5,325 @@ Handles configuration settings and constants
 """
 
 import os
-import json
-from pathlib import Path
+import threading
+import time
+
+# json and pathlib are imported on first use: importing this module
+# (which every other module does) must not cost a disk read or heavy imports
+CONFIG_DIR_NAME = ".advanced_calculator"
+CONFIG_FILE_NAME = "config.json"
+
+# Write-behind timing: a save happens once set() calls have been quiet for
+# SAVE_DELAY seconds, and at most SAVE_MAX_DELAY after the first unsaved change
+SAVE_DELAY = 0.5
+SAVE_MAX_DELAY = 2.0
 
 class CalculatorConfig:
     def __init__(self):
-        self.config_dir = Path.home() / ".advanced_calculator"
-        self.config_file = self.config_dir / "config.json"
+        self._config_dir = os.path.join(os.path.expanduser("~"), CONFIG_DIR_NAME)
+        self._config_file = os.path.join(self._config_dir, CONFIG_FILE_NAME)
+        self._config = None
+        
+        # Write-behind state; _lock guards the settings and the dirty flag,
+        # _write_lock keeps file writes ordered
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._dirty_since = None
+        self._deadline = 0.0
+        self._saved = None
+        self._writer = None
+        self._wakeup = None
+        
+        # Hot-reload state: stat signature of the file as last read or
+        # written, change subscribers by key, and the active poller
+        self._signature = None
+        self._subscribers = {}
+        self._watch_after = None
+        self._watch_stop = None
         self.default_config = {
             "theme": "dark",
             "window_geometry": "400x600",
             "precision": 10,
+            "number_mode": "float",  # float, decimal or rational
             "angle_mode": "degrees",  # degrees or radians
             "sound_enabled": True,
             "auto_save": True,
             "font_size": 14,
             "show_history": True,
+            "history_journal": False,  # persist history across restarts
+            "instrumentation": False,  # record engine metrics from startup
+            "compute_timeout": 30,  # seconds before a background calculation is cancelled
+            "max_result_digits": 1000000,  # refuse results estimated to be larger
             "memory_persistent": False
         }
-        self.config = self.load_config()
+        
+    @property
+    def config_dir(self):
+        """Configuration directory as a pathlib.Path"""
+        from pathlib import Path
+        return Path(self._config_dir)
+        
+    @property
+    def config_file(self):
+        """Configuration file as a pathlib.Path"""
+        from pathlib import Path
+        return Path(self._config_file)
+        
+    @property
+    def config(self):
+        """Current settings, loaded from disk on first access"""
+        if self._config is None:
+            self._config = self.load_config()
+        return self._config
+        
+    @config.setter
+    def config(self, value):
+        self._config = value
+        
+    @property
+    def loaded(self):
+        """True once the settings have been read"""
+        return self._config is not None
+        
+    def _file_signature(self):
+        """(mtime, size, inode) of the settings file, or None if it is missing"""
+        try:
+            stat = os.stat(self._config_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        
+    def _read_file(self):
+        """
+        Read the settings file merged over the defaults
+        Raises:
+            ValueError: If the file is not a JSON object
+            IOError: If the file cannot be read
+        """
+        import json
+        with open(self._config_file, 'r') as f:
+            loaded_config = json.load(f)
+        if not isinstance(loaded_config, dict):
+            raise ValueError("Configuration file is not a JSON object")
+        # Merge with defaults to ensure all keys exist
+        config = self.default_config.copy()
+        config.update(loaded_config)
+        return config
         
     def load_config(self):
         """Load configuration from file or create default"""
+        # Stat before reading: a change made during the read is caught by the next check
+        self._signature = self._file_signature()
+        if self._signature is None:
+            return self.default_config.copy()
         try:
-            if self.config_file.exists():
-                with open(self.config_file, 'r') as f:
-                    loaded_config = json.load(f)
-                # Merge with defaults to ensure all keys exist
-                config = self.default_config.copy()
-                config.update(loaded_config)
-                return config
-            else:
-                return self.default_config.copy()
-        except (json.JSONDecodeError, IOError):
+            return self._read_file()
+        except (ValueError, IOError):
+            # ValueError covers json.JSONDecodeError
             return self.default_config.copy()
             
     def save_config(self):
-        """Save current configuration to file"""
+        """Save current configuration to file now (atomically)"""
+        with self._write_lock:
+            with self._lock:
+                data = dict(self.config)
+                self._dirty_since = None
+            self._write(data)
+            
+    def _write(self, data):
+        """Write settings through a temp file and os.replace, so readers never see a torn file"""
+        if data == self._saved:
+            return
+        import json
+        temp_file = f"{self._config_file}.{os.getpid()}.tmp"
         try:
             # Create config directory if it doesn't exist
-            self.config_dir.mkdir(exist_ok=True)
+            os.makedirs(self._config_dir, exist_ok=True)
             
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=4)
-        except IOError as e:
+            with open(temp_file, 'w') as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self._config_file)
+            self._saved = data
+            # Our own write is not an external change
+            self._signature = self._file_signature()
+        except (IOError, TypeError, ValueError) as e:
             print(f"Warning: Could not save configuration: {e}")
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+                
+    def flush(self):
+        """Write pending changes now (no-op when nothing is pending)"""
+        with self._write_lock:
+            with self._lock:
+                if self._dirty_since is None:
+                    return
+                data = dict(self.config)
+                self._dirty_since = None
+            self._write(data)
+            
+    @property
+    def pending(self):
+        """True while changes are waiting to be written"""
+        return self._dirty_since is not None
+        
+    def _schedule_save(self):
+        """Mark settings dirty and (re)arm the write-behind timer; call with _lock held"""
+        now = time.monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = now
+        self._deadline = min(now + SAVE_DELAY, self._dirty_since + SAVE_MAX_DELAY)
+        if self._writer is None:
+            import atexit
+            self._wakeup = threading.Event()
+            self._writer = threading.Thread(
+                target=self._write_behind, name="config-writer", daemon=True
+            )
+            self._writer.start()
+            atexit.register(self.flush)
+        self._wakeup.set()
+        
+    def _write_behind(self):
+        """Background writer: waits for changes, then for the burst to settle"""
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while True:
+                with self._lock:
+                    if self._dirty_since is None:
+                        break
+                    remaining = self._deadline - time.monotonic()
+                if remaining <= 0:
+                    self.flush()
+                    break
+                time.sleep(remaining)
+                
+    def check_for_changes(self):
+        """
+        Reload the settings file if it was changed by another process
+        Only the file's stat signature is compared unless it changed, so this
+        is cheap enough to call every second. Changed values replace the
+        current ones (an external edit wins over unsaved local changes) and
+        subscribers of the changed keys are notified.
+        Returns:
+            Dictionary of changed keys and their new values
+        """
+        if self._config is None:
+            # Not loaded yet - the first access reads the current file
+            return {}
+        signature = self._file_signature()
+        if signature == self._signature or signature is None:
+            # Unchanged, or removed (keep the current settings)
+            return {}
+        try:
+            fresh = self._read_file()
+        except (ValueError, IOError):
+            # Most likely caught mid-copy; the signature is left stale so the
+            # next check tries again
+            return {}
+            
+        with self._lock:
+            self._signature = signature
+            config = self._config
+            changed = {key: value for key, value in fresh.items()
+                       if key not in config or config[key] != value}
+            # Update in place so the dictionary get() reads stays the same object
+            config.update(changed)
+            self._dirty_since = None
+            self._saved = dict(config)
+            
+        for key, value in changed.items():
+            for callback in list(self._subscribers.get(key, ())):
+                try:
+                    callback(key, value)
+                except Exception as e:
+                    # One bad pushed value must not stop the others applying
+                    print(f"Warning: Could not apply configuration {key}={value!r}: {e}")
+        return changed
+        
+    def subscribe(self, key, callback):
+        """
+        Call callback(key, value) when key changes in a reloaded settings file
+        (changes made through set() are not reported back)
+        """
+        self._subscribers.setdefault(key, []).append(callback)
+        
+    def unsubscribe(self, key, callback):
+        """Remove a callback registered with subscribe()"""
+        callbacks = self._subscribers.get(key, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+            
+    def watch(self, root=None, interval=1.0):
+        """
+        Start polling the settings file for external changes
+        Args:
+            root: Tk widget whose after() loop drives the polling, so
+                subscribers run on the Tk thread. Without it a daemon thread
+                polls and subscribers run on that thread.
+            interval: Seconds between checks
+        """
+        self.stop_watching()
+        if root is not None:
+            delay = max(1, int(interval * 1000))
+            
+            def poll():
+                self.check_for_changes()
+                self._watch_after = (root, root.after(delay, poll))
+                
+            self._watch_after = (root, root.after(delay, poll))
+        else:
+            stop = self._watch_stop = threading.Event()
+            
+            def run():
+                while not stop.wait(interval):
+                    self.check_for_changes()
+                    
+            threading.Thread(target=run, name="config-watcher", daemon=True).start()
+            
+    def stop_watching(self):
+        """Stop polling started by watch()"""
+        if self._watch_after is not None:
+            root, after_id = self._watch_after
+            self._watch_after = None
+            root.after_cancel(after_id)
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
             
     def get(self, key, default=None):
         """Get configuration value"""
-        return self.config.get(key, default)
+        config = self._config
+        if config is None:
+            config = self.config
+        return config.get(key, default)
         
     def set(self, key, value):
-        """Set configuration value"""
-        self.config[key] = value
-        if self.config.get("auto_save", True):
-            self.save_config()
-            
+        """Set configuration value (saved in the background when auto_save is on)"""
+        self.update({key: value})
+        
+    def update(self, values=None, **kwargs):
+        """
+        Set several configuration values with a single save
+        Args:
+            values: Dictionary of settings
+            **kwargs: Further settings by name
+        """
+        with self._lock:
+            config = self.config
+            if values:
+                config.update(values)
+            config.update(kwargs)
+            if config.get("auto_save", True):
+                self._schedule_save()
+                
     def reset_to_defaults(self):
         """Reset configuration to defaults"""
-        self.config = self.default_config.copy()
+        with self._lock:
+            self.config = self.default_config.copy()
         self.save_config()
 
 # Application constants
@@ -76,8 +336,16 @@ class Constants:
     PI = 3.141592653589793
     E = 2.718281828459045
     
+    # Seconds between checks for an externally changed config file
+    CONFIG_POLL_INTERVAL = 1.0
+    
+    # Milliseconds between checks for a background calculation result
+    WORKER_POLL_MS = 50
+    
     # Display limits
     MAX_DIGITS = 15
+    # Longer integers are shown in scientific notation with MAX_DIGITS digits
+    MAX_INTEGER_DIGITS = 50
     MAX_HISTORY_ENTRIES = 100
     
     # Button dimensions
@@ -98,7 +366,7 @@ class Constants:
         "0": "0", "1": "1", "2": "2", "3": "3", "4": "4",
         "5": "5", "6": "6", "7": "7", "8": "8", "9": "9",
         "+": "+", "-": "-", "*": "*", "/": "/",
-        "=": "=", "Return": "=", "Enter": "=",
+        "=": "=", "Return": "=", "Enter": "=", "KP_Enter": "=", "\r": "=",
         ".": ".", ",": ".",
         "BackSpace": "backspace",
         "Delete": "clear",